@@ -1,6 +1,7 @@
 import os
 from datetime import datetime
-from flask import Flask, send_from_directory, abort, session, flash
+import time
+from flask import Flask, send_from_directory, abort, session, flash, request, g
 from flask_login import current_user
 from flask_admin import Admin
 from flask_admin.theme import Bootstrap4Theme
@@ -9,7 +10,8 @@ from flask_admin.contrib.sqla import ModelView
 from flask_wtf import CSRFProtect
 from celery import Celery
 from .extensions import db, login_manager, migrate, mail
-from .routes import main, auth, api, plans
+from .routes import main, auth, api, plans, metrics
+from .utils import metrics_helper
 
 def make_celery(app):
   celery = Celery(app.import_name, backend=app.config['result_backend'], broker=app.config['broker_url'])
@@ -48,6 +50,22 @@ def create_app():
   app.register_blueprint(auth.bp, url_prefix='/auth')
   app.register_blueprint(api.bp, url_prefix='/api')
   app.register_blueprint(plans.bp, url_prefix='/plans')
+  app.register_blueprint(metrics.bp)
+
+  @app.before_request
+  def start_request_timer():
+    g.request_started = time.perf_counter()
+
+  @app.after_request
+  def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+      metrics_helper.observe(
+        'http_request_duration_seconds', time.perf_counter() - started,
+        blueprint=request.blueprint or 'app', route=request.url_rule.rule if request.url_rule else 'unmatched',
+        method=request.method, status=response.status_code
+      )
+    return response
   
   @app.context_processor
   def get_app_name():
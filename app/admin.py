@@ -6,6 +6,7 @@ from datetime import datetime, timezone
 from app.extensions import redis, db
 from app.models import Sports, User, AppSettings
 from app.utils.helpers import to_bool, get_config_by_name
+from app.services import quota, cadence, cycle_metrics
 import platform, psutil
 
 
@@ -47,6 +48,18 @@ class SecureAdminIndexView(AdminIndexView):
     except Exception:
       redis_status = "Unavailable"
       
+    # --- Odds API request budget ---
+    try:
+      budget = quota.get_budget(planned_rate=cadence.planned_rate())
+    except Exception:
+      budget = {'status': 'unavailable'}
+
+    # --- Finder cycle timings ---
+    try:
+      timings = cycle_metrics.summary()
+    except Exception:
+      timings = {'cycles': 0}
+
     # --- use oddsapi state ---
     use_online_setting = get_config_by_name('finder_use_offline')
 
@@ -57,6 +70,8 @@ class SecureAdminIndexView(AdminIndexView):
       sport_stats=sport_stats,
       sys_info=sys_info,
       redis_status=redis_status,
+      budget=budget,
+      timings=timings,
       use_online_setting=not to_bool(use_online_setting if use_online_setting else None)
     )
 
@@ -5,6 +5,7 @@ from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_mail import Mail
+from app.utils.metrics_helper import InstrumentedRedis
 import stripe
 
 load_dotenv()
@@ -12,9 +13,9 @@ run_mode = os.getenv("RUN_MODE", "docker")
 is_local = run_mode == "local"
 
 if is_local:
-  redis = Redis(host="localhost", port=6379, db=0, decode_responses=True)
+  redis = InstrumentedRedis(host="localhost", port=6379, db=0, decode_responses=True)
 else:
-  redis = from_url(os.getenv("REDIS_URL"))
+  redis = InstrumentedRedis.from_url(os.getenv("REDIS_URL"))
     
 db = SQLAlchemy()
 migrate = Migrate()
@@ -1,7 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from app.extensions import redis
-from app.utils.arb_helper import sort_surebet_data, sort_middle_data, sort_valuebets_data, apply_filters
+from app.utils.arb_helper import get_latest_data, get_summary, get_view_page, get_view_rows, sort_surebet_data, sort_middle_data, sort_valuebets_data, apply_filters, FILTER_ARGS, DEFAULT_SORT
 from app.utils.helpers import get_config_by_name, has_active_subscription
 from app.extensions import db
 import json
@@ -15,6 +14,28 @@ def paginate(data, page, limit):
   total_pages = (len(data) + limit - 1) // limit
   return data[start:end], total_pages
 
+def load_page(key, render, default_limit, max_profit=None):
+  """
+  Serve a page from the published view with range reads. Requests with filters use the
+  view's rows with apply_filters, and the live items are rendered only when no view is published.
+  """
+  page = int(request.args.get("page", 1))
+  limit = int(request.args.get("limit", default_limit))
+  sort = request.args.get("sort") or DEFAULT_SORT.get(key)
+
+  if not any(request.args.get(arg) for arg in FILTER_ARGS):
+    view = get_view_page(key, sort, page, limit, max_profit=max_profit)
+    if view is not None:
+      return view[0], page, view[1]
+
+  data = get_view_rows(key, sort, max_profit=max_profit)
+  if data is None:
+    items = get_latest_data(key)
+    data = render(items) if items else []
+  data = apply_filters(data, {**request.args.to_dict(), "sort": sort})
+  data_page, total_pages = paginate(data, page, limit)
+  return data_page, page, total_pages
+
 
 @bp.route('/webpush/subscribe', methods=['POST'])
 @login_required
@@ -74,42 +95,25 @@ def summary():
   if not key:
     return jsonify({}), 400
 
-  redis_key = f"arb:{key}"
-  raw = redis.get(redis_key)
-  if not raw:
-    return jsonify({f"total_{key}": 0})
-
-  try:
-    data = json.loads(raw)
-    if isinstance(data, dict):
-      count = len(data)
-    elif isinstance(data, list): 
-      count = len(data)
-    else:
-      count = 0
-
-    return jsonify({f"total_{key}": count})
-
-  except Exception as e:
-      print("Error parsing Redis data:", e)
-      return jsonify({f"total_{key}": 0})
+  summary = get_summary(key)
+  return jsonify({
+    f"total_{key}": summary["total"],
+    "positive_ev": summary["positive_ev"],
+    "sports": summary["sports"],
+    "markets": summary["markets"]
+  })
 
 @bp.route('/surebets')
 def get_surebets():
-  data = []
-  raw_data = redis.get("arb:surebets")
-  if raw_data:
-    # if free user show only cutoff, get config
-    profit_margin_cutoff = float(get_config_by_name('free_plan_cutoff'))
-    if current_user.is_authenticated and current_user.current_plan:
-      profit_margin_cutoff = None
-    data = sort_surebet_data(raw_data, cutoff=profit_margin_cutoff)
-    
-  data = apply_filters(data, request.args)
+  # if free user show only cutoff, get config
+  profit_margin_cutoff = get_config_by_name('free_plan_cutoff')
+  profit_margin_cutoff = float(profit_margin_cutoff) if profit_margin_cutoff is not None else None
+  if current_user.is_authenticated and current_user.current_plan:
+    profit_margin_cutoff = None
 
-  page = int(request.args.get("page", 1))
-  limit = int(request.args.get("limit", 51))
-  data_page, total_pages = paginate(data, page, limit)
+  data_page, page, total_pages = load_page(
+    'surebets', lambda items: sort_surebet_data(items, cutoff=profit_margin_cutoff), 51, max_profit=profit_margin_cutoff
+  )
 
   return jsonify({
     "data": data_page,
@@ -120,17 +124,8 @@ def get_surebets():
 @bp.route('/middles')
 @login_required
 def get_middles():
-  data = []
   if current_user.is_authenticated and has_active_subscription(current_user):
-    raw_data = redis.get("arb:middles")
-    if raw_data:
-      data = sort_middle_data(raw_data)
-      
-    data = apply_filters(data, request.args)
-    
-    page = int(request.args.get("page", 1))
-    limit = int(request.args.get("limit", 10))
-    data_page, total_pages = paginate(data, page, limit)
+    data_page, page, total_pages = load_page('middles', sort_middle_data, 10)
 
   return jsonify({
     "data": data_page,
@@ -141,17 +136,8 @@ def get_middles():
 @bp.route('/values')
 @login_required
 def get_values():
-  data = []
   if current_user.is_authenticated and has_active_subscription(current_user):
-    raw_data = redis.get("arb:valuebets")
-    if raw_data:
-      data = sort_valuebets_data(raw_data)
-      
-    data = apply_filters(data, request.args)
-    
-    page = int(request.args.get("page", 1))
-    limit = int(request.args.get("limit", 10))
-    data_page, total_pages = paginate(data, page, limit)
+    data_page, page, total_pages = load_page('valuebets', sort_valuebets_data, 10)
 
   return jsonify({
     "data": data_page,
@@ -3,12 +3,12 @@ import os
 from urllib.parse import unquote
 from datetime import datetime, timezone, timedelta
 from flask import Blueprint, render_template, flash, request, redirect, url_for, jsonify, send_from_directory, session
-from app.extensions import db, redis
+from app.extensions import db
 from flask_login import current_user, login_required
 from app.forms import SelectPlan
 from app.models import UserSubscriptions, Subscriptions, Alerts, AppSettings
 from app.utils.helpers import has_active_subscription, verified_required, get_config_by_name, get_plan_info
-from app.utils.arb_helper import get_latest_data
+from app.utils.arb_helper import get_summary, get_latest_item
 
 bp = Blueprint('main', __name__)
 
@@ -119,8 +119,7 @@ def bookmakers():
 
 @bp.route('/surebets')
 def surebets():
-  surebets = get_latest_data('surebets')
-  total_surebet_items = len(surebets)
+  total_surebet_items = get_summary('surebets')['total']
   
   active_subscription = False if not current_user.is_authenticated else has_active_subscription(current_user)
   return render_template('surebets.html', has_active_subscription=active_subscription, total_surebet_items=total_surebet_items)
@@ -136,9 +135,9 @@ def middles():
     has_access_middles = plan_info.get('middlebets', False)
     
   if has_access_middles:
-    middles = get_latest_data('middles')
-    total_middle_items = len(middles)
-    total_items_with_positive_ev = sum( 1 for item in middles if (item.get('expected_value') or 0) > 0)
+    summary = get_summary('middles')
+    total_middle_items = summary['total']
+    total_items_with_positive_ev = summary['positive_ev']
     
   return render_template('middles.html', has_active_subscription=active_subscription, total_middle_items=total_middle_items, total_items_with_positive_ev=total_items_with_positive_ev, has_access_middles=has_access_middles)
 
@@ -153,8 +152,7 @@ def valuebets():
     has_access_values = plan_info.get('valuebets', False)
     
   if has_access_values:
-    values = get_latest_data('valuebets')
-    total_value_items = len(values)
+    total_value_items = get_summary('valuebets')['total']
   
   return render_template('valuebets.html', has_active_subscription=active_subscription, total_value_items=total_value_items, has_access_values=has_access_values)
 
@@ -176,24 +174,10 @@ def bet_calculator():
   
   arb_filter = unquote(request.args.get('arb_item'))
   if arb_filter:
-    data = redis.get("arb:surebets")
-
-    if not data:
-      return "No Surebets available", 404
-    
-    parsed = json.loads(data)
-    if isinstance(parsed, dict):
-      items = list(parsed.values())
-    elif isinstance(parsed, list):
-      items = parsed
-    else:
-      items = []
-    
-    results = [x for x in items if x['unique_id'] == arb_filter]
-    if not results:
+    arb = get_latest_item('surebets', arb_filter)
+    if not arb:
       return "Arb item not found or expired", 404
     
-    arb = results[0]
     total_implied_prob = sum(1/odd for odd in list(arb['best_odds'].values()))
     
     opportunities_html += f"""
@@ -254,24 +238,9 @@ def middle_calculator():
 
   middle_filter = unquote(request.args.get('middle_item'))
   if middle_filter:
-    data = redis.get("arb:middles")
-
-    if not data:
-      return "No Middles available", 404
-    
-    parsed = json.loads(data)
-    if isinstance(parsed, dict):
-      items = list(parsed.values())
-    elif isinstance(parsed, list):
-      items = parsed
-    else:
-      items = []
-    
-    results = [x for x in items if x['unique_id'] == middle_filter]
-
-    if not results:
+    middle = get_latest_item('middles', middle_filter)
+    if not middle:
       return "Middle item not found or expired", 404
-    middle = results[0]
     b1, b2 = middle['bookmakers']['bookmaker1'], middle['bookmakers']['bookmaker2']
     home_line, away_line = middle['lines']['home_line'], middle['lines']['away_line']
 
@@ -338,25 +307,10 @@ def valuebet_calculator():
   if not value_id:
     return "Invalid Request", 400
 
-  # Pull Redis key
-  data = redis.get("arb:valuebets")
-
-  if not data:
-    return "No Valuebets available", 404
-  
-  parsed = json.loads(data)
-  if isinstance(parsed, dict):
-    items = list(parsed.values())
-  elif isinstance(parsed, list):
-    items = parsed
-  else:
-    items = []
-  
-  results = [x for x in items if x['unique_id'] == value_id]
-  if not results:
+  # Single item lookup, only this opportunity is decoded
+  vb = get_latest_item('valuebets', value_id)
+  if not vb:
     return "Valuebet item not found or expired", 404
-  
-  vb = results[0]
 
   # Variables
   odds = vb['odds']
@@ -0,0 +1,42 @@
+import os
+import ipaddress
+from flask import Blueprint, Response, request, abort
+from app.utils import metrics_helper
+from app.utils.logger import setup_logging
+
+logger = setup_logging()
+
+bp = Blueprint('metrics', __name__)
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') # when set, scrapers send "Authorization: Bearer <token>"
+METRICS_ALLOW = os.getenv('METRICS_ALLOW', '') # without a token: comma separated IPs/CIDRs allowed next to loopback
+
+def _networks(value):
+  networks = []
+  for entry in value.split(','):
+    if not entry.strip():
+      continue
+    try:
+      networks.append(ipaddress.ip_network(entry.strip(), strict=False))
+    except ValueError:
+      logger.warning(f"Ignoring invalid METRICS_ALLOW entry: {entry.strip()}")
+  return tuple(networks)
+
+ALLOWED_NETWORKS = _networks(METRICS_ALLOW)
+
+@bp.route('/metrics')
+def metrics():
+  """Prometheus scrape endpoint. Without METRICS_TOKEN only loopback and METRICS_ALLOW addresses may scrape."""
+  if METRICS_TOKEN:
+    if request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+      abort(401)
+  elif not _is_allowed(request.remote_addr):
+    abort(403)
+  return Response(metrics_helper.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+def _is_allowed(address):
+  try:
+    ip = ipaddress.ip_address(address or '')
+  except ValueError:
+    return False
+  return ip.is_loopback or any(ip in network for network in ALLOWED_NETWORKS)
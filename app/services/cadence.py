@@ -0,0 +1,91 @@
+import os
+import json
+import time
+from app.services.odds_table import event_fingerprint
+from app.utils.redis_helper import redis, _parse_time, _to_str
+from app.utils.logger import setup_logging
+
+logger = setup_logging()
+
+TICK = int(os.getenv('CADENCE_TICK_SECONDS', 60))              # beat interval, the finest cadence a sport can get
+MIN_INTERVAL = int(os.getenv('CADENCE_MIN_SECONDS', 60))
+MAX_INTERVAL = int(os.getenv('CADENCE_MAX_SECONDS', 1800))     # stay well under the 1h expiry of cached odds/results
+SCHEDULE_KEY = "schedule:sports"
+STATE_KEY = "schedule:state"
+
+# base refresh interval by time until the nearest kickoff: (seconds until kickoff, interval in seconds)
+KICKOFF_INTERVALS = [
+  (3600, 60),
+  (3 * 3600, 120),
+  (6 * 3600, 300),
+  (24 * 3600, 900)
+]
+
+# Adaptive polling cadence.
+# The beat ticks every TICK seconds, but a sport is only fetched once it is due in the schedule:sports
+# sorted set (sport -> next fetch time). After every fetch the sport is rescheduled from two signals:
+# - the nearest commence_time, sports about to kick off get the short base intervals above
+# - volatility, the smoothed share of events whose odds moved since the previous fetch shortens or stretches it
+# Due sports are then admitted against the request budget (services/quota.py), the ones it can't pay for
+# stay due. Sports not fetched this tick keep their cached odds and published results.
+def due_sports(sports, now=None):
+  """Sports whose next fetch time has passed, sports that were never scheduled are due right away."""
+  now = now or time.time()
+  schedule = {_to_str(k): score for k, score in redis.zrange(SCHEDULE_KEY, 0, -1, withscores=True)}
+  active = {sport['key'] for sport in sports}
+  gone = [key for key in schedule if key not in active]
+  if gone:
+    redis.zrem(SCHEDULE_KEY, *gone)
+    redis.hdel(STATE_KEY, *gone)
+
+  due = [sport for sport in sports if schedule.get(sport['key'], 0) <= now]
+  logger.info(f"{len(due)}/{len(sports)} sports due for a refresh")
+  return due
+
+def record_fetch(sport_key, odds, cost=1, now=None):
+  """Reschedule a sport after its odds were fetched, cost is the requests the fetch took. Returns the interval in seconds."""
+  now = now or time.time()
+
+  raw_state = redis.hget(STATE_KEY, sport_key)
+  state = json.loads(raw_state) if raw_state else {}
+  fingerprints = {event['id']: event_fingerprint(event) for event in odds or [] if isinstance(event, dict) and 'id' in event}
+  previous = state.get('fingerprints')
+  volatility = state.get('volatility', 0.5)
+  if previous is not None and fingerprints:
+    moved = sum(1 for event_id, fingerprint in fingerprints.items() if previous.get(event_id) != fingerprint)
+    volatility = 0.5 * volatility + 0.5 * moved / len(fingerprints)
+
+  interval = refresh_interval(nearest_kickoff(odds, now), volatility)
+  pipe = redis.pipeline()
+  pipe.hset(STATE_KEY, sport_key, json.dumps({
+    'fingerprints': fingerprints,
+    'volatility': round(volatility, 4),
+    'interval': interval,
+    'cost': cost,
+    'at': now
+  }))
+  pipe.zadd(SCHEDULE_KEY, {sport_key: now + interval})
+  pipe.execute()
+  return interval
+
+def refresh_interval(kickoff_in, volatility):
+  """
+  Seconds until the next fetch. kickoff_in is the time to the nearest event (None without events),
+  volatility the share of events that moved per fetch (0..1): all moved halves the base interval, none moved x1.5.
+  """
+  if kickoff_in is None:
+    return MAX_INTERVAL
+  base = next((interval for horizon, interval in KICKOFF_INTERVALS if kickoff_in <= horizon), MAX_INTERVAL)
+  interval = base * (1.5 - volatility)
+  return int(min(max(interval, MIN_INTERVAL), MAX_INTERVAL))
+
+def nearest_kickoff(odds, now):
+  """Seconds until the next event starts, 0 for events already in play, None without events."""
+  starts = [_parse_time(event.get('commence_time')) for event in odds or [] if isinstance(event, dict)]
+  starts = [start.timestamp() for start in starts if start]
+  return max(min(starts) - now, 0) if starts else None
+
+def planned_rate():
+  """Requests per hour the current schedule spends."""
+  states = [json.loads(state) for state in redis.hvals(STATE_KEY)]
+  return sum(state.get('cost', 1) * 3600 / state['interval'] for state in states if state.get('interval'))
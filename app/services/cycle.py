@@ -0,0 +1,75 @@
+import os
+import time
+from app.utils.redis_helper import redis, acquire_lock, release_lock, save_sport_stats, get_sport_stats, _to_str
+from app.utils.logger import setup_logging
+
+logger = setup_logging()
+
+CYCLE_BUDGET = int(os.getenv('CYCLE_BUDGET_SECONDS', 240)) # ticks that fire meanwhile are coalesced or skipped
+OVERLAP_MODE = os.getenv('CYCLE_OVERLAP', 'coalesce')      # skip | coalesce
+LOCK_KEY = "cycle:lock"
+PENDING_KEY = "cycle:pending"
+
+# Cycle guard.
+# A finder cycle holds a redis lease (cycle:lock) from dispatch until results are published, so beat ticks
+# that fire while a cycle is still running don't start a second one. In skip mode those ticks are dropped;
+# in coalesce mode they are folded into a single follow-up run that starts once the current cycle finishes.
+# Every cycle gets a deadline (scheduled time + CYCLE_BUDGET): sports are planned by priority against it,
+# and sports still queued once it has passed are skipped so a late cycle doesn't run into the next one.
+def start_cycle(scheduled_at=None):
+  """Returns (token, deadline) for the new cycle, or None when another cycle holds the lock."""
+  scheduled_at = scheduled_at or time.time()
+  token = acquire_lock(LOCK_KEY, CYCLE_BUDGET + 60) # lease outlives the budget, expires if a cycle dies
+  if token:
+    return token, scheduled_at + CYCLE_BUDGET
+
+  if OVERLAP_MODE == 'coalesce':
+    redis.set(PENDING_KEY, scheduled_at, nx=True, ex=CYCLE_BUDGET + 60) # keep the first missed tick
+    logger.warning("Previous cycle still running, coalescing this run into a follow-up.")
+  else:
+    logger.warning("Previous cycle still running, skipping this run.")
+  return None
+
+def finish_cycle(token):
+  """Release the lease. Returns the scheduled time of a coalesced run to start next, if any."""
+  if not release_lock(LOCK_KEY, token):
+    logger.warning("Cycle lock expired before the cycle finished.")
+  pending = redis.getdel(PENDING_KEY)
+  return float(pending) if pending else None
+
+def holds_lock(token, client=None):
+  """True while the cycle lease is still the one `token` took."""
+  return token is not None and _to_str((client or redis).get(LOCK_KEY)) == token
+
+def past_deadline(deadline):
+  return deadline is not None and time.time() > deadline
+
+def plan_sports(sports, deadline, workers=1):
+  """
+  Order sports by priority (most opportunities last cycle, then quickest) and drop the lowest
+  priority ones whose estimated analysis time no longer fits before the deadline.
+  """
+  stats = get_sport_stats()
+
+  def priority(sport):
+    stat = stats.get(sport['key'], {})
+    return (sport.get('has_outrights', False), -stat.get('found', 0), stat.get('seconds', 0))
+  ordered = sorted(sports, key=priority)
+  if deadline is None:
+    return ordered
+
+  remaining = (deadline - time.time()) * max(workers, 1)
+  planned, dropped = [], []
+  for sport in ordered:
+    cost = stats.get(sport['key'], {}).get('seconds', 0)
+    if cost > remaining:
+      dropped.append(sport['key'])
+      continue
+    remaining -= cost
+    planned.append(sport)
+  if dropped:
+    logger.warning(f"Cycle behind schedule, dropped {len(dropped)} low priority sports: {', '.join(dropped)}")
+  return planned
+
+def record_sport_run(sport_key, seconds, found):
+  save_sport_stats(sport_key, {'seconds': round(seconds, 3), 'found': found, 'at': time.time()})
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from app.utils.redis_helper import redis, _to_str
+from app.services.cycle import LOCK_KEY, holds_lock
+from app.utils import metrics_helper
+from app.utils.logger import setup_logging
+
+logger = setup_logging()
+
+HISTORY_SIZE = int(os.getenv('CYCLE_METRICS_HISTORY', 100)) # cycles kept in the rolling history
+SLOWEST_SPORTS = 10
+CURRENT_KEY = "metrics:cycle"   # stage totals of the running cycle
+HISTORY_KEY = "metrics:cycles"  # finished cycles, newest first
+STAGES = ['sports_fetch', 'sports_db', 'odds_fetch', 'event_fetch', 'redis_save', 'archive',
+          'normalize', 'surebets', 'middles', 'valuebets', 'db_counts', 'publish']
+
+_paused = False
+
+# Cycle metrics.
+# Every stage of a finder cycle (sports fetch, odds fetch, redis save, each finder, db counts, publish) is timed
+# with stage(): wall time, cpu time of the process running it and the number of items it handled. Stages run
+# in the beat task, the chord workers and the finder pool, so the totals are summed into one redis hash with
+# HINCRBYFLOAT; only one cycle runs at a time (see cycle.py), so that hash always belongs to the current cycle.
+# When the cycle ends it is folded into a rolling history of the last CYCLE_METRICS_HISTORY cycles, which the
+# admin dashboard turns into per-stage averages, regressions and the slowest sports.
+def begin(token, now=None):
+  """
+  Start collecting the cycle holding the lease `token`, dropping whatever an aborted one left behind.
+  Nothing is reset unless the lease is still ours, so a cycle can't wipe the metrics of the one holding it.
+  """
+  def reset(pipe):
+    if not holds_lock(token, pipe):
+      return False
+    pipe.multi()
+    pipe.delete(CURRENT_KEY)
+    pipe.hset(CURRENT_KEY, 'started', now or time.time())
+    return True
+  try:
+    if not redis.transaction(reset, LOCK_KEY, value_from_callable=True):
+      logger.warning("Cycle lock lost before the cycle started, metrics not reset.")
+  except Exception as e:
+    logger.warning(f"Could not start cycle metrics: {e}")
+
+@contextmanager
+def stage(name, sport_key=None):
+  """Time the block as one run of stage `name`. Set ['items'] on the yielded dict to count what it handled."""
+  counts = {'items': 0}
+  wall, cpu = time.perf_counter(), time.process_time()
+  try:
+    yield counts
+  finally:
+    record(name, time.perf_counter() - wall, time.process_time() - cpu, counts['items'], sport_key)
+
+def record(name, wall, cpu, items=0, sport_key=None):
+  """Add one run of a stage to the current cycle. Metrics never fail the cycle."""
+  if _paused:
+    return
+  metrics_helper.observe('finder_stage_duration_seconds', wall, stage=name)
+  try:
+    pipe = redis.pipeline()
+    pipe.hincrbyfloat(CURRENT_KEY, f"{name}:wall", wall)
+    pipe.hincrbyfloat(CURRENT_KEY, f"{name}:cpu", cpu)
+    pipe.hincrby(CURRENT_KEY, f"{name}:items", int(items or 0))
+    pipe.hincrby(CURRENT_KEY, f"{name}:calls", 1)
+    if sport_key:
+      pipe.hincrbyfloat(CURRENT_KEY, f"sport:{sport_key}", wall)
+    pipe.execute()
+  except Exception as e:
+    logger.warning(f"Could not record {name} metrics: {e}")
+
+@contextmanager
+def paused():
+  """Record nothing inside the block: work that is not part of a live cycle (replays) stays out of the metrics."""
+  global _paused
+  previous, _paused = _paused, True
+  try:
+    yield
+  finally:
+    _paused = previous
+
+def finish(token, now=None):
+  """
+  Close the cycle holding the lease `token` and push it onto the history. Cycles that fetched nothing are not
+  kept, and a cycle whose lease expired leaves the metrics to the cycle holding it now.
+  """
+  def take(pipe):
+    if not holds_lock(token, pipe):
+      return None
+    fields = pipe.hgetall(CURRENT_KEY)
+    pipe.multi()
+    pipe.delete(CURRENT_KEY)
+    return fields
+  try:
+    fields = redis.transaction(take, LOCK_KEY, CURRENT_KEY, value_from_callable=True)
+  except Exception as e:
+    logger.warning(f"Could not read cycle metrics: {e}")
+    return None
+  if fields is None:
+    logger.warning("Cycle lock lost before the cycle finished, metrics left to the current cycle.")
+    return None
+  fields = {_to_str(k): _to_str(v) for k, v in fields.items()}
+  entry = _build_entry(fields, now or time.time())
+  if entry is None or not set(entry['stages']) - {'sports_fetch', 'sports_db'}:
+    return None
+  metrics_helper.observe('finder_cycle_duration_seconds', entry['seconds'])
+  logger.info(
+    "Cycle finished in %ss: %s", entry['seconds'],
+    ", ".join(f"{name} {stats['wall']}s/{stats['items']}" for name, stats in sorted(entry['stages'].items(), key=lambda s: _stage_order(s[0]))),
+    extra={'cycle': entry} # the whole summary as one field with LOG_FORMAT=json
+  )
+  try:
+    pipe = redis.pipeline()
+    pipe.lpush(HISTORY_KEY, json.dumps(entry))
+    pipe.ltrim(HISTORY_KEY, 0, HISTORY_SIZE - 1)
+    pipe.execute()
+  except Exception as e:
+    logger.warning(f"Could not save cycle metrics: {e}")
+  return entry
+
+def history(limit=None):
+  """Finished cycles, newest first."""
+  raw = redis.lrange(HISTORY_KEY, 0, (limit or HISTORY_SIZE) - 1)
+  return [json.loads(item) for item in raw]
+
+def summary(cycles=None, slow_factor=1.5):
+  """
+  Dashboard view of the history: the last cycle's stages next to their averages over the earlier cycles
+  (a stage is flagged slow when it took slow_factor x its average), and the sports that took longest on average.
+  """
+  cycles = history() if cycles is None else cycles
+  if not cycles:
+    return {'cycles': 0}
+  last, earlier = cycles[0], cycles[1:]
+
+  stages = []
+  for name in sorted(last['stages'], key=_stage_order):
+    stats = last['stages'][name]
+    previous = [cycle['stages'][name]['wall'] for cycle in earlier if name in cycle['stages']]
+    average = sum(previous) / len(previous) if previous else None
+    stages.append({
+      'name': name, **stats, 'average': round(average, 3) if average is not None else None,
+      'slow': bool(average and stats['wall'] > average * slow_factor and stats['wall'] - average > 0.05)
+    })
+
+  sport_totals = {}
+  for cycle in cycles:
+    for sport_key, seconds in cycle.get('sports', {}).items():
+      total, runs = sport_totals.get(sport_key, (0, 0))
+      sport_totals[sport_key] = (total + seconds, runs + 1)
+  slowest = sorted(((key, total / runs, runs) for key, (total, runs) in sport_totals.items()), key=lambda s: -s[1])
+
+  walls = [cycle['seconds'] for cycle in cycles]
+  return {
+    'cycles': len(cycles),
+    'last': last,
+    'stages': stages,
+    'average_seconds': round(sum(walls) / len(walls), 3),
+    'max_seconds': round(max(walls), 3),
+    'slowest_sports': [{'key': key, 'seconds': round(seconds, 3), 'runs': runs} for key, seconds, runs in slowest[:SLOWEST_SPORTS]]
+  }
+
+def _build_entry(fields, now):
+  started = float(fields.pop('started', 0) or 0)
+  if not started:
+    return None
+  stages, sports = {}, {}
+  for field, value in fields.items():
+    if field.startswith('sport:'):
+      sports[field[6:]] = round(float(value), 3)
+      continue
+    name, _, metric = field.rpartition(':')
+    stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'items': 0, 'calls': 0})
+    stages[name][metric] = round(float(value), 4) if metric in ('wall', 'cpu') else int(value)
+  slowest = dict(sorted(sports.items(), key=lambda item: -item[1])[:SLOWEST_SPORTS])
+  return {'started': started, 'seconds': round(now - started, 3), 'stages': stages, 'sports': slowest}
+
+def _stage_order(name):
+  return STAGES.index(name) if name in STAGES else len(STAGES)
@@ -0,0 +1,108 @@
+import os
+import time
+from collections import defaultdict
+from app.utils.redis_helper import redis, get_cached_odds, _parse_time, _to_str
+from app.utils.logger import setup_logging
+
+logger = setup_logging()
+
+HOT_IMPLIED = float(os.getenv('HOT_EVENT_IMPLIED', 1.02))    # best-line implied probability that makes an event hot
+HOT_INTERVAL = int(os.getenv('HOT_EVENT_SECONDS', 60))       # refresh interval of a hot event
+HOT_MAX_EVENTS = int(os.getenv('HOT_EVENT_MAX_PER_TICK', 20))
+HOT_KEY = "schedule:hot" # "<sport_key>|<event_id>" -> next refresh time
+
+# Hot events.
+# Between slate refreshes of a sport (see cadence.py), the events that matter most are refreshed on their own
+# through the per-event odds endpoint: events whose best prices sum to an implied probability of at most
+# HOT_IMPLIED, or that currently have an open opportunity. After every analysis of a sport its hot set is
+# rebuilt; refreshed events are merged into the cached slate and the sport is analyzed again, where the
+# incremental cache only recomputes the events that changed.
+def best_implied(event):
+  """Lowest implied probability over the event's markets/lines using the best price of every outcome, None without a full line."""
+  implied = []
+  for market_key, rows in event.markets.items():
+    best = defaultdict(float)
+    for _, name, point, price in rows:
+      key = (str(name).lower(), point)
+      best[key] = max(best[key], float(price))
+    if market_key == 'h2h':
+      if len(best) > 1 and all(price > 1 for price in best.values()):
+        implied.append(sum(1 / price for price in best.values()))
+    elif market_key == 'totals':
+      for (name, point), price in best.items():
+        under = best.get(('under', point))
+        if name == 'over' and under:
+          implied.append(1 / price + 1 / under)
+    elif market_key == 'spreads':
+      home, away = str(event.home_team).lower(), str(event.away_team).lower()
+      for (name, point), price in best.items():
+        other = best.get((away, -point)) if name == home and point is not None else None
+        if other:
+          implied.append(1 / price + 1 / other)
+  return min(implied) if implied else None
+
+def mark(sport_key, events, results=None, now=None):
+  """Rebuild the hot set of a sport from its analyzed events and the results found on them."""
+  now = now or time.time()
+  with_results = {
+    item.get('event_id')
+    for items in (results or {}).values()
+    for item in items
+  }
+  hot = set()
+  for event in events or []:
+    start = _parse_time(event.commence_time)
+    if event.id is None or (start and start.timestamp() <= now):
+      continue
+    implied = best_implied(event)
+    if event.id in with_results or (implied is not None and implied <= HOT_IMPLIED):
+      hot.add(f"{sport_key}|{event.id}")
+
+  current = [_to_str(member) for member in redis.zrange(HOT_KEY, 0, -1)]
+  cold = [member for member in current if member.startswith(f"{sport_key}|") and member not in hot]
+  pipe = redis.pipeline()
+  if cold:
+    pipe.zrem(HOT_KEY, *cold)
+  if hot:
+    pipe.zadd(HOT_KEY, {member: now + HOT_INTERVAL for member in hot}, nx=True) # keep the refresh time of known ones
+  pipe.execute()
+  return len(hot)
+
+def due_events(skip_sports=(), now=None):
+  """{sport_key: [event_id, ...]} of hot events due for a refresh, soonest first, leaving out `skip_sports`."""
+  now = now or time.time()
+  skip = set(skip_sports)
+  due = defaultdict(list)
+  taken = 0
+  for member in redis.zrangebyscore(HOT_KEY, "-inf", now):
+    sport_key, event_id = _to_str(member).split("|", 1)
+    if sport_key in skip:
+      continue
+    if taken >= HOT_MAX_EVENTS:
+      break
+    due[sport_key].append(event_id)
+    taken += 1
+  return dict(due)
+
+def record_refresh(sport_key, event_ids, missing=(), now=None):
+  """
+  Push back the next refresh of the events requested, drop the ones the api reported missing (404).
+  Events that failed to fetch (timeout, 429, 5xx, quota) stay hot and are tried again in HOT_INTERVAL.
+  """
+  now = now or time.time()
+  missing = set(missing)
+  gone = [f"{sport_key}|{event_id}" for event_id in event_ids if event_id in missing]
+  kept = {f"{sport_key}|{event_id}": now + HOT_INTERVAL for event_id in event_ids if event_id not in missing}
+  pipe = redis.pipeline()
+  if gone:
+    pipe.zrem(HOT_KEY, *gone)
+  if kept:
+    pipe.zadd(HOT_KEY, kept, xx=True)
+  pipe.execute()
+
+def merge_event_odds(sport_key, refreshed):
+  """The cached slate of a sport with the refreshed events ({event_id: event}) swapped in, None without a cached slate."""
+  slate = get_cached_odds(sport_key)
+  if slate is None:
+    return None
+  return [refreshed.get(event.get('id'), event) for event in slate]
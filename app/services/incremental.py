@@ -0,0 +1,44 @@
+from collections import defaultdict
+from app.utils.redis_helper import get_event_results, save_event_results
+from app.utils.logger import setup_logging
+
+logger = setup_logging()
+
+# Incremental recomputation.
+# Each finder keeps its last results per event (arb:events:<kind>:<sport>) together with the fingerprint
+# of the odds they were computed from. Events whose fingerprint is unchanged carry their results over,
+# so only events with moved prices go back through the finder.
+def calculate_incremental(kind, sport_key, events, calculate, signature=""):
+  """
+  Run `calculate` on the events whose odds changed since the last cycle and merge in the cached results
+  of the others. `calculate` gets a list of EventOdds and returns records carrying an 'event_id'.
+  `signature` should change whenever the finder settings (markets, cutoffs) change.
+  """
+  cached = get_event_results(kind, sport_key)
+  changed = []
+  for event in events:
+    entry = cached.get(event.id)
+    if event.id is None or not entry or entry['fingerprint'] != f"{event.fingerprint}:{signature}":
+      changed.append(event)
+
+  computed = defaultdict(list)
+  for item in calculate(changed) if changed else []:
+    computed[item.get('event_id')].append(item)
+
+  updated = {
+    event.id: {'fingerprint': f"{event.fingerprint}:{signature}", 'items': computed.get(event.id, [])}
+    for event in changed if event.id is not None
+  }
+  current = {event.id for event in events}
+  removed = [event_id for event_id in cached if event_id not in current]
+  save_event_results(kind, sport_key, updated, removed)
+
+  results = []
+  changed_ids = {id(event) for event in changed}
+  for event in events:
+    if id(event) in changed_ids:
+      results.extend(computed.pop(event.id, []))
+    else:
+      results.extend(cached[event.id]['items'])
+  logger.info(f"{kind} - {sport_key}: recomputed {len(changed)}/{len(events)} events")
+  return results
@@ -1,60 +1,78 @@
 import hashlib
 import json
 from collections import defaultdict
-from app.utils.redis_helper import save_json, get_cached_odds
+from app.utils.redis_helper import save_json
+from app.utils.view_helper import publish_view
 from app.utils.helpers import update_sport_db_count
-from app.utils.arb_helper import get_bookmaker_links
+from app.services.odds_table import build_event_table, get_event_table
+from app.services.incremental import calculate_incremental
 from app.utils.logger import setup_logging
 
 logger = setup_logging()
 
 class MiddlesFinder:
-  def __init__(self):
+  def __init__(self, incremental=True):
     self.markets = ['spreads', 'totals']
     self.seen_middles = set()
+    self.incremental = incremental
 
-  def find_arbitrage(self, sports, markets):
+  def find_arbitrage(self, sports, markets, tables=None):
     try:
       if not sports:
         logger.error("Failed to fetch sports data")
         return
 
       all_middles = []
-      self.markets = markets.split(',') if markets else ['spreads', 'totals']
+      self.use_markets(markets)
 
       for sport in sports:
         try:
-          odds = get_cached_odds(sport=sport['key'])
+          odds = get_event_table(sport['key'], tables)
           if odds:
-            middles = self.calculate_arbitrage(odds, sport['group'])
+            middles = self.analyze_sport(sport, odds)
             all_middles.extend(middles)
-            update_sport_db_count(key=sport['key'], middles=len(all_middles)) #update db counts
+            update_sport_db_count(key=sport['key'], middles=len(middles)) #update db counts
         except Exception as e:
           logger.error(f"Middles - Error processing sport {sport['key']}: {str(e)}")
           continue
 
-      save_json('arb:middles', all_middles)
+      self.publish(all_middles)
     except Exception as e:
       logger.error(f"Fatal error in find_arbitrage: {str(e)}")
 
+  def use_markets(self, markets):
+    self.markets = markets.split(',') if markets else ['spreads', 'totals']
+
+  def analyze_sport(self, sport, odds):
+    if not self.incremental:
+      return self.calculate_arbitrage(odds, sport['group'])
+    return calculate_incremental(
+      'middles', sport['key'], build_event_table(odds),
+      lambda events: self.calculate_arbitrage(events, sport['group']),
+      signature=','.join(self.markets)
+    )
+
+  def publish(self, middles, now=None):
+    save_json('arb:middles', middles, now=now)
+    publish_view('middles', now=now)
+
   def calculate_arbitrage(self, odds, sport_group):
     all_middles = []
-    for event in odds:
+    for event in build_event_table(odds):
       for market_type in self.markets:
         try:
           middles = self._find_middles(event, market_type, sport_group)
           all_middles.extend(middles)
         except Exception as e:
-          logger.error(f"Error calculating middles for {event.get('id')}: {str(e)}")
+          logger.error(f"Error calculating middles for {event.id}: {str(e)}")
     return all_middles
 
   def _find_middles(self, event, market_type, sport_group):
     """Find true middles (spreads/totals) for one event."""
-    bookmakers = event.get('bookmakers', [])
-    if not bookmakers:
+    if not event.outcomes(market_type):
       return []
 
-    market_data = self._extract_market_data(bookmakers, market_type, event)
+    market_data = self._extract_market_data(event, market_type)
     middles = []
     bookmaker_names = list(market_data.keys())
 
@@ -111,7 +129,7 @@ class MiddlesFinder:
 
     return middles
 
-  def _extract_market_data(self, bookmakers, market_type, event):
+  def _extract_market_data(self, event, market_type):
     """Extracts spreads or totals data per bookmaker."""
     data = defaultdict(lambda: {
       'home': None, 'away': None, 'over': None, 'under': None,
@@ -119,35 +137,26 @@ class MiddlesFinder:
       'over_price': None, 'under_price': None
     })
 
-    for bookmaker in bookmakers:
-      book_name = bookmaker.get('title')
-      if not book_name:
+    home, away = (event.home_team or '').lower(), (event.away_team or '').lower()
+    for book_name, name, point, price in event.outcomes(market_type):
+      if point is None:
         continue
 
-      for market in bookmaker.get('markets', []):
-        if market.get('key') != market_type:
-          continue
-
-        for outcome in market.get('outcomes', []):
-          point, price = outcome.get('point'), outcome.get('price')
-          if point is None or price is None:
-            continue
-
-          name = outcome.get('name', '').lower()
-          if market_type == 'spreads':
-            if name == event['home_team'].lower():
-              data[book_name]['home'] = point
-              data[book_name]['home_price'] = price
-            elif name == event['away_team'].lower():
-              data[book_name]['away'] = point
-              data[book_name]['away_price'] = price
-          elif market_type == 'totals':
-            if 'over' in name:
-              data[book_name]['over'] = point
-              data[book_name]['over_price'] = price
-            elif 'under' in name:
-              data[book_name]['under'] = point
-              data[book_name]['under_price'] = price
+      name = name.lower()
+      if market_type == 'spreads':
+        if name == home:
+          data[book_name]['home'] = point
+          data[book_name]['home_price'] = price
+        elif name == away:
+          data[book_name]['away'] = point
+          data[book_name]['away_price'] = price
+      elif market_type == 'totals':
+        if 'over' in name:
+          data[book_name]['over'] = point
+          data[book_name]['over_price'] = price
+        elif 'under' in name:
+          data[book_name]['under'] = point
+          data[book_name]['under_price'] = price
     return data
 
   def _implied_prob(self, odds):
@@ -182,31 +191,32 @@ class MiddlesFinder:
   def _create_middle_record(self, event, sport_group, b1, b2, market_type,
                             line1, line2, price1, price2, ev, confidence, window):
     """Create middle object, avoid duplicates."""
-    key = f"{event['home_team']}_{event['away_team']}_{market_type}_{line1}_{line2}"
+    key = f"{event.home_team}_{event.away_team}_{market_type}_{line1}_{line2}"
     if key in self.seen_middles:
       return None
     self.seen_middles.add(key)
 
     return {
       'type': 'middle',
-      'event': f"{event['home_team']} vs {event['away_team']}",
+      'event': event.name,
+      'event_id': event.id,
       'sport_group': sport_group,
       'market': market_type,
       'bookmakers': {'bookmaker1': b1, 'bookmaker2': b2},
-      'links': get_bookmaker_links(event, [b1, b2], market_type),
+      'links': event.bookmaker_links([b1, b2], market_type),
       'lines': {'home_line': line1, 'away_line': line2},
       'odds': {'home_price': price1, 'away_price': price2},
       'middle_range': window,
       'expected_value': ev,
       'confidence': round(confidence, 2),
-      'commence_time': event.get('commence_time'),
-      'sport_title': event.get('sport_title'),
+      'commence_time': event.commence_time,
+      'sport_title': event.sport_title,
       'unique_id': self.generate_middle_id(event, market_type, line1, line2, price1, price2, sport_group),
     }
     
   def generate_middle_id(self, event, market_type, line1, line2, price1, price2, sport_group):
     base_string = json.dumps({
-          'event': f"{event['home_team']} vs {event['away_team']}",
+          'event': event.name,
           'market': market_type,
           'sport_group': sport_group,
           'home_line': line1,
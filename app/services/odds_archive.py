@@ -0,0 +1,131 @@
+import os
+import json
+import gzip
+import time
+from datetime import datetime, timezone, timedelta
+from collections.abc import Mapping
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ARCHIVE_DIR = os.getenv('ODDS_ARCHIVE_DIR', os.path.join(BASE_DIR, '../static', 'odds_archive'))
+RETENTION_DAYS = int(os.getenv('ODDS_ARCHIVE_DAYS', 7))
+
+# Offline odds archive.
+# Every cycle appends one snapshot of the fetched odds to the day's segment (odds-YYYY-MM-DD.jsonl.gz). Each sport
+# is written as its own gzip member holding one JSON line, so the segment stays a valid gzip/JSONL file while
+# any single sport can be read back by seeking to its member. The day's index (odds-YYYY-MM-DD.index.jsonl)
+# gets one line per snapshot: {"at": ..., "sports": {sport_key: [offset, length], ...}, "meta": {sport_key: sport}}.
+# Nothing is rewritten; segments older than ODDS_ARCHIVE_DAYS are deleted.
+def write_snapshot(all_odds, at=None, directory=None, sports=None):
+  """Append one snapshot ({sport_key: odds}), `sports` are the sport dicts by key. Returns its index entry."""
+  directory = directory or ARCHIVE_DIR
+  os.makedirs(directory, exist_ok=True)
+  at = at or time.time()
+  day = datetime.fromtimestamp(at, timezone.utc).date().isoformat()
+
+  locations = {}
+  with open(_segment_path(directory, day), 'ab') as segment:
+    for sport, odds in all_odds.items():
+      member = gzip.compress(json.dumps({'sport': sport, 'odds': odds}, separators=(',', ':')).encode() + b'\n')
+      locations[sport] = [segment.tell(), len(member)]
+      segment.write(member)
+
+  entry = {'at': at, 'sports': locations, 'meta': {key: sport for key, sport in (sports or {}).items() if key in locations}}
+  with open(_index_path(directory, day), 'a', encoding='utf-8') as index:
+    index.write(json.dumps(entry) + '\n')
+  _prune(directory, at)
+  return {**entry, 'day': day}
+
+def list_snapshots(day=None, directory=None):
+  """Index entries of one day (the latest day by default), oldest first."""
+  directory = directory or ARCHIVE_DIR
+  days = _days(directory)
+  if not days:
+    return []
+  day = day or days[-1]
+  path = _index_path(directory, day)
+  if not os.path.exists(path):
+    return []
+  with open(path, 'r', encoding='utf-8') as index:
+    return [{**json.loads(line), 'day': day} for line in index if line.strip()]
+
+def iter_snapshots(start=None, end=None, directory=None):
+  """Index entries taken between `start` and `end` (timestamps, both inclusive), oldest first."""
+  directory = directory or ARCHIVE_DIR
+  first_day = datetime.fromtimestamp(start, timezone.utc).date().isoformat() if start is not None else ''
+  last_day = datetime.fromtimestamp(end, timezone.utc).date().isoformat() if end is not None else '9999'
+  for day in _days(directory):
+    if first_day <= day <= last_day:
+      for entry in list_snapshots(day, directory):
+        if (start is None or entry['at'] >= start) and (end is None or entry['at'] <= end):
+          yield entry
+
+def find_snapshot(at=None, directory=None):
+  """The latest snapshot taken at or before `at` (a timestamp), the latest one overall without `at`."""
+  directory = directory or ARCHIVE_DIR
+  days = _days(directory)
+  if at is not None:
+    last_day = datetime.fromtimestamp(at, timezone.utc).date().isoformat()
+    days = [day for day in days if day <= last_day]
+  for day in reversed(days):
+    entries = [entry for entry in list_snapshots(day, directory) if at is None or entry['at'] <= at]
+    if entries:
+      return entries[-1]
+  return None
+
+def read_sport(entry, sport, directory=None):
+  """Odds of one sport in a snapshot, reading only that sport's gzip member."""
+  location = entry['sports'].get(sport)
+  if location is None:
+    return None
+  offset, length = location
+  with open(_segment_path(directory or ARCHIVE_DIR, entry['day']), 'rb') as segment:
+    segment.seek(offset)
+    record = json.loads(gzip.decompress(segment.read(length)))
+  return record['odds']
+
+def load_snapshot(at=None, directory=None):
+  """Snapshot in the offline data shape ({'sports': [...], 'odds': {...}}), odds are read on access. None without an archive."""
+  entry = find_snapshot(at, directory)
+  if entry is None:
+    return None
+  return {'at': entry['at'], 'sports': list(entry['sports']), 'odds': LazySnapshot(entry, directory)}
+
+class LazySnapshot(Mapping):
+  """Read-only {sport_key: odds} of a snapshot, each sport is decompressed the first time it is accessed."""
+
+  def __init__(self, entry, directory=None):
+    self.entry = entry
+    self.directory = directory
+    self._loaded = {}
+
+  def __getitem__(self, sport):
+    if sport not in self.entry['sports']:
+      raise KeyError(sport)
+    if sport not in self._loaded:
+      self._loaded[sport] = read_sport(self.entry, sport, self.directory)
+    return self._loaded[sport]
+
+  def __iter__(self):
+    return iter(self.entry['sports'])
+
+  def __len__(self):
+    return len(self.entry['sports'])
+
+def _segment_path(directory, day):
+  return os.path.join(directory, f"odds-{day}.jsonl.gz")
+
+def _index_path(directory, day):
+  return os.path.join(directory, f"odds-{day}.index.jsonl")
+
+def _days(directory):
+  if not os.path.isdir(directory):
+    return []
+  return sorted(name[5:-12] for name in os.listdir(directory) if name.startswith('odds-') and name.endswith('.index.jsonl'))
+
+def _prune(directory, at):
+  oldest = (datetime.fromtimestamp(at, timezone.utc) - timedelta(days=RETENTION_DAYS)).date().isoformat()
+  for day in _days(directory):
+    if day < oldest:
+      for path in (_segment_path(directory, day), _index_path(directory, day)):
+        if os.path.exists(path):
+          os.remove(path)
@@ -1,30 +1,49 @@
-import requests, os, json
+import requests, os, json, asyncio
+import aiohttp
+from collections import defaultdict
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from datetime import datetime, timedelta, timezone
+from app.services import odds_archive
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 OFFLINE_FILE = os.path.join(BASE_DIR, '../static', 'arbitrage_results.json')
+EVENT_NOT_FOUND = object() # per-event fetch answered 404
 
 class OddsService:
   def __init__(self, fetch_results = False, use_offline = False, save_offline = False, region = 'uk'):
     load_dotenv()
     self.api_key = os.getenv('ODDS_API_KEY')
-    self.base_url = 'https://api.the-odds-api.com/v4'
+    self.base_url = os.getenv('ODDS_API_BASE_URL', 'https://api.the-odds-api.com/v4') # tools/odds_api_stub.py for local runs
     self.markets = 'h2h,spreads,totals'
     self.remaining_requests = None
     self.used_requests = None
-    self.region = region
+    self.region = region # one region, or several comma separated ("uk,eu,us,au") to compare books across regions
+    # joined: one comma-joined request per sport | split: one request per region, fetched concurrently and merged.
+    # Both cost markets x regions requests, joined needs fewer round trips, split isolates a failing region.
+    self.region_mode = os.getenv('ODDS_API_REGION_MODE', 'joined')
+    self.region_costs = defaultdict(float) # requests spent per region by this service
     self.api_limit_reached = False
+    self.missing_events = set() # event ids the last get_event_odds call got a 404 (EVENT_NOT_FOUND) for
     self.fetch_results = fetch_results
     self.save_offline = save_offline
     self.use_offline = use_offline
-    self.file_path = OFFLINE_FILE
+    self.file_path = OFFLINE_FILE # legacy single-file snapshot, read when the archive is empty
+    self.offline_at = None # timestamp of the archived snapshot to read in offline mode, latest when None
+    # concurrent fetch settings (max in-flight requests, per-request timeout in seconds)
+    self.concurrency = int(os.getenv('ODDS_API_CONCURRENCY', 8))
+    self.timeout = float(os.getenv('ODDS_API_TIMEOUT', 20))
+    # pooled keep-alive session for the synchronous calls
+    self.session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+    self.session.mount('https://', adapter)
+    self.session.mount('http://', adapter)
 
   def get_sports(self):
     url = f"{self.base_url}/sports"
     params = {'api_key': self.api_key, 'all': 'false'}
     try:
-      resp = requests.get(url, params=params)
+      resp = self.session.get(url, params=params, timeout=self.timeout)
       resp.raise_for_status()
       sports_data = resp.json()
       return sports_data
@@ -39,14 +58,124 @@ class OddsService:
     if self.api_limit_reached:
       return []
     
+    url = f"{self.base_url}/sports/{sport}/odds"
+    books = []
+    for region_group in self.region_groups(regions):
+      try:
+        resp = self.session.get(url, params=self.odds_params(region_group), timeout=self.timeout)
+        if resp.status_code == 422:
+          continue
+        resp.raise_for_status()
+        self.record_quota(resp.headers, region_group)
+        books.append(resp.json())
+      except Exception as e:
+        self.handle_api_error(e)
+    
+    return merge_region_odds(books)
+
+  def get_all_odds(self, sports, regions):
+    """Fetch odds for every sport key concurrently, returns {sport_key: odds}."""
+    if self.use_offline:
+      offline_odds = self.load_offline_data()['odds']
+      return {sport: offline_odds.get(sport, []) for sport in sports}
+
+    if self.api_limit_reached or not sports:
+      return {}
+    
+    return asyncio.run(self._fetch_all_odds(sports, regions))
+
+  async def _fetch_all_odds(self, sports, regions):
+    results = {}
+    semaphore = asyncio.Semaphore(self.concurrency)
+    timeout = aiohttp.ClientTimeout(total=self.timeout)
+    connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+    
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+      tasks = {
+        asyncio.create_task(self._fetch_odds_async(session, semaphore, sport, region_group)): sport
+        for sport in sports
+        for region_group in self.region_groups(regions)
+      }
+      pending = set(tasks)
+      while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+          odds_data = task.result()
+          if odds_data is not None:
+            results.setdefault(tasks[task], []).append(odds_data)
+        
+        if self.api_limit_reached and pending:
+          # 401/429 -> stop the remaining in-flight requests
+          for task in pending:
+            task.cancel()
+          await asyncio.gather(*pending, return_exceptions=True)
+          break
+    # a sport is kept when at least one of its regions came back
+    return {sport: merge_region_odds(books) for sport, books in results.items()}
+
+  def get_event_odds(self, sport, event_ids, regions):
+    """Odds of single events through the per-event endpoint, returns {event_id: event}."""
+    self.missing_events = set()
+    if self.use_offline:
+      wanted = set(event_ids)
+      found = {event['id']: event for event in self.load_offline_data()['odds'].get(sport, []) if event.get('id') in wanted}
+      self.missing_events = wanted - set(found)
+      return found
+
+    if self.api_limit_reached or not event_ids:
+      return {}
+    return asyncio.run(self._fetch_event_odds(sport, event_ids, regions))
+
+  async def _fetch_event_odds(self, sport, event_ids, regions):
+    semaphore = asyncio.Semaphore(self.concurrency)
+    timeout = aiohttp.ClientTimeout(total=self.timeout)
+    connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+    
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+      calls = [(event_id, region_group) for event_id in event_ids for region_group in self.region_groups(regions)]
+      responses = await asyncio.gather(*(
+        self._fetch_odds_async(
+          session, semaphore, sport, region_group,
+          url=f"{self.base_url}/sports/{sport}/events/{event_id}/odds",
+          params=self.event_odds_params(region_group)
+        )
+        for event_id, region_group in calls
+      ))
+    books = defaultdict(list)
+    for (event_id, _), event in zip(calls, responses):
+      if event is EVENT_NOT_FOUND:
+        self.missing_events.add(event_id)
+      elif isinstance(event, dict):
+        books[event_id].append([event])
+    return {event_id: merge_region_odds(event_books)[0] for event_id, event_books in books.items()}
+
+  async def _fetch_odds_async(self, session, semaphore, sport, regions, url=None, params=None):
+    """Returns odds list for one sport (or the event for the per-event endpoint), None if it was not fetched."""
+    async with semaphore:
+      if self.api_limit_reached:
+        return None
+      
+      url = url or f"{self.base_url}/sports/{sport}/odds"
+      try:
+        async with session.get(url, params=params or self.odds_params(regions)) as resp:
+          if resp.status == 422:
+            return []
+          if resp.status == 404 and '/events/' in url:
+            return EVENT_NOT_FOUND # the event is over or was removed, unlike a failed fetch (None)
+          resp.raise_for_status()
+          self.record_quota(resp.headers, regions)
+          return await resp.json()
+      except Exception as e:
+        self.handle_api_error(e)
+        return None
+
+  def odds_params(self, regions):
     now = datetime.now(timezone.utc)
     from_date = now
     to_date = now + timedelta(days=2)
 
     commence_time_from = from_date.strftime('%Y-%m-%dT%H:%M:%SZ')
     commence_time_to = to_date.strftime('%Y-%m-%dT%H:%M:%SZ')
-  
-    url = f"{self.base_url}/sports/{sport}/odds"
     params = {
       'api_key': self.api_key,
       'includeLinks': 'true',
@@ -56,29 +185,41 @@ class OddsService:
       'markets': self.markets,
       'commenceTimeFrom': commence_time_from,
       'commenceTimeTo': commence_time_to
-      }
-    try:
-      resp = requests.get(url, params=params)
-      if resp.status_code == 422:
-        return []
-      resp.raise_for_status()
-      self.remaining_requests = resp.headers.get('x-requests-remaining')
-      self.used_requests = resp.headers.get('x-requests-used')
-      
-      odds_data = resp.json()
-      if self.save_offline:
-        self.save_data_for_sport(sport, odds_data)
-      return odds_data
-    except Exception as e:
-      self.handle_api_error(e)
-      return []
+    }
+    # requests drops None values on its own, aiohttp rejects them
+    return {k: v for k, v in params.items() if v is not None}
+
+  def event_odds_params(self, regions):
+    """Per-event endpoint takes the same params without the commence time window."""
+    params = self.odds_params(regions)
+    params.pop('commenceTimeFrom', None)
+    params.pop('commenceTimeTo', None)
+    return params
+
+  def region_groups(self, regions):
+    """The regions parameter of each request needed to cover `regions`."""
+    region_list = [region.strip() for region in (regions or '').split(',') if region.strip()]
+    if self.region_mode == 'split' and len(region_list) > 1:
+      return region_list
+    return [','.join(region_list) or regions]
+
+  def record_quota(self, headers, regions=None):
+    self.remaining_requests = headers.get('x-requests-remaining')
+    self.used_requests = headers.get('x-requests-used')
+    last = headers.get('x-requests-last')
+    region_list = [region for region in (regions or '').split(',') if region]
+    if last is not None and region_list:
+      # a joined request costs markets x regions, every region takes its share
+      for region in region_list:
+        self.region_costs[region] += float(last) / len(region_list)
   
   def handle_api_error(self, error):
-    if isinstance(error, requests.exceptions.HTTPError):
-      if error.response.status_code == 401:
+    if isinstance(error, (requests.exceptions.HTTPError, aiohttp.ClientResponseError)):
+      status_code = error.status if isinstance(error, aiohttp.ClientResponseError) else error.response.status_code
+      if status_code == 401:
         print("Error: Unauthorized. Please check your API key.")
         self.api_limit_reached = True
-      elif error.response.status_code == 429:
+      elif status_code == 429:
         print("Error: API request limit reached. Please try again later or upgrade your plan.")
         self.api_limit_reached = True
       else:
@@ -86,32 +227,40 @@ class OddsService:
     else:
       print(f"Error fetching data: {error}")
       
-  def save_data(self, data):
-    # Ensure parent directories exist
-    os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-
-    # Write data to file (formatted)
-    with open(self.file_path, 'w', encoding='utf-8') as f:
-      json.dump(data, f, indent=2)
-
-  def save_data_for_sport(self, sport, odds_data):
-    # Load existing file if available
-    if os.path.exists(self.file_path):
-      with open(self.file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    else:
-      data = {'sports': [], 'odds': {}}
-
-    # Add or update data for the given sport
-    data['odds'][sport] = odds_data
-
-    if sport not in data['sports']:
-      data['sports'].append(sport)
-
-    self.save_data(data)
+  def save_snapshot(self, all_odds, sports=None):
+    """Append this cycle's odds ({sport_key: odds}) and their sport dicts to the offline archive, once per cycle."""
+    if not self.save_offline or self.use_offline or not all_odds:
+      return None
+    return odds_archive.write_snapshot(all_odds, sports=sports)
       
-  def load_offline_data(self):
-    BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-    offline_file = os.path.join(BASE_DIR, '../static', 'arbitrage_results.json')
-    with open(offline_file, 'r') as f:
+  def load_offline_data(self, at=None):
+    """
+    Offline odds as {'sports': [...], 'odds': {sport_key: odds}} from the archive snapshot taken at or
+    before `at` (the latest by default). Odds are read per sport on access. Falls back to the old single file.
+    """
+    snapshot = odds_archive.load_snapshot(at or self.offline_at)
+    if snapshot is not None:
+      return snapshot
+    with open(self.file_path, 'r') as f:
       return json.load(f)
+
+def merge_region_odds(books):
+  """
+  Merge the event lists of several region requests into one book per event. Bookmakers listed in more
+  than one region are kept once, the copy with the most recent last_update wins.
+  """
+  events = {}
+  for odds_data in books:
+    for event in odds_data if isinstance(odds_data, list) else []:
+      event_key = event.get('id') or (event.get('home_team'), event.get('away_team'), event.get('commence_time'))
+      merged = events.get(event_key)
+      if merged is None:
+        merged = events[event_key] = {**event, 'bookmakers': {}}
+      for bookmaker in event.get('bookmakers') or []:
+        key = bookmaker.get('key') or bookmaker.get('title')
+        current = merged['bookmakers'].get(key)
+        if current is None or (bookmaker.get('last_update') or '') > (current.get('last_update') or ''):
+          merged['bookmakers'][key] = bookmaker
+  for event in events.values():
+    event['bookmakers'] = list(event['bookmakers'].values())
+  return list(events.values())
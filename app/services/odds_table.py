@@ -0,0 +1,87 @@
+import hashlib
+import json
+from app.utils.redis_helper import get_cached_odds
+
+# Normalized odds model shared by all finders.
+# Raw Odds API events (event -> bookmakers -> markets -> outcomes) are flattened once per cycle
+# into one row per (bookmaker, outcome, point) and grouped by market key.
+class EventOdds:
+  __slots__ = ('id', 'home_team', 'away_team', 'commence_time', 'sport_title', 'markets', 'market_books', 'links', 'fingerprint')
+
+  def __init__(self, event):
+    self.id = event.get('id')
+    self.home_team = event.get('home_team')
+    self.away_team = event.get('away_team')
+    self.commence_time = event.get('commence_time')
+    self.sport_title = event.get('sport_title')
+    self.markets = {}       # market_key -> [(bookmaker, outcome_name, point, price), ...]
+    self.market_books = {}  # market_key -> [bookmaker, ...] in api order
+    self.links = {}         # bookmaker -> link
+    self.fingerprint = None # changes whenever any bookmaker's odds for the event change
+
+  @property
+  def name(self):
+    return f"{self.home_team} vs {self.away_team}"
+
+  def outcomes(self, market_key):
+    return self.markets.get(market_key, ())
+
+  def bookmaker_links(self, selected_bookmakers, market_key):
+    """Same result as arb_helper.get_bookmaker_links, without walking the raw event."""
+    selected = set(selected_bookmakers)
+    return {
+      bookmaker: self.links.get(bookmaker, "")
+      for bookmaker in self.market_books.get(market_key, ())
+      if bookmaker in selected
+    }
+
+def normalize_event(event):
+  normalized = EventOdds(event)
+  normalized.fingerprint = event_fingerprint(event)
+  bookmakers = event.get('bookmakers')
+  if not isinstance(bookmakers, list):
+    return normalized
+
+  for bookmaker in bookmakers:
+    title = bookmaker.get('title')
+    markets = bookmaker.get('markets')
+    if not title or not isinstance(markets, list):
+      continue
+    normalized.links[title] = bookmaker.get('link', "")
+
+    for market in markets:
+      market_key = market.get('key')
+      normalized.market_books.setdefault(market_key, []).append(title)
+      rows = normalized.markets.setdefault(market_key, [])
+      for outcome in market.get('outcomes', []):
+        name, price = outcome.get('name'), outcome.get('price')
+        if name is None or price is None:
+          continue
+        rows.append((title, name, outcome.get('point'), price))
+  return normalized
+
+def event_fingerprint(event):
+  """Hash of the event's teams, start time and each bookmaker's last_update (its markets when last_update is missing)."""
+  parts = [str(event.get('home_team')), str(event.get('away_team')), str(event.get('commence_time'))]
+  bookmakers = event.get('bookmakers')
+  for bookmaker in bookmakers if isinstance(bookmakers, list) else []:
+    last_update = bookmaker.get('last_update')
+    if last_update:
+      parts.append(f"{bookmaker.get('key') or bookmaker.get('title')}@{last_update}")
+    else:
+      parts.append(json.dumps(bookmaker, sort_keys=True, default=str))
+  return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+def build_event_table(odds):
+  """Normalize a sport's raw events. Already normalized events are passed through."""
+  return [event if isinstance(event, EventOdds) else normalize_event(event) for event in odds or []]
+
+def build_odds_tables(all_odds):
+  """Normalize every sport once per cycle: {sport_key: [EventOdds, ...]}."""
+  return {sport: build_event_table(odds) for sport, odds in all_odds.items()}
+
+def get_event_table(sport_key, tables=None):
+  """Events for one sport from this cycle's tables, or from the redis odds cache."""
+  if tables is not None:
+    return tables.get(sport_key)
+  return build_event_table(get_cached_odds(sport_key))
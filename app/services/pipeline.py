@@ -0,0 +1,175 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.services.surebet_finder import SurebetFinder
+from app.services.middles_finder import MiddlesFinder
+from app.services.values_finder import ValueBetsFinder
+from app.services.odds_table import get_event_table, build_event_table
+from app.services.cycle import past_deadline, record_sport_run
+from app.services import hot_events, cycle_metrics
+from app.utils.helpers import update_sport_db_count
+from app.utils import metrics_helper
+from app.utils.logger import setup_logging
+
+logger = setup_logging()
+
+FINDERS = {
+  'surebets': SurebetFinder,
+  'middles': MiddlesFinder,
+  'valuebets': ValueBetsFinder
+}
+EXECUTION = os.getenv('FINDER_EXECUTION', 'process') # process | inline
+WORKERS = int(os.getenv('FINDER_WORKERS', 0)) or os.cpu_count() or 1
+
+_pool = None
+_pool_lock = threading.Lock() # threaded celery workers can run two local cycles' finders at once
+_worker_app = None
+_warned_daemonic = False
+
+# Finder pipeline.
+# The finders are pure-python CPU work, so instead of running the three of them in threads (serialized by
+# the GIL) the cycle is sharded by sport across a process pool. Each task runs all three finders on one
+# sport and returns their results; the parent merges them, updates the sport counts and publishes once.
+def analyze_sport(sport, markets, tables=None, deadline=None, live=True):
+  """
+  Results of every finder for one sport: {'surebets': [...], 'middles': [...], 'valuebets': [...]}.
+  None when the cycle is already past its deadline, the sport keeps its previous results.
+  live=False (replays) leaves the sport stats and the hot event schedule alone.
+  """
+  if past_deadline(deadline):
+    logger.warning(f"Cycle past its deadline, skipping {sport['key']}")
+    return None
+  started = time.perf_counter()
+  with cycle_metrics.stage('normalize', sport['key']) as stage:
+    odds = build_event_table(get_event_table(sport['key'], tables)) # normalized once, the finders pass EventOdds through
+    stage['items'] = len(odds)
+  results = {kind: [] for kind in FINDERS}
+  if not odds:
+    return results
+  for kind, finder_class in FINDERS.items():
+    finder = finder_class() # fresh finder, their duplicate filters only live for one cycle
+    finder.use_markets(markets)
+    with cycle_metrics.stage(kind, sport['key']) as stage:
+      try:
+        results[kind] = finder.analyze_sport(sport, odds)
+      except Exception as e:
+        logger.error(f"{kind} - Error processing sport {sport['key']}: {str(e)}")
+      stage['items'] = len(results[kind])
+  if live:
+    record_sport_run(sport['key'], time.perf_counter() - started, sum(len(items) for items in results.values()))
+    hot_events.mark(sport['key'], odds, results)
+  return results
+
+def run_finders(sports, markets, tables=None, deadline=None):
+  """Analyze every sport, then save and publish the merged results. Needs an app context."""
+  if EXECUTION == 'process' and not multiprocessing.current_process().daemon:
+    results = _run_in_pool(sports, markets, deadline)
+  else:
+    _warn_daemonic()
+    results = [(sport, _safe_analyze(sport, markets, tables, deadline)) for sport in sports]
+  publish_results(results, markets)
+
+def publish_results(results, markets, now=None, live=True):
+  """
+  Merge the per-sport results, update the sport counts and publish every finder once. now defaults to the clock,
+  live=False (replays) publishes without touching the sport counts or the opportunity counter.
+  """
+  merged = {kind: [] for kind in FINDERS}
+  with cycle_metrics.stage('db_counts') as stage:
+    for sport, sport_results in results:
+      if sport_results is None:
+        continue
+      for kind, items in sport_results.items():
+        merged[kind].extend(items)
+      if not live:
+        continue
+      update_sport_db_count(
+        key=sport['key'],
+        surebets=len(sport_results['surebets']),
+        middles=len(sport_results['middles']),
+        values=len(sport_results['valuebets'])
+      )
+      stage['items'] += 1
+
+  with cycle_metrics.stage('publish') as stage:
+    for kind, finder_class in FINDERS.items():
+      finder = finder_class()
+      finder.use_markets(markets)
+      try:
+        finder.publish(merged[kind], now=now)
+      except Exception as e:
+        logger.error(f"Error publishing {kind}: {str(e)}")
+      if live:
+        metrics_helper.inc('opportunities_found_total', len(merged[kind]), type=kind)
+    stage['items'] = sum(len(items) for items in merged.values())
+  logger.info(f"Published {', '.join(f'{len(items)} {kind}' for kind, items in merged.items())}")
+
+def _warn_daemonic():
+  """Once per process: a prefork child can't start the pool, FINDER_MODE=local wants a worker with --pool=threads."""
+  global _warned_daemonic
+  if EXECUTION == 'process' and not _warned_daemonic:
+    _warned_daemonic = True
+    logger.warning("Daemonic worker process cannot start a process pool, analyzing sports inline (start the worker with --pool=threads).")
+
+def _safe_analyze(sport, markets, tables=None, deadline=None):
+  try:
+    return analyze_sport(sport, markets, tables, deadline)
+  except Exception as e:
+    logger.error(f"Error processing sport {sport.get('key')}: {str(e)}")
+    return None
+
+def _run_in_pool(sports, markets, deadline=None):
+  """Shard sports across the worker pool. Workers read this cycle's odds from the redis cache."""
+  pool = _get_pool()
+  try:
+    futures = [(sport, pool.submit(_analyze_in_worker, sport, markets, deadline)) for sport in sports]
+    return [(sport, _future_result(sport, future)) for sport, future in futures]
+  except BrokenProcessPool as e:
+    logger.error(f"Finder pool broke ({e}), analyzing sports inline.")
+    _discard_pool(pool)
+    return [(sport, _safe_analyze(sport, markets, deadline=deadline)) for sport in sports]
+
+def _get_pool():
+  """The process-wide finder pool, started on first use."""
+  global _pool
+  with _pool_lock:
+    if _pool is None:
+      _pool = ProcessPoolExecutor(
+        max_workers=WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker
+      )
+    return _pool
+
+def _discard_pool(pool):
+  """Shut a broken pool down so its processes and queues are released; the next cycle starts a new one."""
+  global _pool
+  with _pool_lock:
+    if _pool is pool: # another thread may have replaced it already
+      _pool = None
+  try:
+    pool.shutdown(wait=False, cancel_futures=True)
+  except Exception as e:
+    logger.warning(f"Could not shut down the finder pool: {e}")
+
+def _future_result(sport, future):
+  try:
+    return future.result()
+  except BrokenProcessPool:
+    raise
+  except Exception as e:
+    logger.error(f"Error processing sport {sport.get('key')}: {str(e)}")
+    return None
+
+def _init_worker():
+  """Each worker process gets its own app, db engine and redis connections."""
+  global _worker_app
+  from app import create_app
+  _worker_app = create_app()
+  _worker_app.app_context().push()
+
+def _analyze_in_worker(sport, markets, deadline=None):
+  return analyze_sport(sport, markets, deadline=deadline)
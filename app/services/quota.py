@@ -0,0 +1,139 @@
+import os
+import time
+import calendar
+from datetime import datetime, timezone
+from app.utils.redis_helper import redis, _to_str
+from app.utils.logger import setup_logging
+
+logger = setup_logging()
+
+RESET_DAY = int(os.getenv('ODDS_API_RESET_DAY', 1))          # day of month the Odds API quota resets (UTC)
+RESERVE = float(os.getenv('ODDS_API_QUOTA_RESERVE', 0.05))   # share of the monthly quota the finder never spends
+BURST = int(os.getenv('ODDS_API_QUOTA_BURST_SECONDS', 3600)) # unspent budget carries over for at most this long
+STATE_KEY = "quota:state"
+REGIONS_KEY = "quota:regions" # quota:regions:<window start>, requests spent per region
+
+# Odds API request budget.
+# Every odds call costs markets x regions requests. The remaining/used counters of the last response are kept
+# in quota:state; spreading what is left (minus a reserve) evenly over the rest of the billing window gives the
+# rate the finder may spend at. A token bucket refilled at that rate decides, tick by tick, how many of the due
+# sports can be fetched: sports are admitted in priority order and the ones it can't pay for stay due, so
+# low priority sports are the first to slow down and the quota lasts until the window resets.
+def call_cost(markets, regions):
+  """Requests one odds call costs: number of markets x number of regions."""
+  return max(len([m for m in (markets or '').split(',') if m]), 1) * max(len([r for r in (regions or '').split(',') if r]), 1)
+
+def billing_window(now=None):
+  """(start, end) of the current billing window as UTC datetimes."""
+  now = datetime.fromtimestamp(now or time.time(), timezone.utc)
+
+  def reset_in(year, month):
+    day = min(RESET_DAY, calendar.monthrange(year, month)[1])
+    return datetime(year, month, day, tzinfo=timezone.utc)
+
+  start = reset_in(now.year, now.month)
+  if now < start:
+    start = reset_in(now.year - 1, 12) if now.month == 1 else reset_in(now.year, now.month - 1)
+  end = reset_in(start.year + 1, 1) if start.month == 12 else reset_in(start.year, start.month + 1)
+  return start, end
+
+def record_usage(remaining, used, now=None):
+  """Store the quota counters of the latest response (x-requests-remaining / x-requests-used)."""
+  if remaining is None:
+    return
+  redis.hset(STATE_KEY, mapping={
+    'remaining': float(remaining),
+    'used': float(used or 0),
+    'updated_at': now or time.time()
+  })
+
+def record_region_costs(costs, now=None):
+  """Add the requests spent per region ({region: requests}) to the current window's totals."""
+  costs = {region: cost for region, cost in (costs or {}).items() if cost}
+  if not costs:
+    return
+  start, end = billing_window(now)
+  key = f"{REGIONS_KEY}:{start.date().isoformat()}"
+  pipe = redis.pipeline()
+  for region, cost in costs.items():
+    pipe.hincrbyfloat(key, region, cost)
+  pipe.expireat(key, int(end.timestamp()) + 86400)
+  pipe.execute()
+
+def get_region_costs(now=None):
+  start, _ = billing_window(now)
+  costs = redis.hgetall(f"{REGIONS_KEY}:{start.date().isoformat()}")
+  return {_to_str(region): round(float(cost), 1) for region, cost in costs.items()}
+
+def _state():
+  return {_to_str(k): float(v) for k, v in redis.hgetall(STATE_KEY).items()}
+
+def allowed_rate(state, now):
+  """Requests per second that can be spent without running out before the window resets."""
+  usable = state['remaining'] - RESERVE * (state['remaining'] + state['used'])
+  seconds_left = billing_window(now)[1].timestamp() - now
+  return max(usable, 0) / max(seconds_left, 1)
+
+def admit(sports, cost, now=None):
+  """
+  The prefix of `sports` (in priority order) the budget can pay for this tick, each sport costing `cost`.
+  Everything is admitted until a response has reported the quota.
+  """
+  now = now or time.time()
+  state = _state()
+  if 'remaining' not in state:
+    return sports
+
+  rate = allowed_rate(state, now)
+  capacity = max(rate * BURST, cost)
+  tokens = min(state.get('tokens', capacity) + (now - state.get('refilled_at', now)) * rate, capacity)
+  hard_limit = state['remaining'] - RESERVE * (state['remaining'] + state['used'])
+
+  admitted = []
+  for sport in sports:
+    if tokens < cost or hard_limit < cost:
+      break
+    tokens -= cost
+    hard_limit -= cost
+    admitted.append(sport)
+  redis.hset(STATE_KEY, mapping={'tokens': tokens, 'refilled_at': now})
+
+  if len(admitted) < len(sports):
+    logger.warning(f"Request budget deferred {len(sports) - len(admitted)} sports ({state['remaining']:.0f} requests left)")
+  return admitted
+
+def get_budget(planned_rate=None, now=None):
+  """Budget state for the admin dashboard. planned_rate is the current cadence's spend in requests per hour."""
+  now = now or time.time()
+  start, end = billing_window(now)
+  state = _state()
+  budget = {
+    'window_start': start,
+    'window_end': end,
+    'hours_left': round((end.timestamp() - now) / 3600, 1),
+    'planned_per_hour': round(planned_rate, 1) if planned_rate is not None else None,
+    'regions': get_region_costs(now),
+    'status': 'unknown'
+  }
+  if 'remaining' not in state:
+    return budget
+
+  allowed = allowed_rate(state, now) * 3600
+  reserve = RESERVE * (state['remaining'] + state['used'])
+  budget.update({
+    'remaining': int(state['remaining']),
+    'used': int(state['used']),
+    'reserve': int(reserve),
+    'allowed_per_hour': round(allowed, 1),
+    'tokens': round(state.get('tokens', 0), 1),
+    'updated_at': datetime.fromtimestamp(state['updated_at'], timezone.utc)
+  })
+  if planned_rate is not None:
+    budget['projected_used'] = int(state['used'] + planned_rate * budget['hours_left'])
+  if state['remaining'] <= reserve:
+    budget['status'] = 'exhausted'
+  elif planned_rate is not None and planned_rate > allowed:
+    budget['status'] = 'throttled'
+  else:
+    budget['status'] = 'ok'
+  return budget
@@ -0,0 +1,113 @@
+import os
+import argparse
+import time
+from datetime import datetime, timezone
+from app.services import odds_archive, pipeline, cycle_metrics, team_names
+from app.utils.redis_helper import redis, namespace, save_odds_data, _parse_time
+from app.utils.logger import setup_logging
+
+logger = setup_logging()
+
+KEY_PREFIX = os.getenv('REPLAY_KEY_PREFIX') or 'replay:' # namespace of every key a replay writes, never empty
+
+# Offline replay.
+# Plays archived odds snapshots (services/odds_archive.py) through the same path a live cycle takes:
+# save_odds_data -> finders -> save_json/publish_view, with the publish clock set to each snapshot's time so
+# expiry and views behave as they did when the odds were recorded. Sports are analyzed inline and in order,
+# so replaying the same range from a reset redis gives the same results every time. No network, no quota.
+# The live-only side effects are left out: no sport counts in the db, no hot event schedule or sport stats,
+# no cycle metrics, and team aliases are learned in a private index. The odds cache, results, incremental cache
+# and views are written under KEY_PREFIX ("replay:arb:surebets"), so a replay pointed at the production redis
+# never overwrites the live keys and reset() only deletes the replay's own.
+#
+#   python -m app.services.replay --from 2026-10-17T12:00 --to 2026-10-17T18:00 --speed 60 --reset
+def replay(start=None, end=None, speed=0, markets='h2h,spreads,totals', directory=None, on_snapshot=None):
+  """
+  Replay the snapshots taken between `start` and `end` (timestamps). `speed` scales the recorded gaps between
+  snapshots (60 plays an hour in a minute), 0 replays as fast as possible. `on_snapshot` gets every cycle's stats.
+  Needs an app context (publishing reads the free plan cutoff). Returns the totals and per-cycle stats.
+  """
+  summary = {'snapshots': 0, 'events': 0, 'found': {kind: 0 for kind in pipeline.FINDERS}, 'cycles': []}
+  started = time.perf_counter()
+  with namespace(KEY_PREFIX), cycle_metrics.paused(), team_names.isolated():
+    for stats in _replay_snapshots(start, end, speed, markets, directory):
+      summary['snapshots'] += 1
+      summary['events'] += stats['events']
+      for kind, found in stats['found'].items():
+        summary['found'][kind] += found
+      summary['cycles'].append(stats)
+      if on_snapshot:
+        on_snapshot(stats)
+
+  summary['seconds'] = round(time.perf_counter() - started, 4)
+  return summary
+
+def _replay_snapshots(start, end, speed, markets, directory):
+  """Play every snapshot of the range through the finders, yields each cycle's stats."""
+  previous_at = None
+  for entry in odds_archive.iter_snapshots(start, end, directory):
+    if speed and previous_at is not None:
+      time.sleep(max(entry['at'] - previous_at, 0) / speed)
+    previous_at = entry['at']
+
+    cycle_started = time.perf_counter()
+    odds = dict(odds_archive.LazySnapshot(entry, directory))
+    save_odds_data(odds, merge=True)
+    results = [(sport, pipeline.analyze_sport(sport, markets, tables=odds, live=False)) for sport in snapshot_sports(entry)]
+    pipeline.publish_results(results, markets, now=datetime.fromtimestamp(entry['at'], timezone.utc), live=False)
+
+    yield {
+      'at': entry['at'],
+      'sports': len(odds),
+      'events': sum(len(events or []) for events in odds.values()),
+      'found': {kind: sum(len(r[kind]) for _, r in results if r) for kind in pipeline.FINDERS},
+      'seconds': round(time.perf_counter() - cycle_started, 4)
+    }
+
+def snapshot_sports(entry):
+  """Sport dicts of a snapshot. Older snapshots without them get a group from the sport key."""
+  meta = entry.get('meta') or {}
+  return [
+    meta.get(key) or {'key': key, 'group': key.split('_')[0].title(), 'title': key}
+    for key in entry['sports']
+  ]
+
+def reset():
+  """Delete the odds, results and views earlier replays wrote, every key under KEY_PREFIX and nothing else."""
+  keys = list(redis.scan_iter(match=f"{KEY_PREFIX}*"))
+  return redis.delete(*keys) if keys else 0
+
+def _timestamp(value):
+  parsed = _parse_time(value) if value else None
+  if value and parsed is None:
+    raise argparse.ArgumentTypeError(f"not an ISO time: {value}")
+  return parsed.timestamp() if parsed else None
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog='python -m app.services.replay', description='Replay archived odds through the finders.')
+  parser.add_argument('--from', dest='start', type=_timestamp, help='ISO time of the first snapshot (UTC unless given)')
+  parser.add_argument('--to', dest='end', type=_timestamp, help='ISO time of the last snapshot')
+  parser.add_argument('--speed', type=float, default=0, help='playback speed, 1 = real time, 0 = as fast as possible')
+  parser.add_argument('--markets', default='h2h,spreads,totals')
+  parser.add_argument('--archive', default=None, help='archive directory (ODDS_ARCHIVE_DIR)')
+  parser.add_argument('--reset', action='store_true', help='delete the keys of earlier replays first, for repeatable runs')
+  args = parser.parse_args(argv)
+
+  from app import create_app
+  app = create_app()
+  with app.app_context():
+    if args.reset:
+      print(f"[+] Reset {reset()} keys")
+    summary = replay(
+      args.start, args.end, speed=args.speed, markets=args.markets, directory=args.archive,
+      on_snapshot=lambda stats: print(
+        f"[{datetime.fromtimestamp(stats['at'], timezone.utc)}] {stats['sports']} sports, {stats['events']} events, "
+        + ", ".join(f"{found} {kind}" for kind, found in stats['found'].items()) + f" ({stats['seconds']}s)"
+      )
+    )
+  rate = summary['events'] / summary['seconds'] if summary['seconds'] else 0
+  print(f"[+] Replayed {summary['snapshots']} snapshots, {summary['events']} events in {summary['seconds']}s ({rate:.0f} events/s)")
+  return summary
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,256 @@
+import numpy as np
+
+# Vectorized surebet search.
+# A sport's outcome rows for one market are flattened into columns (event, bookmaker, outcome, point, price).
+# Best prices are picked per (event, line, outcome) group with a sort instead of nested loops: the winner of a
+# group is the first row holding its max price, which is the bookmaker the python implementation keeps.
+# Implied probabilities and profit margins are then computed for all events at once, and only rows that turn
+# out to be arbs go back to python to build the same dicts as SurebetFinder.calculate_arbitrage_python.
+class SurebetEngine:
+  def __init__(self, finder):
+    self.finder = finder
+
+  def calculate(self, events, markets, sport_group):
+    arbs = []
+    for market in markets:
+      if market == 'h2h':
+        arbs.extend(self._h2h(events, sport_group))
+      elif market == 'totals':
+        arbs.extend(self._totals(events, sport_group))
+      elif market == 'spreads':
+        arbs.extend(self._spreads(events, sport_group))
+    return arbs
+
+  # -------------------------------------------------------
+  #                        MARKETS
+  # -------------------------------------------------------
+  def _h2h(self, events, sport_group):
+    cols = self._columns(events, 'h2h')
+    if cols is None:
+      return []
+    event_idx, _, names, _, prices, raw = cols
+
+    # one group per (event, outcome name), ordered as the names first appear in the event
+    _, winners, first_rows = self._group_winners(self._pair_key(event_idx, self._codes(names)), prices)
+    group_event = event_idx[first_rows]
+    slots = self._slots(group_event, first_rows)
+
+    best = np.zeros((len(events), slots.max() + 1))
+    best[group_event, slots] = prices[winners]
+    winner_rows = np.full(best.shape, -1)
+    winner_rows[group_event, slots] = winners
+    n_names = np.bincount(group_event, minlength=len(events))
+
+    named = winner_rows >= 0
+    # every listed outcome needs a usable price (a zero price used to raise and skip the event)
+    valid = (n_names > 1) & np.all(~named | (best > 0), axis=1)
+    implied = self._implied(best, named)
+
+    arbs = []
+    for event in self._arb_rows(valid, implied):
+      rows = winner_rows[event][:n_names[event]]
+      bookmakers = {raw[row][1]: raw[row][0] for row in rows}
+      best_odds = {raw[row][1]: raw[row][3] for row in rows}
+      arbs.append(self._make_arb(events[event], 'h2h', float(implied[event]), best_odds, bookmakers, None, sport_group))
+    return arbs
+
+  def _totals(self, events, sport_group):
+    cols = self._columns(events, 'totals')
+    if cols is None:
+      return []
+    event_idx, _, names, points, prices, raw = cols
+
+    has_point = ~np.isnan(points)
+    side_of = {'Over': 0, 'Under': 1}
+    sides = np.fromiter((side_of.get(name, -1) for name in names), dtype=np.int64, count=len(names))
+    lines, line_first = self._lines(event_idx, points, has_point)
+
+    # best Over/Under per line, only prices above the 0 starting value count
+    priced = has_point & (sides >= 0) & (prices > 0)
+    best, winner_rows = self._line_sides(lines[priced], sides[priced], prices[priced], np.flatnonzero(priced), len(line_first))
+    valid = np.all(best > 0, axis=1)
+    implied = self._implied(best, valid[:, None])
+    implied[~valid] = np.inf
+
+    # lowest implied probability line per event, the first line wins ties
+    line_event = event_idx[line_first]
+    order = np.lexsort((line_first, implied, line_event))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = line_event[order[1:]] != line_event[order[:-1]]
+    best_line = np.zeros(len(line_first), dtype=bool)
+    best_line[order[first]] = True
+
+    arbs = []
+    for line in self._arb_rows(best_line & valid, implied):
+      over, under = winner_rows[line]
+      bookmakers = {'Over': raw[over][0], 'Under': raw[under][0]}
+      best_odds = {'Over': raw[over][3], 'Under': raw[under][3]}
+      point = raw[line_first[line]][2]
+      arbs.append(self._make_arb(events[line_event[line]], 'totals', float(implied[line]), best_odds, bookmakers, point, sport_group))
+    return arbs
+
+  def _spreads(self, events, sport_group):
+    cols = self._columns(events, 'spreads')
+    if cols is None:
+      return []
+    event_idx, books, names, points, prices, raw = cols
+
+    # standardize each (event, name) pair once: 0 = home, 1 = away, -1 = no match
+    pairs, pair_first, pair_of_row = np.unique(self._pair_key(event_idx, self._codes(names)), return_index=True, return_inverse=True)
+    pair_sides = np.empty(len(pairs), dtype=np.int64)
+    for pair, row in enumerate(pair_first):
+      event = events[event_idx[row]]
+      team_name = self.finder.standardize_team_name(raw[row][1], [event.home_team, event.away_team])
+      pair_sides[pair] = -1 if not team_name else (0 if team_name == event.home_team else 1)
+    sides = pair_sides[pair_of_row.ravel()]
+
+    usable = ~np.isnan(points) & (sides >= 0)
+    lines, line_first = self._lines(event_idx, points, usable)
+    priced = usable & (prices > 0)
+    best, winner_rows = self._line_sides(lines[priced], sides[priced], prices[priced], np.flatnonzero(priced), len(line_first))
+
+    # both sides priced by different bookmakers, on opposite lines (within the 0.5 tolerance)
+    line_points = points[line_first]
+    valid = np.all(best > 0, axis=1)
+    books = self._codes(books)
+    valid &= books[np.maximum(winner_rows[:, 0], 0)] != books[np.maximum(winner_rows[:, 1], 0)]
+    valid &= ~((line_points * line_points >= 0) & (np.abs(line_points + line_points) > 0.5))
+    implied = self._implied(best, valid[:, None])
+
+    # every line under 1.0 replaces the previous one, so the last qualifying line per event is kept
+    chosen = {}
+    line_event = event_idx[line_first]
+    for line in np.flatnonzero(valid & (implied < 1)):
+      chosen[line_event[line]] = line
+
+    arbs = []
+    for event_id in sorted(chosen):
+      line = chosen[event_id]
+      event = events[event_id]
+      if event.home_team == event.away_team:
+        continue
+      home, away = winner_rows[line]
+      bookmakers = {event.home_team: raw[home][0], event.away_team: raw[away][0]}
+      best_odds = {event.home_team: raw[home][3], event.away_team: raw[away][3]}
+      # 0.0 and -0.0 share a line but each side keeps its own sign
+      spread = (float(raw[home][2]), float(raw[away][2]))
+      best_odds['spread'] = spread
+      if self._profit_margin(float(implied[line])) >= self.finder.cutoff:
+        arbs.append(self._make_arb(event, 'spreads', float(implied[line]), best_odds, bookmakers, spread, sport_group))
+    return arbs
+
+  # -------------------------------------------------------
+  #                     ARRAY HELPERS
+  # -------------------------------------------------------
+  def _columns(self, events, market):
+    """Flatten a market's rows into columns, raw keeps the original (bookmaker, name, point, price) rows."""
+    counts = [len(event.outcomes(market)) for event in events]
+    raw = [row for event in events for row in event.outcomes(market)]
+    if not raw:
+      return None
+    return (
+      np.repeat(np.arange(len(events)), counts),
+      [row[0] for row in raw],
+      [row[1] for row in raw],
+      self._floats([row[2] for row in raw]),
+      np.array([row[3] for row in raw], dtype=float),
+      raw
+    )
+
+  def _codes(self, values):
+    """Integer code per distinct value, in first appearance order."""
+    codes = {value: code for code, value in enumerate(dict.fromkeys(values))}
+    return np.fromiter(map(codes.__getitem__, values), dtype=np.int64, count=len(values))
+
+  def _floats(self, values):
+    """Points as floats, None and unparsable values become NaN."""
+    try:
+      return np.array(values, dtype=float)
+    except (ValueError, TypeError):
+      converted = []
+      for value in values:
+        try:
+          converted.append(float(value) if value is not None else np.nan)
+        except (ValueError, TypeError):
+          converted.append(np.nan)
+      return np.array(converted)
+
+  def _pair_key(self, major, minor):
+    return major * (int(minor.max()) + 1) + minor
+
+  def _group_winners(self, keys, prices):
+    """Distinct keys (sorted), the first row holding each key's max price, and each key's first row."""
+    rows = np.arange(len(keys))
+    order = np.lexsort((rows, -prices, keys))
+    start = np.ones(len(order), dtype=bool)
+    start[1:] = keys[order[1:]] != keys[order[:-1]]
+    groups, first_rows = np.unique(keys, return_index=True)
+    return groups, order[start], first_rows
+
+  def _slots(self, group_event, first_rows):
+    """Position of each group inside its event, by first appearance."""
+    order = np.lexsort((first_rows, group_event))
+    start = np.ones(len(order), dtype=bool)
+    start[1:] = group_event[order[1:]] != group_event[order[:-1]]
+    positions = np.arange(len(order))
+    slots = np.empty(len(order), dtype=np.int64)
+    slots[order] = positions - np.maximum.accumulate(np.where(start, positions, 0))
+    return slots
+
+  def _lines(self, event_idx, points, mask):
+    """Line id per row (event + point, -1 where masked) numbered by first appearance, and each line's first row."""
+    lines = np.full(len(points), -1, dtype=np.int64)
+    if not mask.any():
+      return lines, np.array([], dtype=np.int64)
+    _, point_codes = np.unique(points[mask], return_inverse=True)
+    _, first_rows, inverse = np.unique(self._pair_key(event_idx[mask], point_codes.ravel()), return_index=True, return_inverse=True)
+    rank = np.empty(len(first_rows), dtype=np.int64)
+    rank[np.argsort(first_rows)] = np.arange(len(first_rows))
+    lines[mask] = rank[inverse.ravel()]
+    return lines, np.flatnonzero(mask)[np.sort(first_rows)]
+
+  def _line_sides(self, lines, sides, prices, rows, n_lines):
+    """Best price and winning row for both sides of every line (0 / -1 when a side has no price)."""
+    best = np.zeros((n_lines, 2))
+    winner_rows = np.full((n_lines, 2), -1)
+    if len(lines):
+      groups, winners, _ = self._group_winners(lines * 2 + sides, prices)
+      best[groups // 2, groups % 2] = prices[winners]
+      winner_rows[groups // 2, groups % 2] = rows[winners]
+    return best, winner_rows
+
+  def _implied(self, best, mask):
+    """Sum of 1/price over the masked outcomes, added in outcome order."""
+    inverse = np.divide(1.0, best, out=np.zeros_like(best), where=mask & (best > 0))
+    implied = inverse[:, 0].copy()
+    for o in range(1, best.shape[1]):
+      implied += inverse[:, o]
+    return implied
+
+  def _arb_rows(self, valid, implied):
+    with np.errstate(divide='ignore'):
+      profit = (1 / implied - 1) * 100
+    return np.flatnonzero(valid & (implied < 1) & (profit >= self.finder.cutoff))
+
+  def _profit_margin(self, implied_prob):
+    return (1 / implied_prob - 1) * 100
+
+  def _make_arb(self, event, market, implied_prob, best_odds, bookmakers, points, sport_group):
+    profit_margin = self._profit_margin(implied_prob)
+    arb = {
+      'type': 'surebet',
+      'event': event.name,
+      'event_id': event.id,
+      'profit_margin': profit_margin,
+      'best_odds': best_odds,
+      'bookmakers': bookmakers,
+      'links': event.bookmaker_links(bookmakers.values(), market),
+      'commence_time': event.commence_time,
+      'sport_name': sport_group,
+      'market': market,
+      'unique_id': self.finder.make_surebet_id(event, profit_margin, market, best_odds),
+      'sport_title': event.sport_title
+    }
+    if points is not None:
+      arb['points'] = points
+    return arb
@@ -1,23 +1,29 @@
 import hashlib
 import json
-from collections import defaultdict
-from difflib import get_close_matches
-from app.utils.redis_helper import save_json, get_cached_odds
-from app.utils.arb_helper import get_bookmaker_links
-from app.utils.helpers import update_sport_db_count
-from app.utils.logger import setup_logging
+from collections import defaultdict, Counter
+from app.utils.redis_helper import save_json
+from app.utils.view_helper import publish_view
+from app.services.odds_table import build_event_table, get_event_table
+from app.services.surebet_engine import SurebetEngine
+from app.services.incremental import calculate_incremental
+from app.services import team_names
+from app.utils.helpers import update_sport_db_count, get_config_by_name
+from app.utils.logger import setup_logging, sample_event
 
 logger = setup_logging()
 
 # find arbitrage function takes sports, get odds using specific parameters
 # find best_odds
 class SurebetFinder:
-  def __init__(self):
+  def __init__(self, vectorized=True, incremental=True):
     self.cutoff = 0.9
-    self.team_name_cache = {}
     self.markets = None
+    self.vectorized = vectorized
+    self.incremental = incremental # only recompute events whose odds changed since the last cycle
+    self.engine = SurebetEngine(self)
+    self.stats = Counter() # what the last calculate_arbitrage call saw, logged once instead of per event
     
-  def find_arbitrage(self, sports, markets):
+  def find_arbitrage(self, sports, markets, tables=None):
     try:
       if not sports:
         logger.error("Failed to fetch sports data")
@@ -25,25 +31,65 @@ class SurebetFinder:
       logger.info(f"Analyzing {len(sports)} in-season sports...")
       
       all_arbs = []
-      self.markets = markets.split(',') if markets else ['h2h']
+      self.use_markets(markets)
       for sport in sports:
         try:
-          odds = get_cached_odds(sport['key'])
+          odds = get_event_table(sport['key'], tables)
           if odds:
-            arbs = self.calculate_arbitrage(odds, sport['group']) # calculate arbs
+            arbs = self.analyze_sport(sport, odds) # calculate arbs
             all_arbs.extend(arbs)
-            update_sport_db_count(key=sport['key'], surebets=len(all_arbs)) #update db counts
+            update_sport_db_count(key=sport['key'], surebets=len(arbs)) #update db counts
         except Exception as e:
           logger.error(f"Surebet - Error processing sport {sport['key']}: {str(e)}")
           continue
-      save_json('arb:surebets', all_arbs) # save to redis here
+      self.publish(all_arbs)
     except Exception as e:
       logger.error(f"Fatal error in find_arbitrage: {str(e)}")
+
+  def use_markets(self, markets):
+    self.markets = markets.split(',') if markets else ['h2h']
+
+  def analyze_sport(self, sport, odds):
+    """Surebets for one sport, only events whose odds changed are recomputed in incremental mode."""
+    if not self.incremental:
+      return self.calculate_arbitrage(odds, sport['group'])
+    return calculate_incremental(
+      'surebets', sport['key'], build_event_table(odds),
+      lambda events: self.calculate_arbitrage(events, sport['group']),
+      signature=f"{','.join(self.markets)}:{self.cutoff}"
+    )
+
+  def publish(self, arbs, now=None):
+    save_json('arb:surebets', arbs, now=now) # save to redis here
+    publish_view('surebets', free_cutoff=self.free_plan_cutoff(), now=now)
+
+  def free_plan_cutoff(self):
+    """Max profit shown to free users, the published view keeps a separate index for it."""
+    try:
+      cutoff = get_config_by_name('free_plan_cutoff')
+      return float(cutoff) if cutoff is not None else None
+    except Exception as e:
+      logger.warning(f"Could not read free_plan_cutoff: {e}")
+      return None
       
   def calculate_arbitrage(self, odds, sport_group):
+    self.stats.clear()
+    events = build_event_table(odds)
+    self.stats['events'] = len(events)
+    if self.vectorized:
+      arbs = self.engine.calculate(events, self.markets, sport_group)
+    else:
+      arbs = self.calculate_arbitrage_python(events, sport_group)
+    self.stats['found'] = len(arbs)
+    logger.info("Surebets - %s: %s", sport_group, ", ".join(f"{count} {name}" for name, count in self.stats.items()))
+    return arbs
+
+  def calculate_arbitrage_python(self, odds, sport_group):
+    """Reference implementation, one event and one market at a time."""
     arbs = []
+    events = build_event_table(odds)
     for market in self.markets:
-      for event in odds:
+      for event in events:
         best_odds, bookmakers, points = self.get_best_odds(event, market)
         if best_odds:
           try:
@@ -56,47 +102,45 @@ class SurebetFinder:
               if len(teams) == 2 and bookmakers[teams[0]] != bookmakers[teams[1]]:
                 implied_prob = sum(1 / odd for odd in odds_without_spread.values())
               else:
-                logger.warning("Invalid spread bet setup - skipping")
+                self.stats['invalid_spread'] += 1
                 continue
             elif market == 'totals':
               implied_prob = 1/best_odds['Over'] + 1/best_odds['Under']
             else:
-              logger.warning(f"Unsupported market: {market}")
+              logger.warning("Unsupported market: %s", market)
               continue
             
-            logger.info(f"Event: {event['home_team']} vs {event['away_team']}, Implied Prob: {implied_prob}")
+            if sample_event():
+              logger.debug("Event: %s, %s implied prob: %s", event.name, market, implied_prob)
             
             if implied_prob < 1:
               profit_margin = (1 / implied_prob - 1) * 100
-              logger.info(f"Potential arbitrage found! Profit Margin: {profit_margin}%")
               
               if profit_margin >= self.cutoff:
                 arb = {
                   'type': 'surebet',
-                  'event': f"{event['home_team']} vs {event['away_team']}",
+                  'event': event.name,
+                  'event_id': event.id,
                   'profit_margin': profit_margin,
                   'best_odds': best_odds,
                   'bookmakers': bookmakers,
-                  'links': get_bookmaker_links(event, bookmakers.values(), market),
-                  'commence_time': event.get('commence_time'),
+                  'links': event.bookmaker_links(bookmakers.values(), market),
+                  'commence_time': event.commence_time,
                   'sport_name': sport_group,
                   'market': market,
                   'unique_id': self.make_surebet_id(event, profit_margin, market, best_odds),
-                  'sport_title': event.get('sport_title')
+                  'sport_title': event.sport_title
                 }
                 if points is not None:
                   arb['points'] = points
                 arbs.append(arb)
-                logger.info(f"Added arbitrage opportunity with {profit_margin:.2f}% profit margin")
               else:
-                logger.info(f"Profit margin {profit_margin}% below cutoff {self.cutoff}%")
-            else:
-              logger.info("No arbitrage opportunity")
+                self.stats['below_cutoff'] += 1
           except Exception as e:
             logger.error(f"Error calculating arbitrage for event: {str(e)}")
             continue
         else:
-          logger.info(f"No valid odds for {event['home_team']} vs {event['away_team']}")
+          self.stats['no_odds'] += 1
       # end market for
     return arbs
     
@@ -115,35 +159,24 @@ class SurebetFinder:
   def get_best_odds_h2h(self, event):
     best_odds = {}
     bookmakers = {}
-    if 'bookmakers' in event and isinstance(event['bookmakers'], list):
-      for bookmaker in event['bookmakers']:
-        if 'markets' in bookmaker and isinstance(bookmaker['markets'], list):
-          for market in bookmaker['markets']:
-            if market['key'] == 'h2h':
-              for outcome in market['outcomes']:
-                if outcome['name'] not in best_odds or outcome['price'] > best_odds[outcome['name']]:
-                  best_odds[outcome['name']] = outcome['price']
-                  bookmakers[outcome['name']] = bookmaker['title']
+    for bookmaker, name, _, price in event.outcomes('h2h'):
+      if name not in best_odds or price > best_odds[name]:
+        best_odds[name] = price
+        bookmakers[name] = bookmaker
     return (best_odds, bookmakers, None) if len(best_odds) > 1 else (None, None, None)
   
   def get_best_odds_totals(self, event):
     odds_by_points = defaultdict(lambda: {'Over': 0, 'Under': 0})
     bookmakers_by_points = defaultdict(lambda: {'Over': '', 'Under': ''})
     
-    if 'bookmakers' in event and isinstance(event['bookmakers'], list):
-      for bookmaker in event['bookmakers']:
-        if 'markets' in bookmaker and isinstance(bookmaker['markets'], list):
-          for market in bookmaker['markets']:
-            if market['key'] == 'totals':
-              for outcome in market['outcomes']:
-                total_points = outcome.get('point')
-                if total_points is not None:
-                  if outcome['name'] == 'Over' and outcome['price'] > odds_by_points[total_points]['Over']:
-                    odds_by_points[total_points]['Over'] = outcome['price']
-                    bookmakers_by_points[total_points]['Over'] = bookmaker['title']
-                  elif outcome['name'] == 'Under' and outcome['price'] > odds_by_points[total_points]['Under']:
-                    odds_by_points[total_points]['Under'] = outcome['price']
-                    bookmakers_by_points[total_points]['Under'] = bookmaker['title']
+    for bookmaker, name, total_points, price in event.outcomes('totals'):
+      if total_points is not None:
+        if name == 'Over' and price > odds_by_points[total_points]['Over']:
+          odds_by_points[total_points]['Over'] = price
+          bookmakers_by_points[total_points]['Over'] = bookmaker
+        elif name == 'Under' and price > odds_by_points[total_points]['Under']:
+          odds_by_points[total_points]['Under'] = price
+          bookmakers_by_points[total_points]['Under'] = bookmaker
     
     best_odds = None
     best_bookmakers = None
@@ -166,61 +199,49 @@ class SurebetFinder:
   
   def standardize_team_name(self, team_name, event_teams):
     """
-    Standardize team names using fuzzy matching.
-    Cache results to improve performance.
+    The event team a bookmaker's outcome name refers to, through the shared team name index
+    (services/team_names.py) that persists learned aliases across finders and cycles.
     """
     if not team_name:
       return None
-        
-    cache_key = (team_name.lower(), tuple(sorted(event_teams)))
-    if cache_key in self.team_name_cache:
-      return self.team_name_cache[cache_key]
 
-    matches = get_close_matches(team_name.lower(), [t.lower() for t in event_teams], n=1, cutoff=0.6)
-    if matches:
-      standardized = next(t for t in event_teams if t.lower() == matches[0])
-      self.team_name_cache[cache_key] = standardized
-      return standardized
-    
-    logger.warning(f"No match found for team name: {team_name}")
-    return None
+    standardized = team_names.resolve(team_name, event_teams)
+    if standardized is None:
+      self.stats['unmatched_names'] += 1
+      if sample_event():
+        logger.debug("No match found for team name: %s (%s)", team_name, ", ".join(map(str, event_teams)))
+    return standardized
   
   def get_best_odds_spreads(self, event):
-    event_teams = [event['home_team'], event['away_team']]
+    event_teams = [event.home_team, event.away_team]
     odds_by_points = defaultdict(lambda: {
       'Home': {'odds': 0, 'team': None, 'bookmaker': None, 'point': None},
       'Away': {'odds': 0, 'team': None, 'bookmaker': None, 'point': None}
     })
     
-    if 'bookmakers' in event and isinstance(event['bookmakers'], list):
-      for bookmaker in event['bookmakers']:
-        if 'markets' in bookmaker and isinstance(bookmaker['markets'], list):
-          for market in bookmaker['markets']:
-            if market['key'] == 'spreads':
-              for outcome in market['outcomes']:
-                point = outcome.get('point')
-                if point is not None:
-                  try:
-                    point = float(point)
-                  except (ValueError, TypeError):
-                    continue
+    for bookmaker, name, point, price in event.outcomes('spreads'):
+      if point is not None:
+        try:
+          point = float(point)
+        except (ValueError, TypeError):
+          continue
 
-                  # Standardize team name
-                  team_name = self.standardize_team_name(outcome['name'], event_teams)
-                  if not team_name:
-                    continue
+        # Standardize team name
+        team_name = self.standardize_team_name(name, event_teams)
+        if not team_name:
+          continue
 
-                  # Determine if team is home or away
-                  side = 'Home' if team_name == event['home_team'] else 'Away'
+        # Determine if team is home or away
+        side = 'Home' if team_name == event.home_team else 'Away'
 
-                  # Store odds if better than existing
-                  if outcome['price'] > odds_by_points[point][side]['odds']:
-                    odds_by_points[point][side] = {
-                      'odds': outcome['price'],
-                      'team': team_name,
-                      'bookmaker': bookmaker['title'],
-                      'point': point
-                    }
+        # Store odds if better than existing
+        if price > odds_by_points[point][side]['odds']:
+          odds_by_points[point][side] = {
+            'odds': price,
+            'team': team_name,
+            'bookmaker': bookmaker,
+            'point': point
+          }
 
     # Find the best arbitrage opportunity across all point spreads
     best_odds = None
@@ -245,10 +266,7 @@ class SurebetFinder:
           away_prob = 1 / sides['Away']['odds']
           implied_prob = home_prob + away_prob
 
-          logger.info(f"Checking spread {point}:")
-          logger.info(f"  Home: {sides['Home']['team']} ({home_point}) @ {sides['Home']['odds']} ({sides['Home']['bookmaker']}) - Implied prob: {home_prob:.4f}")
-          logger.info(f"  Away: {sides['Away']['team']} ({away_point}) @ {sides['Away']['odds']} ({sides['Away']['bookmaker']}) - Implied prob: {away_prob:.4f}")
-          logger.info(f"  Total implied prob: {implied_prob:.4f}")
+          self.stats['spread_lines'] += 1
 
           if implied_prob < 1:
             best_implied_prob = implied_prob
@@ -261,11 +279,12 @@ class SurebetFinder:
               sides['Away']['team']: sides['Away']['bookmaker']
             }
             best_points = (home_point, away_point)
-
-            logger.info(f"Found valid arbitrage opportunity:")
-            logger.info(f"  Home: {sides['Home']['team']} {home_point} @ {sides['Home']['odds']} ({sides['Home']['bookmaker']})")
-            logger.info(f"  Away: {sides['Away']['team']} {away_point} @ {sides['Away']['odds']} ({sides['Away']['bookmaker']})")
-            logger.info(f"  Implied Probability: {implied_prob:.4f}")
+            if sample_event():
+              logger.debug(
+                "Spread %s: %s %s @ %s (%s) / %s %s @ %s (%s), implied prob %.4f", point,
+                sides['Home']['team'], home_point, sides['Home']['odds'], sides['Home']['bookmaker'],
+                sides['Away']['team'], away_point, sides['Away']['odds'], sides['Away']['bookmaker'], implied_prob
+              )
 
     if best_odds:
       best_odds['spread'] = best_points
@@ -275,8 +294,8 @@ class SurebetFinder:
     
   def make_surebet_id(self, event, profit_margin, market, best_odds):
     key_data = {
-      'home': event['home_team'],
-      'away': event['away_team'],
+      'home': event.home_team,
+      'away': event.away_team,
       'profit_margin': round(profit_margin, 4),
       'market': market,
       'best_odds': {k: best_odds[k] for k in sorted(best_odds)}
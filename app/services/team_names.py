@@ -0,0 +1,159 @@
+import os
+import re
+import time
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+from contextlib import contextmanager
+from app.utils.redis_helper import redis, _to_str
+from app.utils.logger import setup_logging
+
+logger = setup_logging()
+
+ALIASES_KEY = "teams:aliases" # normalized name -> canonical team name, learned from the bookmakers
+REFRESH_SECONDS = int(os.getenv('TEAM_ALIAS_REFRESH_SECONDS', 300))
+FUZZY_CUTOFF = 0.6  # difflib ratio a name needs, as the finder always used
+MIN_MARGIN = 0.1    # lead over the event's other team, so "ny jets" never settles between two New York sides
+NOISE_TOKENS = {'fc', 'cf', 'afc', 'sc', 'ac', 'club', 'the'}
+
+# Team name index.
+# Bookmakers spell participants their own way ("Man United", "Manchester United FC"); the spreads finders need
+# to know which side of the event an outcome is. Names are resolved against the event's teams in cheap steps:
+# the normalized name (accents, case, punctuation and club suffixes dropped), a known alias, the teams whose
+# words contain the name's words or the other way round ("Madrid Atletico", "Tottenham"), and difflib only for
+# names no other step settles. The token step and difflib both have to beat the runner-up by MIN_MARGIN, and
+# difflib has to clear FUZZY_CUTOFF, or the name stays unresolved. Whatever they resolve is learned as an alias,
+# written to redis (first writer wins, an alias is never overwritten) and shared by every finder, worker and
+# cycle, so a spelling is matched fuzzily once. Aliases only ever resolve to one of the event's own teams: an
+# alias naming another event's team is skipped and the name is matched against this event's teams instead.
+class TeamNameIndex:
+  def __init__(self, client=None, shared=True):
+    self.client = client
+    self.shared = shared # False: aliases are neither loaded from nor written to redis (replays)
+    self.aliases = {}    # normalized alias -> canonical name
+    self.matches = {}    # (name, teams) -> team or None, for names no alias settles, per process
+    self.loaded_at = None
+    self.lock = threading.Lock()
+
+  def resolve(self, name, teams):
+    """The team of `teams` that `name` refers to, None when no step finds one."""
+    if not name:
+      return None
+    teams = [team for team in teams if team]
+    self._refresh()
+
+    normalized = normalize(name)
+    by_normalized = {normalize(team): team for team in teams}
+    if normalized in by_normalized:
+      return by_normalized[normalized]
+    alias = self.aliases.get(normalized)
+    if alias in teams:
+      return alias
+
+    match_key = (normalized, tuple(sorted(by_normalized)))
+    if match_key in self.matches:
+      return self.matches[match_key]
+    team = self._token_match(normalized, by_normalized) or self._closest(normalized, by_normalized)
+    self.matches[match_key] = team
+    if team is not None and alias is None:
+      self.learn(normalized, team)
+    return team
+
+  def learn(self, normalized, team):
+    """
+    Remember an alias and share it through redis, unless the name already has one: then the known alias wins
+    and is returned. Redis being down only costs the sharing.
+    """
+    with self.lock:
+      if normalized in self.aliases:
+        return self.aliases[normalized]
+      self.aliases[normalized] = team
+    if not self.shared:
+      return team
+    try:
+      client = self.client or redis
+      if not client.hsetnx(ALIASES_KEY, normalized, team): # another process learned it first
+        stored = _to_str(client.hget(ALIASES_KEY, normalized))
+        with self.lock:
+          self.aliases[normalized] = stored
+        return stored
+    except Exception as e:
+      logger.warning(f"Could not save team alias {normalized} -> {team}: {e}")
+    return team
+
+  def _token_match(self, normalized, by_normalized):
+    """The team whose words contain the name's words or are contained in them, by the best token overlap."""
+    words = tokens(normalized)
+    if not words:
+      return None
+    scored = []
+    for candidate in by_normalized:
+      other = tokens(candidate)
+      if words <= other or other <= words:
+        scored.append((len(words & other) / len(words | other), candidate))
+    scored.sort(reverse=True)
+    if not scored or (len(scored) > 1 and scored[0][0] - scored[1][0] < MIN_MARGIN):
+      return None
+    return by_normalized[scored[0][1]]
+
+  def _closest(self, normalized, by_normalized):
+    matcher = SequenceMatcher(b=normalized)
+    scored = []
+    for candidate in by_normalized:
+      matcher.set_seq1(candidate)
+      scored.append((matcher.ratio(), candidate))
+    scored.sort(reverse=True)
+    if not scored or scored[0][0] < FUZZY_CUTOFF:
+      return None
+    if len(scored) > 1 and scored[0][0] - scored[1][0] < MIN_MARGIN:
+      return None
+    return by_normalized[scored[0][1]]
+
+  def _refresh(self):
+    """Load the aliases other processes learned, every REFRESH_SECONDS."""
+    now = time.monotonic()
+    if not self.shared or (self.loaded_at is not None and now - self.loaded_at < REFRESH_SECONDS):
+      return
+    self.loaded_at = now
+    try:
+      stored = (self.client or redis).hgetall(ALIASES_KEY)
+    except Exception as e:
+      logger.warning(f"Could not load team aliases: {e}")
+      return
+    with self.lock:
+      self.aliases.update({_to_str(alias): _to_str(team) for alias, team in stored.items()})
+      self.matches.clear() # new aliases may settle them now
+
+@lru_cache(maxsize=65536)
+def normalize(name):
+  """Lowercase ascii words without punctuation and club suffixes: "Atlético Madrid C.F." -> "atletico madrid"."""
+  text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode().lower()
+  words = re.sub(r"[^a-z0-9]+", " ", re.sub(r"[.']", "", text)).split() # "c.f." -> "cf", "st. louis" -> "st louis"
+  return " ".join([word for word in words if word not in NOISE_TOKENS] or words)
+
+@lru_cache(maxsize=65536)
+def tokens(normalized):
+  return frozenset(normalized.split())
+
+_index = None
+
+def get_index():
+  """The process-wide index, shared by every finder."""
+  global _index
+  if _index is None:
+    _index = TeamNameIndex()
+  return _index
+
+@contextmanager
+def isolated():
+  """Resolve with a fresh index that shares nothing through redis inside the block, for reproducible replays."""
+  global _index
+  previous, _index = _index, TeamNameIndex(shared=False)
+  try:
+    yield _index
+  finally:
+    _index = previous
+
+def resolve(name, teams):
+  return get_index().resolve(name, teams)
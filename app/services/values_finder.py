@@ -2,16 +2,18 @@ import hashlib
 import json
 from collections import defaultdict
 from statistics import mean, pstdev
-from app.utils.redis_helper import save_json, get_cached_odds
+from app.utils.redis_helper import save_json
+from app.utils.view_helper import publish_view
 from app.utils.helpers import update_sport_db_count
-from app.utils.arb_helper import get_bookmaker_links
+from app.services.odds_table import build_event_table, get_event_table
+from app.services.incremental import calculate_incremental
 from app.utils.logger import setup_logging
 
 logger = setup_logging()
 
 def generate_valuebet_id(event, sport_group, market_type, bookmaker, outcome_key, odds, ref_odds):
   base_string = json.dumps({
-    'event': f"{event.get('home_team')} vs {event.get('away_team')}",
+    'event': event.name,
     'sport_group': sport_group,
     'market': market_type,
     'bookmaker': bookmaker,
@@ -24,60 +26,76 @@ def generate_valuebet_id(event, sport_group, market_type, bookmaker, outcome_key
 
 
 class ValueBetsFinder:
-	def __init__(self):
+	def __init__(self, incremental=True):
 			self.markets = ['h2h', 'spreads', 'totals']
 			self.seen_valuebets = set()
+			self.incremental = incremental
 			self.sharp_books = ['betfair', 'pinnacle', 'sbobet', 'matchbook', 'betcris']
    
 	# -------------------------------------------------------
 	#                    PUBLIC ENTRYPOINT
 	# -------------------------------------------------------
-	def find_arbitrage(self, sports, markets):
+	def find_arbitrage(self, sports, markets, tables=None):
 			if not sports:
 					logger.error("Failed to fetch sports data")
 					return
 
 			all_valuebets = []
-			self.markets = markets.split(',') if markets else self.markets
+			self.use_markets(markets)
 
 			for sport in sports:
 					try:
-							odds = get_cached_odds(sport=sport['key'])
+							odds = get_event_table(sport['key'], tables)
 							if not odds:
 									continue
 
-							valuebets = self._calculate_valuebets(odds, sport['group'])
+							valuebets = self.analyze_sport(sport, odds)
 							all_valuebets.extend(valuebets)
-							update_sport_db_count(key=sport['key'], valuebets=len(all_valuebets))
+							update_sport_db_count(key=sport['key'], values=len(valuebets))
 
 					except Exception as e:
 							logger.error(f"ValueBet - Error processing sport {sport['key']}: {str(e)}")
 
-			all_valuebets.sort(key=lambda x: x['expected_value'], reverse=True)
-			save_json('arb:valuebets', all_valuebets)
+			self.publish(all_valuebets)
+
+	def use_markets(self, markets):
+			self.markets = markets.split(',') if markets else ['h2h', 'spreads', 'totals']
+
+	def analyze_sport(self, sport, odds):
+			if not self.incremental:
+					return self._calculate_valuebets(odds, sport['group'])
+			return calculate_incremental(
+					'valuebets', sport['key'], build_event_table(odds),
+					lambda events: self._calculate_valuebets(events, sport['group']),
+					signature=','.join(self.markets)
+			)
+
+	def publish(self, valuebets, now=None):
+			valuebets.sort(key=lambda x: x['expected_value'], reverse=True)
+			save_json('arb:valuebets', valuebets, now=now)
+			publish_view('valuebets', now=now)
 
 	# -------------------------------------------------------
 	#               EVENT → MARKET → VALUEBET LOOP
 	# -------------------------------------------------------
 	def _calculate_valuebets(self, odds, sport_group):
 			results = []
-			for event in odds:
+			for event in build_event_table(odds):
 					for market_type in self.markets:
 							try:
 									results.extend(self._find_valuebets(event, market_type, sport_group))
 							except Exception as e:
-									logger.error(f"Error calculating valuebets for {event.get('id')}: {str(e)}")
+									logger.error(f"Error calculating valuebets for {event.id}: {str(e)}")
 			return results
 
 	# -------------------------------------------------------
 	#                  CORE VALUEBET LOGIC
 	# -------------------------------------------------------
 	def _find_valuebets(self, event, market_type, sport_group):
-			bookmakers = event.get('bookmakers', [])
-			if not bookmakers:
+			if not event.outcomes(market_type):
 					return []
 
-			market_data = self._extract_market_data(bookmakers, market_type, event)
+			market_data = self._extract_market_data(event, market_type)
 
 			# 1) Find sharp or market-average reference odds
 			sharp_ref_raw = self._find_sharp_reference(market_data)
@@ -150,46 +168,30 @@ class ValueBetsFinder:
 	# -------------------------------------------------------
 	#              MARKET (ODDS) EXTRACTION
 	# -------------------------------------------------------
-	def _extract_market_data(self, bookmakers, market_type, event):
+	def _extract_market_data(self, event, market_type):
 			"""Build aligned outcome keys per bookmaker."""
 			data = defaultdict(dict)
-			home = (event.get('home_team') or '').lower()
-			away = (event.get('away_team') or '').lower()
 
-			for bookmaker in bookmakers:
-					book_name = bookmaker.get('title')
-					if not book_name:
+			for book_name, name, point, price in event.outcomes(market_type):
+					if not name or not price:
 							continue
 
-					for market in bookmaker.get('markets', []):
-							if market.get('key') != market_type:
-									continue
-
-							for outcome in market.get('outcomes', []):
-									name = outcome.get('name')
-									price = outcome.get('price')
-									if not name or not price:
-											continue
-
-									point = outcome.get('point')
-									nm = name.lower()
-
-									# Create canonical outcome key
-									if market_type == 'h2h':
-											key = name
+					# Create canonical outcome key
+					if market_type == 'h2h':
+							key = name
 
-									elif market_type == 'spreads':
-											key = f"{name}@{point}"
+					elif market_type == 'spreads':
+							key = f"{name}@{point}"
 
-									elif market_type == 'totals':
-											key = f"{name}@{point}"
+					elif market_type == 'totals':
+							key = f"{name}@{point}"
 
-									else:
-											key = name
+					else:
+							key = name
 
-									prev = data[book_name].get(key)
-									if not prev or price > prev:
-											data[book_name][key] = price
+					prev = data[book_name].get(key)
+					if not prev or price > prev:
+							data[book_name][key] = price
 
 			return data
 
@@ -280,14 +282,15 @@ class ValueBetsFinder:
 	#                      OUTPUT
 	# -------------------------------------------------------
 	def _create_valuebet_record(self, event, sport_group, bookmaker, market_type, outcome_key, odds, ref_odds, ev, confidence):
-			key = f"{event.get('home_team')}_{event.get('away_team')}_{bookmaker}_{outcome_key}_{market_type}"
+			key = f"{event.home_team}_{event.away_team}_{bookmaker}_{outcome_key}_{market_type}"
 			if key in self.seen_valuebets:
 					return None
 			self.seen_valuebets.add(key)
 
 			return {
 					'type': 'valuebet',
-					'event': f"{event.get('home_team')} vs {event.get('away_team')}",
+					'event': event.name,
+					'event_id': event.id,
 					'sport_group': sport_group,
 					'market': market_type,
 					'bookmaker': bookmaker,
@@ -296,8 +299,8 @@ class ValueBetsFinder:
 					'reference_odds': round(float(ref_odds), 3) if ref_odds else None,
 					'expected_value': round(float(ev) * 100, 2),
 					'confidence': confidence,
-					'bookmaker_link': get_bookmaker_links(event, [bookmaker], market_type),
-					'commence_time': event.get('commence_time'),
-					'sport_title': event.get('sport_title'),
+					'bookmaker_link': event.bookmaker_links([bookmaker], market_type),
+					'commence_time': event.commence_time,
+					'sport_title': event.sport_title,
 					'unique_id': generate_valuebet_id(event, sport_group, market_type, bookmaker, outcome_key, odds, ref_odds)
 			}
\ No newline at end of file
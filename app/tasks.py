@@ -1,21 +1,23 @@
 # tasks to save to redis here and run in celery
 import os
 from app import create_app
-from celery import Celery
+from celery import Celery, chord
+from celery.signals import task_postrun
 from datetime import timedelta, datetime, timezone
-from concurrent.futures import ThreadPoolExecutor
-from app.services.surebet_finder import SurebetFinder
-from app.services.middles_finder import MiddlesFinder
-from app.services.values_finder import ValueBetsFinder
+from app.services import pipeline, cycle, cadence, quota, hot_events, cycle_metrics
 from app.utils.helpers import save_sport_to_db, get_odds_api_settings
-from app.utils.redis_helper import save_odds_data
+from app.utils.redis_helper import save_odds_data, prune_odds_index, get_cached_odds
 from app.utils.logger import setup_logging
+from app.utils import metrics_helper
 
 RUN_MODE = os.getenv("RUN_MODE", "local")
 broker = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+FINDER_MODE = os.getenv("FINDER_MODE", "chord") # chord: one analyze task per sport across workers | local: one task
+CLUSTER_WORKERS = int(os.getenv("FINDER_CLUSTER_WORKERS", 0)) # analyze tasks the chord runs at once, 0 asks the workers
 celery = Celery("sportsarb", broker=broker, backend=broker)
 app = create_app()
 celery.conf.update(app.config)
+_cluster_workers = 1 # last inspected chord concurrency, until a worker answers plan as if one task runs at a time
 
 logger = setup_logging()
 
@@ -39,50 +41,191 @@ def init_odds_api():
     return service
 
 @celery.task(name='app.tasks.find_arbitrage')
-def find_arbitrage():
-  odds_api = init_odds_api()
-  if not odds_api.fetch_results:
-    logger.info("Finder fetch disabled in settings. Task skipped.")
-    return "Skipped"
-  
-  logger.info(f"Starting odds fetch (region={odds_api.region})...")
-  sports = odds_api.get_sports()
-  for sport in sports:
-    if isinstance(sport, dict) and 'key' in sport:
+def find_arbitrage(scheduled_at=None):
+  started = cycle.start_cycle(scheduled_at)
+  if started is None:
+    return "Overlapping"
+  token, deadline = started
+  dispatched = False
+  cycle_metrics.begin(token)
+  try:
+    with app.app_context():
+      odds_api = init_odds_api()
+      if not odds_api.fetch_results:
+        logger.info("Finder fetch disabled in settings. Task skipped.")
+        return "Skipped"
+      
+      logger.info(f"Starting odds fetch (region={odds_api.region})...")
+      with cycle_metrics.stage('sports_fetch') as stage:
+        sports = odds_api.get_sports()
+        stage['items'] = len(sports)
+      with cycle_metrics.stage('sports_db') as stage:
+        for sport in sports:
+          if isinstance(sport, dict) and 'key' in sport:
+            try:
+              save_sport_to_db(sport) # save to database return sports
+              stage['items'] += 1
+            except Exception as e:
+              print(f"Error saving sport {sport.get('key')}: {e}")
+    
+    sports = [sport for sport in sports if isinstance(sport, dict) and 'key' in sport]
+    by_key = {sport['key']: sport for sport in sports}
+    active = list(by_key)
+    sports = cadence.due_sports(sports)
+    # hot events of the sports whose slate is not refreshed this tick
+    hot = hot_events.due_events(skip_sports=[sport['key'] for sport in sports])
+    hot = {sport_key: event_ids for sport_key, event_ids in hot.items() if sport_key in by_key}
+    if not sports and not hot:
+      return "Nothing due"
+    workers = cluster_workers() if FINDER_MODE == 'chord' else pipeline.WORKERS
+    sports = cycle.plan_sports(sports, deadline, workers=workers)
+    cost = quota.call_cost(odds_api.markets, odds_api.region)
+    hot_admitted = quota.admit([(sport_key, event_id) for sport_key, event_ids in hot.items() for event_id in event_ids], cost)
+    hot = {}
+    for sport_key, event_id in hot_admitted:
+      hot.setdefault(sport_key, []).append(event_id)
+    sports = quota.admit(sports, cost)
+    if not sports and not hot:
+      return "Over budget"
+    sport_keys = [sport['key'] for sport in sports]
+    # one fetch for the whole cycle in both modes: a single session under ODDS_API_CONCURRENCY, and a 401/429
+    # cancels every other request of the cycle. The chord only fans out the analysis.
+    with cycle_metrics.stage('odds_fetch') as stage:
       try:
-        save_sport_to_db(sport) # save to database return sports
+        all_odds = odds_api.get_all_odds(sport_keys, regions=odds_api.region)
       except Exception as e:
-        print(f"Error saving sport {sport.get('key')}: {e}")
+        logger.error(f"Error fetching odds: {e}")
+        all_odds = {}
+      stage['items'] = sum(len(odds or []) for odds in all_odds.values())
+    if odds_api.api_limit_reached:
+      logger.warning("API limit reached. Stopping analysis.")
+
+    for sport_key, odds in all_odds.items():
+      cadence.record_fetch(sport_key, odds, cost)
+    for sport_key, event_ids in hot.items():
+      odds = fetch_hot_events(odds_api, sport_key, event_ids)
+      if odds is not None:
+        all_odds[sport_key] = odds
+
+    with cycle_metrics.stage('redis_save') as stage:
+      save_odds_data(all_odds, merge=True) # sports that were not due keep their cached odds
+      stage['items'] = len(all_odds)
+    record_quota(odds_api)
+    with cycle_metrics.stage('archive') as stage:
+      odds_api.save_snapshot(all_odds, sports=by_key)
+      stage['items'] = len(all_odds)
+    print(f"[{datetime.now(timezone.utc)}] Cached odds for {len(all_odds)} sports.")
+    if not all_odds:
+      return "Nothing fetched"
+    
+    analyzed = [by_key[sport_key] for sport_key in all_odds]
+    if FINDER_MODE == 'chord':
+      # fan out one analyze task per sport on the cached odds, the callback merges, publishes and releases the lock
+      header = [analyze_sport.s(sport, odds_api.markets, deadline) for sport in analyzed]
+      # the callback releases the lock when it runs, abort_cycle when a header task or the callback fails
+      chord(header)(publish_results.s(odds_api.markets, token, active).on_error(abort_cycle.s(token=token)))
+      dispatched = True
+      logger.info(f"Dispatched {len(analyzed)} sports to the workers.")
+      return f"Dispatched {len(header)}"
+    
+    prune_odds_index(active)
+    logger.info(f"Analyzing {len(analyzed)} sports ({pipeline.EXECUTION}, {pipeline.WORKERS} workers)...")
+    
+    with app.app_context():
+      pipeline.run_finders(analyzed, odds_api.markets, tables=all_odds, deadline=deadline)
+    
+    logger.info("All finders completed successfully.")
+    return "Done"
+  finally:
+    if not dispatched:
+      end_cycle(token)
+
+def cluster_workers():
+  """
+  How many analyze tasks the chord runs at once, for deadline planning: FINDER_CLUSTER_WORKERS, else the
+  summed pool concurrency of the workers that answer inspect. Asked once per cycle, the last answer is kept
+  for cycles where no worker replies in time.
+  """
+  global _cluster_workers
+  if CLUSTER_WORKERS:
+    return CLUSTER_WORKERS
+  try:
+    stats = celery.control.inspect(timeout=1.0).stats() or {}
+    concurrency = sum(int(worker.get('pool', {}).get('max-concurrency', 0)) for worker in stats.values())
+  except Exception as e:
+    logger.warning(f"Could not inspect the workers: {e}")
+    concurrency = 0
+  if concurrency:
+    _cluster_workers = concurrency
+  return _cluster_workers
+
+@celery.task(name='app.tasks.analyze_sport')
+def analyze_sport(sport, markets, deadline=None):
+  """Analyze one sport on the odds this cycle cached. Returns [sport, results], results is None when the sport was skipped."""
+  if cycle.past_deadline(deadline):
+    logger.warning(f"Cycle past its deadline, skipping {sport['key']}")
+    return [sport, None]
   
-  all_odds = {}
-  for sport in sports:
+  odds = get_cached_odds(sport['key'])
+  if odds is None:
+    return [sport, None]
+  with app.app_context():
+    return [sport, pipeline.analyze_sport(sport, markets, tables={sport['key']: odds}, deadline=deadline)]
+
+def fetch_hot_events(odds_api, sport_key, event_ids):
+  """The cached slate of a sport with its hot events refetched, None when nothing could be refreshed."""
+  with cycle_metrics.stage('event_fetch', sport_key) as stage:
     try:
-      all_odds[sport['key']] = odds_api.get_odds(sport['key'], regions=odds_api.region)
-      if odds_api.api_limit_reached:
-        logger.warning("API limit reached. Stopping analysis.")
-        break
+      refreshed = odds_api.get_event_odds(sport_key, event_ids, regions=odds_api.region)
     except Exception as e:
-      logger.error(f"Error fetching odds for {sport['key']}: {e}")
-      continue
-    
-  save_odds_data(all_odds)
-  print(f"[{datetime.now(timezone.utc)}] Cached odds for {len(all_odds)} sports.")
-  
-  logger.info(f"Analyzing {len(sports)} sports...")
-  
-  finders = [SurebetFinder(),MiddlesFinder(), ValueBetsFinder()]
-  
-  def run_with_context(finder): 
-    with app.app_context(): 
-      finder.find_arbitrage(sports=sports, markets=odds_api.markets)
-  
-  with ThreadPoolExecutor(max_workers=3) as executor:
-    futures = [executor.submit(run_with_context, finder) for finder in finders]
-    [f.result() for f in futures] 
-  
-  logger.info("All finders completed successfully.")
-  return "Done"
+      logger.error(f"Error fetching hot events for {sport_key}: {e}")
+      return None
+    stage['items'] = len(refreshed or {})
+  hot_events.record_refresh(sport_key, event_ids, missing=odds_api.missing_events)
+  return hot_events.merge_event_odds(sport_key, refreshed) if refreshed else None
+
+def record_quota(odds_api):
+  quota.record_usage(odds_api.remaining_requests, odds_api.used_requests)
+  quota.record_region_costs(odds_api.region_costs)
+
+@celery.task(name='app.tasks.publish_results')
+def publish_results(results, markets, token=None, active=None):
+  """
+  Chord callback: merge every sport's results, update counts and publish once.
+  active lists the sport keys still in season, cached odds of the others are dropped from the index.
+  """
+  try:
+    results = [(sport, sport_results) for sport, sport_results in results]
+    fetched = [sport['key'] for sport, sport_results in results if sport_results is not None]
+    with app.app_context():
+      pipeline.publish_results(results, markets)
+    prune_odds_index(active if active is not None else fetched)
+    print(f"[{datetime.now(timezone.utc)}] Published results for {len(fetched)}/{len(results)} sports.")
+    return "Done"
+  finally:
+    if token:
+      end_cycle(token)
+
+@celery.task(name='app.tasks.abort_cycle')
+def abort_cycle(request, exc, traceback, token=None):
+  """Chord errback: the cycle failed before publish_results could end it, release the lock so the next tick can run."""
+  logger.error(f"Cycle failed in task {request.id}: {exc}")
+  if cycle.holds_lock(token): # publish_results ends the cycle itself when it fails after starting
+    end_cycle(token)
+
+def end_cycle(token):
+  """Close the cycle's metrics, release the cycle lock and start the coalesced follow-up run, if a tick was missed meanwhile."""
+  cycle_metrics.finish(token)
+  pending = cycle.finish_cycle(token)
+  if pending is not None:
+    logger.info("Starting coalesced follow-up cycle.")
+    find_arbitrage.apply_async(kwargs={'scheduled_at': pending})
   
+@task_postrun.connect
+def flush_metrics(**kwargs):
+  """Push the task's samples to redis now, the worker may sit idle until the next tick."""
+  metrics_helper.flush(force=True)
+
 @celery.task(name='app.tasks.notify_users')
 def notify_users():
   """Checks all users and sends notifications when their favorite sports/leagues get updated."""
@@ -154,9 +297,10 @@ def notify_users():
 celery.conf.beat_scheduler = "redbeat.RedBeatScheduler"
 celery.conf.redbeat_redis_url = broker  
 celery.conf.beat_schedule = {
-  'fetch-odds-every-5-minutes': {
+  'fetch-odds-every-5-minutes': { # name kept so redbeat updates its stored entry instead of adding a second one
     'task': 'app.tasks.find_arbitrage', # task here
-    'schedule': timedelta(minutes=5),  # 5 minutes
+    'schedule': timedelta(seconds=cadence.TICK), # each tick only fetches the sports that are due
+    'options': {'expires': cadence.TICK - 5} # a tick still queued when the next one fires is dropped
   },
   'notify_users': {
     'task': 'app.tasks.notify_users',
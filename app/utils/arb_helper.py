@@ -1,38 +1,155 @@
 import json
+from redis.exceptions import ResponseError
 from app.extensions import redis
+from app.utils.redis_helper import namespaced, _to_str
 from datetime import datetime, timezone, timedelta
 from collections import defaultdict, Counter
 
-def get_latest_data(key):
-  raw = redis.get(f"arb:{key}")
-  if not raw:
-    return []
+def get_latest_data(key, now=None):
+  """Items of the arb:<key> hash that have not expired yet, soonest expiry first."""
+  now = now or datetime.now(timezone.utc)
   try:
-    data = json.loads(raw)
-    if isinstance(data, list):
-      return data
-    elif isinstance(data, dict):
-      return list(data.values())
-  except Exception as e:
-    print(f"Error decoding data for {key}: {e}")
-  return []
+    live = redis.zrangebyscore(namespaced(f"arb:{key}:expiry"), f"({now.timestamp()}", "+inf")
+    if not live:
+      return []
+    raw = redis.hmget(namespaced(f"arb:{key}"), live)
+  except ResponseError as e: # old single-blob value, replaced on the next finder run
+    print(f"Error reading data for {key}: {e}")
+    return []
 
-# Profit/Bookmaker/Event/Odds
-def sort_surebet_data(raw_data, cutoff = None):
-  
+  items = []
+  for value in raw:
+    if value is None:
+      continue
+    try:
+      items.append(json.loads(value))
+    except Exception as e:
+      print(f"Error decoding data for {key}: {e}")
+  return items
+
+def get_latest_item(key, unique_id, now=None):
+  """One live item of arb:<key> by unique_id (HGET), None when missing or expired."""
+  now = now or datetime.now(timezone.utc)
+  pipe = redis.pipeline(transaction=False)
+  pipe.zscore(namespaced(f"arb:{key}:expiry"), unique_id)
+  pipe.hget(namespaced(f"arb:{key}"), unique_id)
   try:
-    parsed = json.loads(raw_data)
-  except Exception as e:
-    print("Error decoding surebets:", e)
-    return []
-  
-  if isinstance(parsed, dict):
-    items = list(parsed.values())
-  elif isinstance(parsed, list):
-    items = parsed
+    expires_at, raw = pipe.execute()
+  except ResponseError as e:
+    print(f"Error reading data for {key}: {e}")
+    return None
+  if raw is None or expires_at is None or expires_at <= now.timestamp():
+    return None
+  return json.loads(raw)
+
+DEFAULT_SORT = {'valuebets': 'profit'} # order a kind is served in without ?sort=, valuebets best expected value first
+
+def view_keys(kind):
+  return {
+    'rows': namespaced(f"view:{kind}:rows"),          # row id -> frontend row json
+    'profit': namespaced(f"view:{kind}:profit"),      # row id scored by -profit (ascending = best first)
+    'time': namespaced(f"view:{kind}:time"),          # row id scored by commence time
+    'free': namespaced(f"view:{kind}:time:free"),     # rows under the free plan cutoff, by commence time
+    'expiry': namespaced(f"view:{kind}:expiry"),      # row id scored by its item's expiry
+    'free_cutoff': namespaced(f"view:{kind}:free_cutoff"),
+    'summary': namespaced(f"view:{kind}:summary"),    # total, positive_ev, sport:<group> and market:<key> counts
+    'published': namespaced(f"view:{kind}:published")
+  }
+
+def summarize_items(items):
+  """Counters stored with each published view: total, positive_ev, sport:<group> and market:<key>."""
+  summary = Counter(total=0, positive_ev=0)
+  for item in items:
+    summary['total'] += 1
+    summary['positive_ev'] += (item.get('expected_value') or item.get('profit_margin') or 0) > 0
+    summary[f"sport:{item.get('sport_name') or item.get('sport_group')}"] += 1
+    summary[f"market:{item.get('market')}"] += 1
+  return summary
+
+def get_summary(key, now=None):
+  """
+  Counters maintained by the last publish as {"total", "positive_ev", "sports": {...}, "markets": {...}}.
+  Counts the live items instead when no view has been published yet.
+  """
+  counters = {_to_str(k): int(v) for k, v in redis.hgetall(view_keys(key)['summary']).items()}
+  if not counters:
+    counters = summarize_items(get_latest_data(key, now=now))
+  return {
+    "total": counters.get("total", 0),
+    "positive_ev": counters.get("positive_ev", 0),
+    "sports": {k.split(":", 1)[1]: v for k, v in counters.items() if k.startswith("sport:")},
+    "markets": {k.split(":", 1)[1]: v for k, v in counters.items() if k.startswith("market:")}
+  }
+
+def get_view_page(key, sort=None, page=1, limit=51, max_profit=None, now=None):
+  """
+  One page of published rows as (rows, total_pages), or None when the view can't answer
+  (not published yet, or a profit cutoff the view wasn't built for).
+  """
+  keys = view_keys(key)
+  index, low = _view_index(keys, sort or DEFAULT_SORT.get(key), max_profit)
+  if index is None:
+    return None
+  published, expired = _expired_rows(keys, now)
+  if not published:
+    return None
+  if page < 1:
+    return [], 0
+
+  # rows that expired since the publish are skipped, not deleted: the next publish drops them
+  pipe = redis.pipeline(transaction=False)
+  pipe.zcount(index, low, "+inf")
+  if expired:
+    pipe.zrangebyscore(index, low, "+inf", start=0, num=page * limit + len(expired))
+    pipe.zmscore(index, list(expired))
   else:
-    return []
-  
+    pipe.zrangebyscore(index, low, "+inf", start=(page - 1) * limit, num=limit)
+  total, members, *scores = pipe.execute()
+  if expired:
+    floor = float(low)
+    total -= sum(1 for score in scores[0] if score is not None and score >= floor)
+    members = [m for m in members if m not in expired][(page - 1) * limit:page * limit]
+  rows = redis.hmget(keys['rows'], members) if members else []
+  return [json.loads(row) for row in rows if row], (total + limit - 1) // limit
+
+def get_view_rows(key, sort=None, max_profit=None, now=None):
+  """All published rows in index order, or None when there is no published view."""
+  keys = view_keys(key)
+  published, expired = _expired_rows(keys, now)
+  if not published:
+    return None
+  index, low = _view_index(keys, sort or DEFAULT_SORT.get(key), max_profit)
+  if index is None: # time order with a cutoff the view wasn't built for
+    allowed = set(redis.zrangebyscore(keys['profit'], -max_profit, "+inf"))
+    members = [m for m in redis.zrange(keys['time'], 0, -1) if m in allowed]
+  else:
+    members = redis.zrangebyscore(index, low, "+inf")
+  members = [m for m in members if m not in expired]
+  rows = redis.hmget(keys['rows'], members) if members else []
+  return [json.loads(row) for row in rows if row]
+
+def _view_index(keys, sort, max_profit):
+  """Sorted set and minimum score to read for a sort order and an optional max profit."""
+  if sort == 'profit':
+    return keys['profit'], (-max_profit if max_profit is not None else "-inf")
+  if max_profit is None:
+    return keys['time'], "-inf"
+  free_cutoff = redis.get(keys['free_cutoff'])
+  if free_cutoff is not None and float(free_cutoff) == max_profit:
+    return keys['free'], "-inf"
+  return None, None
+
+def _expired_rows(keys, now=None):
+  """(whether a view is published, the row ids whose item expired since that publish). Reads only."""
+  now = now or datetime.now(timezone.utc)
+  pipe = redis.pipeline(transaction=False)
+  pipe.exists(keys['published'])
+  pipe.zrangebyscore(keys['expiry'], "-inf", now.timestamp())
+  published, expired = pipe.execute()
+  return bool(published), set(expired)
+
+# Profit/Bookmaker/Event/Odds
+def sort_surebet_data(items, cutoff = None):
   results = []
   for arb in items:
     # if cutoff, skip items
@@ -86,20 +203,7 @@ def sort_surebet_data(raw_data, cutoff = None):
     results.extend(arb_item)
   return results
 
-def sort_middle_data(raw_data):
-  try:
-    parsed = json.loads(raw_data)
-  except Exception as e:
-    print("Error decoding middles:", e)
-    return []
-  
-  if isinstance(parsed, dict):
-    items = list(parsed.values())
-  elif isinstance(parsed, list):
-    items = parsed
-  else:
-    return []
-  
+def sort_middle_data(items):
   results = []
   for middle in items:
     # Format date/time
@@ -129,7 +233,7 @@ def sort_middle_data(raw_data):
       bookmaker_link = links.get(bookmaker_name, "")
       x_item = {
         "middle_id": middle['unique_id'],
-        "profit": round(middle.get('profit_margin', 0), 2),
+        "profit": round(middle.get('profit_margin', middle.get('expected_value', 0)), 2),
         "bookmaker": bookmaker_name,
         "bookmaker_link": bookmaker_link,
         "event": event_label,
@@ -151,21 +255,7 @@ def sort_middle_data(raw_data):
     results.extend(middle_item)
   return results
 
-def sort_valuebets_data(raw_data):
-  
-  try:
-    parsed = json.loads(raw_data)
-  except Exception as e:
-    print("Error decoding middles:", e)
-    return []
-  
-  if isinstance(parsed, dict):
-    items = list(parsed.values())
-  elif isinstance(parsed, list):
-    items = parsed
-  else:
-    return []
-  
+def sort_valuebets_data(items):
   results = []
   for vb in items:
     # --- Parse event time ---
@@ -216,55 +306,104 @@ def sort_valuebets_data(raw_data):
   
   return results
 
-def apply_filters(data, args):
-  from app.utils.helpers import parse_datetime
+FILTER_ARGS = ("commence_time", "market", "outcome_type", "sport", "bookmaker", "min_profit")
+GROUP_ID_KEYS = ("surebet_id", "middle_id", "valuebet_id")
+TIME_WINDOWS = {
+  "4h": timedelta(hours=4),
+  "8h": timedelta(hours=8),
+  "12h": timedelta(hours=12),
+  "2d": timedelta(days=2),
+  "1w": timedelta(weeks=1)
+}
+
+def apply_filters(data, args, now=None):
+  """
+  Filter and sort frontend rows (surebets, middles or valuebets) in one pass.
+  Rows of one opportunity share a group id, outcome arity and bookmaker filters apply to the whole group.
+  """
+  predicates = [
+    predicate for predicate in (
+      _time_filter(args.get("commence_time"), now),
+      _market_filter(args.get("market", "")),
+      _sport_filter(_arg_list(args, "sport")),
+      _min_profit_filter(args.get("min_profit"))
+    ) if predicate
+  ]
+
+  outcome_types = _arg_list(args, "outcome_type")
+  bookmakers = {b.lower() for b in _arg_list(args, "bookmaker")}
+  if outcome_types or bookmakers:
+    # single grouping pass: rows per group and the bookmakers each group needs
+    counts, books = Counter(), defaultdict(set)
+    for d in data:
+      group = _group_id(d)
+      counts[group] += 1
+      books[group].add(str(d.get("bookmaker", "")).lower())
+    arity = {"2way": 2, "3way": 3}
+    allowed = {arity[x] for x in outcome_types if x in arity}
+    if outcome_types:
+      predicates.append(lambda d: counts[_group_id(d)] in allowed)
+    if bookmakers:
+      predicates.append(lambda d: books[_group_id(d)] <= bookmakers)
+
+  if predicates:
+    data = [d for d in data if all(predicate(d) for predicate in predicates)]
+
   sort = args.get("sort")
-  market = args.get("market", "")
-  outcome_types = args.get("outcome_type", "")
-  outcome_types = [x for x in outcome_types.split(",") if x]
-  commence_time_filter = args.get("commence_time")
-
-  # Time filtering
-  if commence_time_filter:
-    now = datetime.now(timezone.utc)
-    time_map = {
-      "4h": timedelta(hours=4),
-      "8h": timedelta(hours=8),
-      "12h": timedelta(hours=12),
-      "2d": timedelta(days=2),
-      "1w": timedelta(weeks=1)
-    }
-    if commence_time_filter in time_map:
-      limit_time = now + time_map[commence_time_filter]
-      data = [
-        d for d in data
-        if d.get("commence_time") 
-        and parse_datetime(d["commence_time"]) <= limit_time
-      ]
-
-  # Market
-  if market:
-    data = [d for d in data if d.get("market_type") == market]
-
-  # Sort
   if sort == "profit":
-    data.sort(key=lambda x: x.get("profit", 0), reverse=True)
+    data.sort(key=_row_profit, reverse=True)
   elif sort == "time":
-    data.sort(key=lambda x: x.get("commence_time", ""))
-
-  # Outcome filter
-  if outcome_types:
-    filtered = []
-    ids = {d["surebet_id"] for d in data}
-    for sid in ids:
-      count = count_bookmakers_by_surebet_id(data, sid)
-      if ("2way" in outcome_types and count == 2) or \
-        ("3way" in outcome_types and count == 3):
-        filtered.extend([d for d in data if d["surebet_id"] == sid])
-    data = filtered
-
+    data.sort(key=_row_time)
   return data
 
+def _arg_list(args, name):
+  return [x for x in (args.get(name) or "").split(",") if x]
+
+def _group_id(row):
+  for key in GROUP_ID_KEYS:
+    if key in row:
+      return row[key]
+  return id(row)
+
+def _row_time(row):
+  return row.get("commence_time") or row.get("start_time") or ""
+
+def _row_profit(row):
+  return row.get("profit", row.get("expected_value", 0)) or 0
+
+def _time_filter(window, now=None):
+  from app.utils.helpers import parse_datetime
+  if window not in TIME_WINDOWS:
+    return None
+  limit_time = (now or datetime.now(timezone.utc)) + TIME_WINDOWS[window]
+  parsed = {}
+
+  def starts_in_window(row):
+    start = _row_time(row)
+    if start not in parsed: # rows of one event share the same start time
+      dt = parse_datetime(start) if start else None
+      parsed[start] = dt is not None and (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)) <= limit_time
+    return parsed[start]
+  return starts_in_window
+
+def _market_filter(market):
+  if not market:
+    return None
+  return lambda row: row.get("market_type", row.get("market")) == market
+
+def _sport_filter(sports):
+  if not sports:
+    return None
+  sports = {s.lower() for s in sports}
+  return lambda row: any(str(row.get(key, "")).lower() in sports for key in ("sport_name", "sport", "tournament"))
+
+def _min_profit_filter(min_profit):
+  try:
+    min_profit = float(min_profit)
+  except (TypeError, ValueError):
+    return None
+  return lambda row: _row_profit(row) >= min_profit
+
 def get_bookmaker_links(event, selected_bookmakers, market_key):
   links = {}
   for bookmaker in event.get("bookmakers", []):
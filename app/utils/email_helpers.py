@@ -1,6 +1,7 @@
 import re
 from flask_mail import Message
 from app.extensions import mail
+from app.utils import metrics_helper
 
 def validate_email_address(email:str):
   pattern = re.compile(r"\"?([-a-zA-Z0-9.`?{}]+@\w+\.\w+)\"?")
@@ -14,4 +15,9 @@ def send_otp_mail(user):
 def send_email(to:str, subject:str, body:str):
   msg = Message(subject=subject, sender="noreply@surebets.com", recipients=[to])
   msg.body = body
-  mail.send(msg)
\ No newline at end of file
+  try:
+    mail.send(msg)
+  except Exception:
+    metrics_helper.inc('notifications_sent_total', channel='email', result='error')
+    raise
+  metrics_helper.inc('notifications_sent_total', channel='email', result='sent')
\ No newline at end of file
@@ -1,12 +1,73 @@
-import logging, os
+import logging, os, json, random, atexit, queue
+from logging.handlers import QueueHandler, QueueListener
 
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')                    # text | json
+LOG_QUEUE = os.getenv('LOG_QUEUE', 'true').lower() == 'true'    # write the file from a background thread
+DEBUG_SAMPLE = float(os.getenv('LOG_DEBUG_SAMPLE', 0.01))       # share of per-event debug records kept
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
 
+_listener = None
+
+# Logging.
+# Callers log through the returned logging module (the root logger). By default records are put on a queue and
+# a listener thread formats and appends them to static/<filename>, so a cycle never waits on file I/O. Hot paths
+# (per event, per line) don't log at INFO: the finders count what they saw and log one summary per sport, and
+# cycle_metrics logs one per cycle. Per-event detail is DEBUG, sampled with sample_event() so even at DEBUG only
+# LOG_DEBUG_SAMPLE of the events are written. LOG_FORMAT=json writes one JSON object per line, with the
+# record's `extra` fields as keys.
 def setup_logging(filename='arbitrage_finder.log'):
+  global _listener
+  root = logging.getLogger()
+  if root.handlers: # configured already, or by the embedding process (tests, celery)
+    return logging
+
   base_dir = os.path.abspath(os.path.dirname(__file__))
   log_path = os.path.join(base_dir, '../static', filename)
-  logging.basicConfig(
-    filename=log_path,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-  )
+  handler = logging.FileHandler(log_path)
+  handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+  root.setLevel(LOG_LEVEL)
+  if not LOG_QUEUE:
+    root.addHandler(handler)
+    return logging
+
+  records = queue.SimpleQueue()
+  root.addHandler(QueueHandler(records))
+  _listener = QueueListener(records, handler, respect_handler_level=True)
+  _listener.start()
+  atexit.register(_stop_listener)
+  if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener) # the listener thread does not survive a fork
   return logging
+
+def sample_event(rate=None):
+  """True for a sampled share of calls when DEBUG is enabled. Guard per-event debug records with it."""
+  if not logging.getLogger().isEnabledFor(logging.DEBUG):
+    return False
+  return random.random() < (DEBUG_SAMPLE if rate is None else rate)
+
+class JsonFormatter(logging.Formatter):
+  def format(self, record):
+    entry = {
+      'time': self.formatTime(record),
+      'level': record.levelname,
+      'message': record.getMessage()
+    }
+    entry.update({key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS})
+    if record.exc_info:
+      entry['exc_info'] = self.formatException(record.exc_info)
+    return json.dumps(entry, default=str)
+
+def _stop_listener():
+  """Flush the queue and stop the thread, once."""
+  global _listener
+  listener, _listener = _listener, None
+  if listener is not None:
+    listener.stop()
+
+def _restart_listener():
+  global _listener
+  if _listener is not None:
+    _listener = QueueListener(_listener.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from redis import Redis
+from redis.client import Pipeline
+from app.utils.logger import setup_logging
+
+logger = setup_logging()
+
+FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5)) # how often a process pushes its samples to redis
+METRICS_KEY = "metrics:prom" # [sample name, [[label, value], ...]] -> value, summed over every process
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+METRICS = {
+  'http_request_duration_seconds': ('histogram', 'Flask request latency by blueprint route.', LATENCY_BUCKETS),
+  'redis_command_duration_seconds': ('histogram', 'Redis round trip latency by command (pipelines count once).', LATENCY_BUCKETS),
+  'redis_payload_bytes_total': ('counter', 'Bytes sent to and received from redis by command.', None),
+  'finder_stage_duration_seconds': ('histogram', 'Wall time of one run of a finder cycle stage.', STAGE_BUCKETS),
+  'finder_cycle_duration_seconds': ('histogram', 'Wall time of a finder cycle from dispatch to publish.', STAGE_BUCKETS),
+  'opportunities_found_total': ('counter', 'Opportunities published by the finders, by type.', None),
+  'notifications_sent_total': ('counter', 'User notifications sent, by channel and result.', None)
+}
+
+_lock = threading.Lock()
+_pending = defaultdict(float)
+_last_flush = time.monotonic()
+_flushing = False
+
+# Prometheus metrics.
+# The web app, the celery worker and the beat run in separate processes (and containers), and only the web
+# app serves http, so samples are summed in redis: each process keeps counters and histogram buckets in memory
+# and adds them to one hash (metrics:prom) with HINCRBYFLOAT at most every METRICS_FLUSH_SECONDS, and after
+# every celery task. GET /metrics flushes its own process and renders the hash in the text exposition format,
+# plus gauges read from state the app already keeps in redis (quota, published opportunities).
+def inc(name, value=1, **labels):
+  """Add `value` to a counter."""
+  field = _field(name, tuple(sorted(labels.items())))
+  with _lock:
+    _pending[field] += value
+  flush()
+
+def observe(name, value, **labels):
+  """Record one observation of a histogram."""
+  buckets = METRICS[name][2]
+  *bucket_fields, inf_field, sum_field, count_field = _histogram_fields(name, tuple(sorted(labels.items())))
+  with _lock:
+    for bound, field in zip(buckets, bucket_fields):
+      if value <= bound:
+        _pending[field] += 1
+    _pending[inf_field] += 1
+    _pending[sum_field] += value
+    _pending[count_field] += 1
+  flush()
+
+def flush(force=False):
+  """Push this process's samples to redis, every FLUSH_SECONDS unless forced. Metrics never fail the caller."""
+  global _pending, _last_flush, _flushing
+  with _lock:
+    if _flushing or not _pending or (not force and time.monotonic() - _last_flush < FLUSH_SECONDS):
+      return
+    samples, _pending = _pending, defaultdict(float)
+    _last_flush = time.monotonic()
+    _flushing = True
+  try:
+    client = _redis()
+    pipe = Pipeline(client.connection_pool, client.response_callbacks, False, None) # plain pipeline, not counted itself
+    for field, value in samples.items():
+      pipe.hincrbyfloat(METRICS_KEY, field, value)
+    pipe.execute()
+  except Exception as e:
+    logger.warning(f"Could not flush metrics: {e}")
+  finally:
+    with _lock:
+      _flushing = False
+
+def render():
+  """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+  flush(force=True)
+  families = defaultdict(list)
+  for field, value in _redis().hgetall(METRICS_KEY).items():
+    sample, labels = json.loads(field)
+    families[_family(sample)].append((sample, dict(labels), float(value)))
+
+  lines = []
+  for name, (kind, help_text, buckets) in METRICS.items():
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    found = families.get(name, [])
+    if kind == 'histogram':
+      found = _fill_buckets(name, buckets, found)
+    for sample, labels, value in sorted(found, key=_sample_order):
+      lines.append(f"{sample}{_labels(labels)} {_format(value)}")
+  for name, help_text, samples in _gauges():
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    lines += [f"{name}{_labels(labels)} {_format(value)}" for labels, value in samples]
+  return "\n".join(lines) + "\n"
+
+def _gauges():
+  from app.services import quota, pipeline
+  from app.utils.redis_helper import redis, _to_str
+  state = {_to_str(k): float(v) for k, v in redis.hgetall(quota.STATE_KEY).items()}
+  published = [({'type': kind}, redis.hlen(f"arb:{kind}")) for kind in pipeline.FINDERS]
+  return [
+    ('odds_api_requests_remaining', 'Odds API requests left in the billing window, as last reported.',
+     [({}, state['remaining'])] if 'remaining' in state else []),
+    ('odds_api_requests_used', 'Odds API requests used in the billing window, as last reported.',
+     [({}, state['used'])] if 'used' in state else []),
+    ('opportunities_published', 'Opportunities currently published, by type.', published)
+  ]
+
+@lru_cache(maxsize=4096)
+def _field(sample, labels):
+  return json.dumps([sample, [[key, str(value)] for key, value in labels]])
+
+@lru_cache(maxsize=1024)
+def _histogram_fields(name, labels):
+  """Fields of every bucket, then +Inf, _sum and _count."""
+  buckets = [_field(f"{name}_bucket", tuple(sorted(labels + (('le', _format(bound)),)))) for bound in METRICS[name][2]]
+  return buckets + [
+    _field(f"{name}_bucket", tuple(sorted(labels + (('le', '+Inf'),)))),
+    _field(f"{name}_sum", labels),
+    _field(f"{name}_count", labels)
+  ]
+
+def _fill_buckets(name, buckets, found):
+  """Buckets no observation fell into are never written, they are rendered as 0."""
+  present = {(tuple(sorted(labels.items()))) for sample, labels, _ in found if sample == f"{name}_bucket"}
+  for _, labels, _ in [sample for sample in found if sample[0] == f"{name}_count"]:
+    for bound in buckets:
+      bucket = {**labels, 'le': _format(bound)}
+      if tuple(sorted(bucket.items())) not in present:
+        found.append((f"{name}_bucket", bucket, 0))
+  return found
+
+def _family(sample):
+  for suffix in ('_bucket', '_sum', '_count'):
+    if sample.endswith(suffix) and sample[:-len(suffix)] in METRICS:
+      return sample[:-len(suffix)]
+  return sample
+
+def _sample_order(sample):
+  name, labels, _ = sample
+  le = labels.get('le')
+  series = sorted((key, value) for key, value in labels.items() if key != 'le')
+  return (series, name, float('inf') if le == '+Inf' else float(le or 0))
+
+def _labels(labels):
+  if not labels:
+    return ""
+  ordered = sorted(labels.items(), key=lambda item: (item[0] == 'le', item[0])) # le last, as prometheus writes it
+  escaped = {key: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for key, value in ordered}
+  return "{" + ",".join(f'{key}="{value}"' for key, value in escaped.items()) + "}"
+
+def _format(value):
+  return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _redis():
+  from app.utils.redis_helper import redis
+  return redis
+
+def _size(value):
+  if isinstance(value, (bytes, str)):
+    return len(value)
+  if isinstance(value, (list, tuple)):
+    return sum(_size(item) for item in value)
+  if isinstance(value, dict):
+    return sum(_size(key) + _size(item) for key, item in value.items())
+  return 0
+
+class InstrumentedRedis(Redis):
+  """Redis client that times every command and counts the bytes sent and received."""
+
+  def execute_command(self, *args, **options):
+    started = time.perf_counter()
+    response = None
+    try:
+      response = super().execute_command(*args, **options)
+      return response
+    finally:
+      _record_redis(str(args[0]).lower(), time.perf_counter() - started, _size(args[1:]), _size(response))
+
+  def pipeline(self, transaction=True, shard_hint=None):
+    return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+class InstrumentedPipeline(Pipeline):
+  def execute(self, raise_on_error=True):
+    sent = sum(_size(args[1:]) for args, _ in self.command_stack)
+    started = time.perf_counter()
+    response = None
+    try:
+      response = super().execute(raise_on_error)
+      return response
+    finally:
+      _record_redis('pipeline', time.perf_counter() - started, sent, _size(response))
+
+def _record_redis(command, seconds, sent, received):
+  observe('redis_command_duration_seconds', seconds, command=command)
+  if sent:
+    inc('redis_payload_bytes_total', sent, command=command, direction='sent')
+  if received:
+    inc('redis_payload_bytes_total', received, command=command, direction='received')
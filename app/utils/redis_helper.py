@@ -1,7 +1,11 @@
 import json
 import os
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta, timezone
 from redis import Redis, from_url
+from app.utils.metrics_helper import InstrumentedRedis
 
 RUN_MODE = os.getenv("RUN_MODE", "local")
 
@@ -10,27 +14,147 @@ if RUN_MODE == "docker":
 else:
   REDIS_URL = "redis://localhost:6379/0"
   
-redis = from_url(REDIS_URL)
-def save_json(redis_key: str, new_items: list, expire_hours:int = 1):
-  existing_raw = redis.get(redis_key)
-  existing = json.loads(existing_raw) if existing_raw else {}
+redis = InstrumentedRedis.from_url(REDIS_URL)
+_namespace = ContextVar('redis_namespace', default='') # prefix of the odds, results and view keys, '' for live data
 
+def namespaced(key):
+  """The odds, results or view `key` in the current namespace: live keys as they are, replay keys prefixed."""
+  return f"{_namespace.get()}{key}"
+
+@contextmanager
+def namespace(prefix):
+  """Read and write the odds, results and views under `prefix` inside the block, so replays never touch live data."""
+  token = _namespace.set(prefix)
+  try:
+    yield prefix
+  finally:
+    _namespace.reset(token)
+
+def save_json(redis_key: str, new_items: list, expire_hours:int = 1, now=None):
+  """
+  Upsert items into the redis_key hash (unique_id -> item) in one MULTI/EXEC.
+  Each item expires at its commence_time, or expire_hours after it was last written, whichever comes first.
+  Expiry times live in the redis_key:expiry sorted set; expired items are pruned on every write.
+  """
+  now = now or datetime.now(timezone.utc)
+  latest = now + timedelta(hours=expire_hours)
+  redis_key = namespaced(redis_key)
+  expiry_key = f"{redis_key}:expiry"
+
+  items, expiry = {}, {}
   for item in new_items:
     uid = item["unique_id"]
-    existing[uid] = item
+    items[uid] = json.dumps(item)
+    expiry[uid] = min(_parse_time(item.get("commence_time")) or latest, latest).timestamp()
+
+  def upsert(pipe):
+    legacy = _to_str(pipe.type(redis_key)) not in ("hash", "none") # old single-blob value
+    expired = [] if legacy else pipe.zrangebyscore(expiry_key, "-inf", now.timestamp())
+    pipe.multi()
+    if legacy:
+      pipe.delete(redis_key, expiry_key)
+    if expired:
+      pipe.hdel(redis_key, *expired)
+      pipe.zrem(expiry_key, *expired)
+    if items:
+      pipe.hset(redis_key, mapping=items)
+      pipe.zadd(expiry_key, expiry)
+    pipe.expire(redis_key, timedelta(hours=expire_hours))
+    pipe.expire(expiry_key, timedelta(hours=expire_hours))
+    return len(expired)
 
-  redis.set(redis_key, json.dumps(existing), ex=timedelta(hours=expire_hours))
-  print(f"[+] Updated {redis_key} ({len(new_items)} new items, total={len(existing)})")
+  expired = redis.transaction(upsert, redis_key, expiry_key, value_from_callable=True)
+  print(f"[+] Updated {redis_key} ({len(new_items)} new items, {expired} expired)")
 
-def save_odds_data(data, expire_hours=1):
-  redis.set("odds:data", json.dumps(data), ex=timedelta(hours=expire_hours))
-  redis.set("odds:latest", datetime.now(timezone.utc).isoformat())
+def _parse_time(value):
+  try:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+  except Exception:
+    return None
+  return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def save_odds_data(data, expire_hours=1, merge=False):
+  """
+  Store odds per sport (odds:sport:<key>) with an index of sport -> updated time.
+  With merge=True only the given sports are updated and the rest of the index is kept.
+  """
+  updated_at = datetime.now(timezone.utc).isoformat()
+  index_key = namespaced("odds:index")
+  pipe = redis.pipeline()
+  for sport, odds in data.items():
+    pipe.set(namespaced(f"odds:sport:{sport}"), json.dumps(odds), ex=timedelta(hours=expire_hours))
+  
+  if not merge:
+    pipe.delete(index_key, namespaced("odds:data")) # odds:data is the old single-blob key
+  if data:
+    pipe.hset(index_key, mapping={sport: updated_at for sport in data})
+    pipe.expire(index_key, timedelta(hours=expire_hours))
+  pipe.incr(namespaced("odds:version"))
+  pipe.set(namespaced("odds:latest"), updated_at)
+  pipe.execute()
   return "Done"
 
+def prune_odds_index(sports):
+  """Drop index entries of sports that were not refreshed this cycle."""
+  keep = set(sports)
+  stale = [sport for sport in get_odds_index() if sport not in keep]
+  if stale:
+    redis.hdel(namespaced("odds:index"), *stale)
+  return stale
+
 def get_cached_odds(sport):
-  data = redis.get("odds:data")
-  odds = json.loads(data) if data else {}
-  return odds.get(sport)
+  data = redis.get(namespaced(f"odds:sport:{sport}"))
+  return json.loads(data) if data else None
+
+def get_odds_index():
+  """Returns {sport_key: updated_at} for the odds currently cached."""
+  index = redis.hgetall(namespaced("odds:index"))
+  return {_to_str(k): _to_str(v) for k, v in index.items()}
+
+def get_odds_version():
+  version = redis.get(namespaced("odds:version"))
+  return int(version) if version else 0
+
+def get_event_results(kind, sport):
+  """Per-event results of the last cycle: {event_id: {"fingerprint": ..., "items": [...]}}."""
+  cached = redis.hgetall(namespaced(f"arb:events:{kind}:{sport}"))
+  return {_to_str(k): json.loads(v) for k, v in cached.items()}
+
+def save_event_results(kind, sport, updated, removed=(), expire_hours=1):
+  """Write the results of recomputed events and drop the events that left the slate."""
+  key = namespaced(f"arb:events:{kind}:{sport}")
+  pipe = redis.pipeline()
+  if removed:
+    pipe.hdel(key, *removed)
+  if updated:
+    pipe.hset(key, mapping={event_id: json.dumps(entry) for event_id, entry in updated.items()})
+  pipe.expire(key, timedelta(hours=expire_hours))
+  pipe.execute()
+
+def acquire_lock(key, ttl_seconds):
+  """SET NX lease, returns the owner token or None when someone else holds it."""
+  token = uuid.uuid4().hex
+  return token if redis.set(key, token, nx=True, ex=ttl_seconds) else None
+
+def release_lock(key, token):
+  """Delete the lease only if it is still ours. False when it expired or changed hands."""
+  def release(pipe):
+    if _to_str(pipe.get(key)) != token:
+      return False
+    pipe.multi()
+    pipe.delete(key)
+    return True
+  return redis.transaction(release, key, value_from_callable=True)
+
+def save_sport_stats(sport, stats):
+  redis.hset("cycle:sport_stats", sport, json.dumps(stats))
+
+def get_sport_stats():
+  """{sport_key: {"seconds": ..., "found": ..., "at": ...}} from previous cycles."""
+  return {_to_str(k): json.loads(v) for k, v in redis.hgetall("cycle:sport_stats").items()}
+
+def _to_str(value):
+  return value.decode() if isinstance(value, bytes) else value
 
 def get_keys_by_prefix(prefix):
   return redis.keys(f"{prefix}:*")
@@ -0,0 +1,58 @@
+import json
+from datetime import datetime, timezone, timedelta
+from app.utils.redis_helper import redis, namespaced, _parse_time, _to_str
+from app.utils.arb_helper import view_keys, summarize_items, sort_surebet_data, sort_middle_data, sort_valuebets_data
+
+RENDERERS = {
+  'surebets': sort_surebet_data,
+  'middles': sort_middle_data,
+  'valuebets': sort_valuebets_data
+}
+
+# Published API views.
+# After every finder run the live arb:<kind> items are rendered once into the rows the frontend expects,
+# so api requests page through sorted sets with range reads instead of parsing and formatting every item.
+# Row ids are "<unique_id>:<n>", which keeps the rows of one opportunity next to each other on equal scores.
+def publish_view(kind, free_cutoff=None, expire_hours=1, now=None):
+  now = now or datetime.now(timezone.utc)
+  live = redis.zrangebyscore(namespaced(f"arb:{kind}:expiry"), f"({now.timestamp()}", "+inf", withscores=True)
+  raw = redis.hmget(namespaced(f"arb:{kind}"), [uid for uid, _ in live]) if live else []
+
+  rows, by_profit, by_time, free_by_time, expiry = {}, {}, {}, {}, {}
+  items = []
+  for (uid, expires_at), value in zip(live, raw):
+    if value is None:
+      continue
+    item = json.loads(value)
+    items.append(item)
+    profit = float(item.get('profit_margin', item.get('expected_value')) or 0) # as _row_profit scores the rows
+    start = _parse_time(item.get('commence_time'))
+    start = start.timestamp() if start else expires_at
+
+    for idx, row in enumerate(RENDERERS[kind]([item])):
+      row_id = f"{_to_str(uid)}:{idx}"
+      rows[row_id] = json.dumps(row)
+      by_profit[row_id] = -profit
+      by_time[row_id] = start
+      expiry[row_id] = expires_at
+      if free_cutoff is not None and profit <= free_cutoff:
+        free_by_time[row_id] = start
+
+  keys = view_keys(kind)
+  pipe = redis.pipeline() # MULTI/EXEC, readers see either the old or the new view
+  pipe.delete(*keys.values())
+  if rows:
+    pipe.hset(keys['rows'], mapping=rows)
+    pipe.zadd(keys['profit'], by_profit)
+    pipe.zadd(keys['time'], by_time)
+    pipe.zadd(keys['expiry'], expiry)
+  if free_cutoff is not None:
+    pipe.set(keys['free_cutoff'], free_cutoff)
+    if free_by_time:
+      pipe.zadd(keys['free'], free_by_time)
+  pipe.hset(keys['summary'], mapping=summarize_items(items))
+  pipe.set(keys['published'], now.isoformat())
+  for key in keys.values():
+    pipe.expire(key, timedelta(hours=expire_hours))
+  pipe.execute()
+  print(f"[+] Published view:{kind} ({len(rows)} rows)")
@@ -2,6 +2,7 @@ from pywebpush import webpush, WebPushException
 import json
 import os
 from app.extensions import db
+from app.utils import metrics_helper
 
 
 VAPID_PRIVATE_KEY = os.getenv('VAPID_PRIVATE_KEY')
@@ -15,9 +16,11 @@ def send_webpush(subscription_info, title, body):
       vapid_private_key=VAPID_PRIVATE_KEY,
       vapid_claims=VAPID_CLAIMS
     )
+    metrics_helper.inc('notifications_sent_total', channel='webpush', result='sent')
   except WebPushException as ex:
     # Chrome returns 410 or 404 when a subscription is dead
     if ex.response and ex.response.status_code in [404, 410]:
+      metrics_helper.inc('notifications_sent_total', channel='webpush', result='expired')
       print("Deleting expired subscription...")
       # You can either delete it here or mark inactive
       # Example:
@@ -27,4 +30,5 @@ def send_webpush(subscription_info, title, body):
         alert.webpush_info = None
         db.session.commit()
     else:
+      metrics_helper.inc('notifications_sent_total', channel='webpush', result='error')
       print("WebPush error:", repr(ex))
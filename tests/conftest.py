@@ -0,0 +1,59 @@
+import logging
+import os
+import random
+
+os.environ.setdefault("RUN_MODE", "local")
+logging.getLogger().addHandler(logging.NullHandler()) # keep the finder logs out of static/arbitrage_finder.log
+
+import pytest
+
+BOOKMAKERS = ["Bet365", "William Hill", "Paddy Power", "Betfair", "Pinnacle", "Unibet", "Coral", "Ladbrokes"]
+
+
+def make_events(n_events, seed):
+  rnd = random.Random(seed)
+  events = []
+  for idx in range(n_events):
+    home, away = f"Home Team {idx}", f"Away Team {idx}"
+    bookmakers = []
+    for title in rnd.sample(BOOKMAKERS, rnd.randint(2, len(BOOKMAKERS))):
+      h2h = [{'name': home, 'price': round(rnd.uniform(1.5, 4), 2)}, {'name': away, 'price': round(rnd.uniform(1.5, 4), 2)}]
+      if rnd.random() < 0.5:
+        h2h.append({'name': 'Draw', 'price': rnd.choice([3, 3.4, 4])}) # int prices must survive as ints
+      spread = rnd.choice([-1.5, -0.5, 0.0, 0.5])
+      home_name = home if rnd.random() < 0.9 else home.lower()
+      total = rnd.choice([2.5, 3.5, 2])
+      markets = [
+        {'key': 'h2h', 'outcomes': h2h},
+        {'key': 'spreads', 'outcomes': [
+          {'name': home_name, 'price': round(rnd.uniform(1.7, 2.3), 2), 'point': spread},
+          {'name': away, 'price': round(rnd.uniform(1.7, 2.3), 2), 'point': -spread if rnd.random() < 0.8 else spread + 1}
+        ]},
+        {'key': 'totals', 'outcomes': [
+          {'name': 'Over', 'price': round(rnd.uniform(1.7, 2.3), 2), 'point': total},
+          {'name': 'Under', 'price': round(rnd.uniform(1.7, 2.3), 2), 'point': total if rnd.random() < 0.8 else total + 1}
+        ]}
+      ]
+      rnd.shuffle(markets)
+      bookmakers.append({'key': title.lower(), 'title': title, 'link': f"https://{title}.example/{idx}", 'markets': markets})
+    events.append({
+      'id': f"event-{idx}",
+      'sport_title': 'EPL',
+      'commence_time': '2026-10-18T15:00:00Z',
+      'home_team': home,
+      'away_team': away,
+      'bookmakers': bookmakers
+    })
+  return events
+
+
+@pytest.fixture
+def store(monkeypatch):
+  """Results and views on one fake redis: bytes for the writers, decoded for arb_helper like the api client."""
+  fakeredis = pytest.importorskip("fakeredis")
+  from app.utils import redis_helper, arb_helper, view_helper
+  server = fakeredis.FakeServer()
+  monkeypatch.setattr(redis_helper, "redis", fakeredis.FakeRedis(server=server))
+  monkeypatch.setattr(view_helper, "redis", redis_helper.redis)
+  monkeypatch.setattr(arb_helper, "redis", fakeredis.FakeRedis(server=server, decode_responses=True))
+  return redis_helper.redis
@@ -0,0 +1,198 @@
+import json
+import pytest
+from unittest import mock
+from datetime import datetime, timezone, timedelta
+
+from app.utils import arb_helper
+from app.utils.redis_helper import save_json
+from app.utils.view_helper import publish_view
+from app.utils.arb_helper import apply_filters, get_latest_item, get_summary, get_view_page, get_view_rows, summarize_items, sort_middle_data, sort_valuebets_data
+
+NOW = datetime(2026, 1, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def start(hours):
+  return (NOW + timedelta(hours=hours)).isoformat().replace('+00:00', 'Z')
+
+
+def valuebet(idx, ev, hours, sport='Soccer', market='h2h', bookmaker='Sky Bet'):
+  return {
+    'unique_id': f"vb{idx}", 'event': f"Home {idx} vs Away {idx}", 'sport_title': 'EPL', 'sport_group': sport,
+    'market': market, 'bookmaker': bookmaker, 'team_or_outcome': f"Home {idx}", 'odds': 2.1,
+    'expected_value': ev, 'confidence': 0.7, 'commence_time': start(hours)
+  }
+
+
+def middle(idx, ev, hours, sport='Basketball', market='spreads'):
+  return {
+    'unique_id': f"mid{idx}", 'event': f"Home {idx} vs Away {idx}", 'sport_title': 'NBA', 'sport_group': sport,
+    'market': market, 'bookmakers': {'home': 'Sky Bet', 'away': 'Betfair'}, 'lines': {'home_line': -3.5, 'away_line': 4.5},
+    'odds': {'home_price': 1.95, 'away_price': 2.05}, 'expected_value': ev, 'confidence': 0.4, 'commence_time': start(hours)
+  }
+
+
+def publish(kind, items):
+  save_json(f"arb:{kind}", items, now=NOW)
+  publish_view(kind, now=NOW)
+
+
+def ids(rows):
+  return [row.get('valuebet_id') or row.get('middle_id') or row.get('surebet_id') for row in rows]
+
+
+@pytest.mark.parametrize("kind, items", [
+  ('valuebets', [valuebet(1, 3.5, 5), valuebet(2, 9.25, 2), valuebet(3, -1.0, 1), valuebet(4, 6.0, 8)]),
+  ('middles', [middle(1, -2.5, 5), middle(2, 4.75, 2), middle(3, 1.25, 1), middle(4, -0.5, 8)])
+])
+@pytest.mark.parametrize("sort", ['profit', 'time'])
+def test_view_pages_match_filtered_rows(store, kind, items, sort):
+  publish(kind, items)
+  rows = get_view_rows(kind, now=NOW)
+  filtered = apply_filters(rows, {'sort': sort}, now=NOW)
+  page, total_pages = get_view_page(kind, sort, page=1, limit=100, now=NOW)
+  assert ids(page) == ids(filtered)
+  assert total_pages == 1
+
+
+def test_valuebets_default_to_best_expected_value(store):
+  publish('valuebets', [valuebet(1, 3.5, 5), valuebet(2, 9.25, 2), valuebet(3, -1.0, 1)])
+  page, _ = get_view_page('valuebets', now=NOW)
+  assert ids(page) == ['vb2', 'vb1', 'vb3']
+  assert ids(get_view_rows('valuebets', now=NOW)) == ['vb2', 'vb1', 'vb3']
+
+
+def test_middles_default_to_start_time(store):
+  publish('middles', [middle(1, 4.0, 5), middle(2, 1.0, 2)])
+  page, _ = get_view_page('middles', now=NOW)
+  assert ids(page) == ['mid2', 'mid2', 'mid1', 'mid1'] # one row per bookmaker
+
+
+def test_pages_skip_rows_that_expired_since_the_publish(store):
+  items = [valuebet(idx, 10 - idx, hours=(idx % 3) * 0.25 + 0.1) for idx in range(9)] # a third expire every 15 minutes
+  publish('valuebets', items)
+  later = NOW + timedelta(minutes=20)
+  live = [f"vb{idx}" for idx in range(9) if (idx % 3) * 0.25 + 0.1 > 1 / 3]
+  for sort in ('profit', 'time'):
+    rows = ids(get_view_rows('valuebets', sort, now=later))
+    assert sorted(rows) == sorted(live)
+    pages = [get_view_page('valuebets', sort, page=page, limit=2, now=later) for page in (1, 2, 3, 4)]
+    assert [ids(rows_) for rows_, _ in pages] == [rows[0:2], rows[2:4], rows[4:6], []]
+    assert {total for _, total in pages} == {3}
+  assert store.hlen('view:valuebets:rows') == 9
+
+
+def surebet_rows(uid, profit, hours, books, sport='Soccer', tournament='EPL', market='h2h'):
+  """Rows of one surebet as sort_surebet_data renders them, one per bookmaker."""
+  return [{
+    'surebet_id': uid, 'profit': profit, 'bookmaker': book, 'commence_time': start(hours), 'sport_name': sport,
+    'tournament': tournament, 'market_type': market, 'odds': 2.1, 'type': 'surebet'
+  } for book in books]
+
+
+SUREBETS = (
+  surebet_rows('a', 3.5, 2, ['Sky Bet', 'Betfair']) +
+  surebet_rows('b', 1.25, 6, ['Sky Bet', 'Betfair', 'Paddy Power'], market='h2h_lay') +
+  surebet_rows('c', 0.5, 30, ['Unibet', 'Betfair'], sport='Basketball', tournament='NBA') +
+  surebet_rows('d', 6.0, 200, ['Sky Bet', 'Pinnacle', 'Betfair'], sport='Tennis', tournament='ATP')
+)
+
+
+def groups(rows):
+  return list(dict.fromkeys(ids(rows)))
+
+
+@pytest.mark.parametrize("args, expected", [
+  ({}, ['a', 'b', 'c', 'd']),
+  ({'commence_time': '4h'}, ['a']),
+  ({'commence_time': '8h'}, ['a', 'b']),
+  ({'commence_time': '2d'}, ['a', 'b', 'c']),
+  ({'commence_time': 'forever'}, ['a', 'b', 'c', 'd']), # unknown windows don't filter
+  ({'market': 'h2h_lay'}, ['b']),
+  ({'outcome_type': '2way'}, ['a', 'c']),
+  ({'outcome_type': '3way'}, ['b', 'd']),
+  ({'outcome_type': '2way,3way'}, ['a', 'b', 'c', 'd']),
+  ({'sport': 'basketball'}, ['c']),
+  ({'sport': 'EPL,atp'}, ['a', 'b', 'd']), # sport name or tournament
+  ({'bookmaker': 'sky bet,betfair'}, ['a']), # every bookmaker of the opportunity has to be allowed
+  ({'bookmaker': 'Sky Bet,Betfair,Paddy Power,Unibet'}, ['a', 'b', 'c']),
+  ({'min_profit': '1.25'}, ['a', 'b', 'd']),
+  ({'min_profit': 'abc'}, ['a', 'b', 'c', 'd']),
+  ({'commence_time': '12h', 'outcome_type': '2way', 'min_profit': '1'}, ['a']),
+  ({'sort': 'profit'}, ['d', 'a', 'b', 'c']),
+  ({'sort': 'time'}, ['a', 'b', 'c', 'd']),
+  ({'sport': 'soccer', 'sort': 'profit', 'outcome_type': '3way'}, ['b'])
+])
+def test_apply_filters(args, expected):
+  rows = [dict(row) for row in (reversed(SUREBETS) if 'sort' in args else SUREBETS)] # sorts have to reorder
+  filtered = apply_filters(rows, args, now=NOW)
+  assert groups(filtered) == expected
+  for uid in groups(filtered): # an opportunity is kept or dropped whole
+    assert ids(filtered).count(uid) == ids(SUREBETS).count(uid)
+
+
+def test_filters_group_middles_and_valuebets_by_their_own_ids():
+  middles = sort_middle_data([middle(1, 2.0, 3), middle(2, -1.0, 3)])
+  assert ids(apply_filters(middles, {'outcome_type': '2way', 'min_profit': '0'}, now=NOW)) == ['mid1', 'mid1']
+  assert ids(apply_filters(middles, {'bookmaker': 'sky bet'}, now=NOW)) == [] # both rows of a middle need the bookmaker
+
+  valuebets = sort_valuebets_data([valuebet(1, 3.0, 3), valuebet(2, 5.0, 3, bookmaker='Betfair')])
+  assert ids(apply_filters(valuebets, {'outcome_type': '2way'}, now=NOW)) == [] # one row per value bet
+  assert ids(apply_filters(valuebets, {'bookmaker': 'betfair', 'sort': 'profit'}, now=NOW)) == ['vb2']
+  assert ids(apply_filters(valuebets, {'min_profit': '4'}, now=NOW)) == ['vb2']
+
+
+def test_rows_without_a_group_id_stand_alone():
+  rows = [{'bookmaker': 'Sky Bet', 'profit': 1.0}, {'bookmaker': 'Betfair', 'profit': 2.0}]
+  assert apply_filters(rows, {'bookmaker': 'betfair'}, now=NOW) == [rows[1]]
+
+
+def test_get_latest_item_reads_one_live_item(store):
+  save_json('arb:valuebets', [valuebet(1, 3.5, 5), valuebet(2, 2.0, 1)], now=NOW)
+  assert get_latest_item('valuebets', 'vb1', now=NOW) == valuebet(1, 3.5, 5)
+  assert get_latest_item('valuebets', 'vb2', now=NOW + timedelta(minutes=59))['unique_id'] == 'vb2'
+  assert get_latest_item('valuebets', 'vb2', now=NOW + timedelta(hours=1)) is None # expired, not pruned yet
+  assert get_latest_item('valuebets', 'missing', now=NOW) is None
+
+
+def test_get_latest_item_needs_both_the_item_and_its_expiry(store):
+  save_json('arb:valuebets', [valuebet(1, 3.5, 5), valuebet(2, 2.0, 5)], now=NOW)
+  store.zrem('arb:valuebets:expiry', 'vb1')
+  store.hdel('arb:valuebets', 'vb2')
+  assert get_latest_item('valuebets', 'vb1', now=NOW) is None
+  assert get_latest_item('valuebets', 'vb2', now=NOW) is None
+
+
+def test_get_latest_item_ignores_the_old_blob(store):
+  store.set('arb:valuebets', json.dumps([valuebet(1, 3.5, 5)]))
+  store.zadd('arb:valuebets:expiry', {'vb1': (NOW + timedelta(hours=1)).timestamp()})
+  assert get_latest_item('valuebets', 'vb1', now=NOW) is None
+
+
+def test_summarize_items_counts_sports_markets_and_positive_ev():
+  items = [valuebet(1, 3.5, 5), valuebet(2, -1.0, 5, market='totals'), middle(1, 0.5, 5), {'profit_margin': 2.0, 'sport_name': 'Tennis', 'market': 'h2h'}]
+  assert summarize_items(items) == {
+    'total': 4, 'positive_ev': 3,
+    'sport:Soccer': 2, 'sport:Basketball': 1, 'sport:Tennis': 1,
+    'market:h2h': 2, 'market:totals': 1, 'market:spreads': 1
+  }
+  assert summarize_items([]) == {'total': 0, 'positive_ev': 0}
+
+
+def test_summary_is_served_from_the_published_counters(store, monkeypatch):
+  publish('valuebets', [valuebet(1, 3.5, 5), valuebet(2, -1.0, 5, market='totals'), valuebet(3, 2.0, 5, sport='Tennis')])
+  monkeypatch.setattr(arb_helper, "get_latest_data", mock.Mock(side_effect=AssertionError("payload read")))
+  assert get_summary('valuebets') == {
+    'total': 3, 'positive_ev': 2, 'sports': {'Soccer': 2, 'Tennis': 1}, 'markets': {'h2h': 2, 'totals': 1}
+  }
+
+  publish('valuebets', [valuebet(1, 3.5, 5)]) # counters follow what the next publish finds live
+  save_json('arb:valuebets', [], now=NOW + timedelta(hours=2))
+  publish_view('valuebets', now=NOW + timedelta(hours=2))
+  assert get_summary('valuebets') == {'total': 0, 'positive_ev': 0, 'sports': {}, 'markets': {}}
+
+
+def test_summary_counts_live_items_before_the_first_publish(store):
+  save_json('arb:middles', [middle(1, 0.5, 5), middle(2, -0.5, 5, market='totals')], now=NOW)
+  assert get_summary('middles', now=NOW) == {
+    'total': 2, 'positive_ev': 1, 'sports': {'Basketball': 2}, 'markets': {'spreads': 1, 'totals': 1}
+  }
@@ -0,0 +1,27 @@
+from tools import bench_finders
+
+
+def test_run_reports_every_stage():
+  report = bench_finders.run(sizes=[5], bookmakers=4, repeat=1)
+  assert set(report['results']) == {f"{stage}@5" for stage in bench_finders.STAGES}
+  for stats in report['results'].values():
+    assert stats['events'] == 5
+    assert stats['events_per_sec'] > 0
+    assert stats['peak_kib'] > 0
+
+
+def test_compare_flags_slower_and_hungrier_stages():
+  baseline = {'results': {
+    'surebets@50': {'events_per_sec': 1000.0, 'peak_kib': 100.0},
+    'middles@50': {'events_per_sec': 1000.0, 'peak_kib': 100.0}
+  }}
+  current = {'results': {
+    'surebets@50': {'events_per_sec': 700.0, 'peak_kib': 100.0},
+    'middles@50': {'events_per_sec': 900.0, 'peak_kib': 150.0},
+    'valuebets@50': {'events_per_sec': 1.0, 'peak_kib': 1.0} # not in the baseline
+  }}
+  assert bench_finders.compare(current, baseline, tolerance=0.2) == [
+    ('surebets@50', 'events_per_sec', 1000.0, 700.0),
+    ('middles@50', 'peak_kib', 100.0, 150.0)
+  ]
+  assert bench_finders.compare(current, baseline, tolerance=0.5) == []
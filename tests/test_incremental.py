@@ -0,0 +1,43 @@
+import json
+import pytest
+from datetime import datetime, timezone, timedelta
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services import pipeline, team_names
+from app.services.odds_table import build_event_table
+from app.utils import redis_helper
+from tools.synthetic_slate import make_slate
+
+SPORT = {'key': 'basketball_nba', 'group': 'Basketball', 'title': 'NBA'}
+MARKETS = 'h2h,spreads,totals'
+NOW = datetime(2026, 10, 17, 12, 0, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def store(monkeypatch):
+  client = fakeredis.FakeRedis()
+  monkeypatch.setattr(redis_helper, "redis", client)
+  monkeypatch.setattr(team_names, "redis", client)
+  return client
+
+
+def analyze(kind, odds, incremental):
+  finder = pipeline.FINDERS[kind](incremental=incremental) # fresh finder every cycle, as the pipeline runs them
+  finder.use_markets(MARKETS)
+  return sorted(json.dumps(item, sort_keys=True) for item in finder.analyze_sport(SPORT, odds))
+
+
+@pytest.mark.parametrize("kind", list(pipeline.FINDERS))
+def test_incremental_results_match_a_full_recompute(store, kind):
+  before = make_slate(SPORT['key'], 40, 'uk,eu', MARKETS, now=NOW, volatility=0.03, arb_rate=0.1)
+  after = make_slate(SPORT['key'], 40, 'uk,eu', MARKETS, now=NOW + timedelta(minutes=1), volatility=0.03, arb_rate=0.1)[:34] # six events removed
+  fingerprints = {event.id: event.fingerprint for event in build_event_table(before)}
+  changed = [event for event in build_event_table(after) if event.fingerprint != fingerprints[event.id]]
+  assert 0 < len(changed) < len(after) # the slate has changed, unchanged and removed events
+
+  analyze(kind, before, incremental=True) # warms arb:events:<kind>:<sport>
+  full = analyze(kind, after, incremental=False)
+  assert full and analyze(kind, after, incremental=True) == full
+  cached = redis_helper.get_event_results(kind, SPORT['key'])
+  assert set(cached) == {event['id'] for event in after}
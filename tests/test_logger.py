@@ -0,0 +1,62 @@
+import json
+import logging
+import pytest
+from conftest import make_events
+from app.utils import logger as log_module
+from app.services import team_names
+from app.services.surebet_finder import SurebetFinder
+
+
+@pytest.fixture
+def bare_root(monkeypatch):
+  """Root logger without handlers, as in a fresh process. Use it first thing in the test, pytest adds its own handler after setup."""
+  root = logging.getLogger()
+  monkeypatch.setattr(log_module, "_listener", None)
+  level = root.level
+  yield root
+  log_module._stop_listener()
+  root.setLevel(level)
+
+
+def test_queue_mode_writes_json_from_the_listener(bare_root, tmp_path, monkeypatch):
+  monkeypatch.setattr(bare_root, "handlers", [])
+  monkeypatch.setattr(log_module, "LOG_FORMAT", "json")
+  path = tmp_path / "finder.log"
+  log_module.setup_logging(str(path))
+  assert isinstance(bare_root.handlers[0], log_module.QueueHandler)
+
+  logging.info("Cycle finished in %ss", 1.5, extra={'cycle': {'seconds': 1.5}})
+  log_module._stop_listener() # drains the queue
+  entry = json.loads(path.read_text().splitlines()[0])
+  assert entry['message'] == "Cycle finished in 1.5s"
+  assert entry['level'] == "INFO"
+  assert entry['cycle'] == {'seconds': 1.5}
+
+
+def test_configured_root_is_left_alone(tmp_path):
+  handlers = list(logging.getLogger().handlers)
+  log_module.setup_logging(str(tmp_path / "finder.log"))
+  assert logging.getLogger().handlers == handlers
+  assert not (tmp_path / "finder.log").exists()
+
+
+def test_finder_logs_one_summary_per_sport(caplog):
+  finder = SurebetFinder(vectorized=False, incremental=False)
+  finder.use_markets('h2h,spreads,totals')
+  with team_names.isolated(), caplog.at_level(logging.INFO): # no alias store to warn about
+    arbs = finder.calculate_arbitrage(make_events(40, 1), 'Soccer')
+  assert [record.levelno for record in caplog.records] == [logging.INFO]
+  assert finder.stats['events'] == 40 and finder.stats['found'] == len(arbs)
+
+
+def test_event_debug_is_sampled(caplog, monkeypatch):
+  assert not log_module.sample_event(rate=1) # INFO level, nothing sampled
+  finder = SurebetFinder(vectorized=False, incremental=False)
+  finder.use_markets('h2h')
+  with caplog.at_level(logging.DEBUG):
+    monkeypatch.setattr(log_module, "DEBUG_SAMPLE", 0)
+    finder.calculate_arbitrage(make_events(20, 1), 'Soccer')
+    assert not [record for record in caplog.records if record.levelno == logging.DEBUG]
+    monkeypatch.setattr(log_module, "DEBUG_SAMPLE", 1)
+    finder.calculate_arbitrage(make_events(20, 1), 'Soccer')
+  assert len([record for record in caplog.records if record.levelno == logging.DEBUG]) == 20
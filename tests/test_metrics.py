@@ -0,0 +1,86 @@
+import pytest
+from unittest import mock
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app import tasks
+from app.services import cycle_metrics
+from app.utils import metrics_helper, redis_helper
+from app.routes import metrics as metrics_route
+
+
+@pytest.fixture
+def store(monkeypatch):
+  monkeypatch.setattr(redis_helper, "redis", fakeredis.FakeRedis())
+  monkeypatch.setattr(cycle_metrics, "redis", redis_helper.redis)
+  monkeypatch.setattr(metrics_helper, "_pending", metrics_helper.defaultdict(float))
+  return redis_helper.redis
+
+
+def samples(text):
+  return dict(line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#"))
+
+
+def test_histograms_and_counters_render_in_exposition_format(store):
+  metrics_helper.observe('finder_stage_duration_seconds', 0.3, stage='surebets')
+  metrics_helper.observe('finder_stage_duration_seconds', 7, stage='surebets')
+  metrics_helper.inc('opportunities_found_total', 4, type='surebets')
+  metrics_helper.inc('opportunities_found_total', 2, type='surebets')
+  text = metrics_helper.render()
+
+  assert "# TYPE finder_stage_duration_seconds histogram" in text
+  found = samples(text)
+  assert found['finder_stage_duration_seconds_bucket{stage="surebets",le="0.25"}'] == '0'
+  assert found['finder_stage_duration_seconds_bucket{stage="surebets",le="0.5"}'] == '1'
+  assert found['finder_stage_duration_seconds_bucket{stage="surebets",le="10"}'] == '2'
+  assert found['finder_stage_duration_seconds_bucket{stage="surebets",le="+Inf"}'] == '2'
+  assert found['finder_stage_duration_seconds_sum{stage="surebets"}'] == '7.3'
+  assert found['finder_stage_duration_seconds_count{stage="surebets"}'] == '2'
+  assert found['opportunities_found_total{type="surebets"}'] == '6'
+  assert found['opportunities_published{type="surebets"}'] == '0'
+  buckets = [line for line in text.splitlines() if line.startswith('finder_stage_duration_seconds_bucket')]
+  assert buckets[-1].startswith('finder_stage_duration_seconds_bucket{stage="surebets",le="+Inf"}') # buckets in ascending order
+
+
+def test_samples_of_several_processes_add_up(store):
+  metrics_helper.inc('notifications_sent_total', channel='email', result='sent')
+  metrics_helper.flush(force=True)
+  store.hincrbyfloat(metrics_helper.METRICS_KEY, metrics_helper._field('notifications_sent_total', (('channel', 'email'), ('result', 'sent'))), 2)
+  assert samples(metrics_helper.render())['notifications_sent_total{channel="email",result="sent"}'] == '3'
+
+
+def test_instrumented_client_records_commands_and_bytes(store):
+  client = metrics_helper.InstrumentedRedis(connection_pool=store.connection_pool)
+  client.set("odds:sport:x", "a" * 100)
+  assert client.get("odds:sport:x") == b"a" * 100
+  pipe = client.pipeline()
+  pipe.get("odds:sport:x").get("odds:sport:x")
+  pipe.execute()
+
+  found = samples(metrics_helper.render())
+  assert found['redis_command_duration_seconds_count{command="set"}'] == '1'
+  assert found['redis_command_duration_seconds_count{command="pipeline"}'] == '1'
+  assert int(found['redis_payload_bytes_total{command="set",direction="sent"}']) >= 100
+  assert found['redis_payload_bytes_total{command="get",direction="received"}'] == '100'
+  assert found['redis_payload_bytes_total{command="pipeline",direction="received"}'] == '200'
+
+
+def test_metrics_endpoint(store):
+  client = tasks.app.test_client()
+  response = client.get('/metrics')
+  assert response.status_code == 200
+  assert response.mimetype == 'text/plain'
+  assert 'http_request_duration_seconds' in response.get_data(as_text=True)
+
+  # the first scrape's latency shows up in the next one
+  found = samples(client.get('/metrics').get_data(as_text=True))
+  assert found['http_request_duration_seconds_count{blueprint="metrics",method="GET",route="/metrics",status="200"}'] == '1'
+  assert client.get('/metrics', environ_base={'REMOTE_ADDR': '8.8.8.8'}).status_code == 403
+  assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.5'}).status_code == 403 # private is not enough
+  with mock.patch("app.routes.metrics.ALLOWED_NETWORKS", metrics_route._networks("10.0.0.0/8, 192.168.1.7, bogus")):
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.5'}).status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '192.168.1.7'}).status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '192.168.1.8'}).status_code == 403
+  with mock.patch("app.routes.metrics.METRICS_TOKEN", "secret"):
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import pytest
+from aiohttp import web
+from app.services.odds_service import OddsService
+from tools.odds_api_stub import OddsApiStub
+from tools.synthetic_slate import make_slate
+
+
+@pytest.fixture
+def serve():
+  """Start a stub on a free port, returns the api base url."""
+  loop = asyncio.new_event_loop()
+  runners = []
+
+  def start(stub):
+    runner = web.AppRunner(stub.app())
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    loop.run_until_complete(site.start())
+    runners.append(runner)
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return f"http://127.0.0.1:{runner.addresses[0][1]}/v4"
+
+  yield start
+  for runner in runners:
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+  loop.call_soon_threadsafe(loop.stop)
+
+
+def service(base_url, **kwargs):
+  odds_service = OddsService(**kwargs)
+  odds_service.base_url = base_url
+  return odds_service
+
+
+def test_fetch_through_the_stub(serve):
+  odds_service = service(serve(OddsApiStub(sports=6, events=12, latency=0.01, jitter=0.01)), region='uk,eu')
+  sports = [sport['key'] for sport in odds_service.get_sports()]
+  assert len(sports) == 6
+
+  odds = odds_service.get_all_odds(sports, regions=odds_service.region)
+  assert set(odds) == set(sports) and all(len(events) == 12 for events in odds.values())
+  assert odds_service.used_requests == str(6 * 3 * 2)
+  assert odds_service.region_costs == {'uk': 18, 'eu': 18}
+
+  event = odds[sports[0]][0]
+  refreshed = odds_service.get_event_odds(sports[0], [event['id'], 'unknown'], regions=odds_service.region)
+  assert list(refreshed) == [event['id']]
+  assert odds_service.missing_events == {'unknown'}
+
+
+def test_stub_quota_and_errors(serve):
+  base_url = serve(OddsApiStub(sports=4, events=3, quota=6))
+  odds_service = service(base_url)
+  odds_service.concurrency = 1
+  sports = [sport['key'] for sport in odds_service.get_sports()]
+  odds = odds_service.get_all_odds(sports, regions='uk')
+  assert len(odds) == 2 and odds_service.api_limit_reached # 401 once the quota is spent
+
+  spent = service(base_url) # a failed event fetch is not a missing event
+  sport, events = next(iter(odds.items()))
+  assert spent.get_event_odds(sport, [events[0]['id']], regions='uk') == {}
+  assert spent.api_limit_reached and spent.missing_events == set()
+
+  invalid = service(base_url)
+  invalid.markets = 'h2h,player_props'
+  assert invalid.get_odds(sports[0], 'uk') == [] # 422
+
+
+def test_rate_limit_cancels_in_flight_requests(serve):
+  base_url = serve(OddsApiStub(sports=16, events=2, latency=0.05, jitter=0.04, rate_limit=1))
+
+  class TrackingService(OddsService):
+    def __init__(self, **kwargs):
+      super().__init__(**kwargs)
+      self.cancelled = 0
+
+    async def _fetch_odds_async(self, *args, **kwargs):
+      try:
+        return await super()._fetch_odds_async(*args, **kwargs)
+      except asyncio.CancelledError:
+        self.cancelled += 1
+        raise
+
+  odds_service = TrackingService()
+  odds_service.base_url = base_url
+  odds_service.concurrency = 4
+  sports = [sport['key'] for sport in odds_service.get_sports()]
+  odds = odds_service.get_all_odds(sports, regions='uk')
+  assert odds_service.api_limit_reached # 429 once more than one request a second comes in
+  assert odds_service.cancelled > 0
+  assert len(odds) + odds_service.cancelled <= len(sports) # nothing after the 429 was merged in
+
+
+def test_synthetic_slates_are_reproducible_and_move():
+  from datetime import datetime, timezone
+  now = datetime(2026, 10, 17, 12, tzinfo=timezone.utc)
+  first = make_slate('soccer_epl', 20, 'uk,eu', now=now)
+  assert first == make_slate('soccer_epl', 20, 'uk,eu', now=now)
+  later = make_slate('soccer_epl', 20, 'uk,eu', now=now.replace(minute=5))
+  moved = sum(a['bookmakers'] != b['bookmakers'] for a, b in zip(first, later))
+  assert 0 < moved <= 20
+  assert all(len(event['bookmakers']) == 9 for event in first) # williamhill listed in both regions once
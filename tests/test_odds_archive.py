@@ -0,0 +1,48 @@
+import gzip
+import json
+from conftest import make_events
+from app.services import odds_archive
+from app.services.odds_service import OddsService
+
+DAY = 86400
+START = 1792238400 # 2026-10-17T12:00:00Z
+
+
+def test_snapshots_are_appended_and_read_per_sport(tmp_path):
+  first = {'soccer_epl': make_events(5, 0), 'basketball_nba': make_events(5, 1)}
+  second = {'soccer_epl': make_events(5, 2)}
+  odds_archive.write_snapshot(first, at=START, directory=tmp_path)
+  odds_archive.write_snapshot(second, at=START + 60, directory=tmp_path)
+  odds_archive.write_snapshot(first, at=START + DAY, directory=tmp_path)
+
+  assert [entry['at'] for entry in odds_archive.list_snapshots('2026-10-17', directory=tmp_path)] == [START, START + 60]
+  assert odds_archive.find_snapshot(directory=tmp_path)['at'] == START + DAY
+  assert odds_archive.find_snapshot(START + 30, directory=tmp_path)['at'] == START
+  assert odds_archive.find_snapshot(START - 1, directory=tmp_path) is None
+
+  snapshot = odds_archive.load_snapshot(START + 90, directory=tmp_path)
+  assert snapshot['sports'] == ['soccer_epl']
+  assert snapshot['odds']['soccer_epl'] == second['soccer_epl']
+  assert snapshot['odds'].get('basketball_nba', []) == []
+
+  # the segment is still a plain gzip JSON Lines file
+  with gzip.open(tmp_path / 'odds-2026-10-17.jsonl.gz', 'rt') as segment:
+    assert [json.loads(line)['sport'] for line in segment] == ['soccer_epl', 'basketball_nba', 'soccer_epl']
+
+
+def test_old_segments_are_pruned(tmp_path, monkeypatch):
+  monkeypatch.setattr(odds_archive, 'RETENTION_DAYS', 2)
+  for day in range(4):
+    odds_archive.write_snapshot({'soccer_epl': []}, at=START + day * DAY, directory=tmp_path)
+  assert sorted(path.name for path in tmp_path.glob('*.index.jsonl')) == [
+    'odds-2026-10-18.index.jsonl', 'odds-2026-10-19.index.jsonl', 'odds-2026-10-20.index.jsonl'
+  ]
+
+
+def test_offline_service_reads_archived_snapshot(tmp_path, monkeypatch):
+  monkeypatch.setattr(odds_archive, 'ARCHIVE_DIR', str(tmp_path))
+  odds = {'soccer_epl': make_events(3, 0)}
+  OddsService(save_offline=True).save_snapshot(odds)
+  service = OddsService(use_offline=True)
+  assert service.get_all_odds(['soccer_epl', 'darts_pdc'], 'uk') == {'soccer_epl': odds['soccer_epl'], 'darts_pdc': []}
+  assert list(service.get_event_odds('soccer_epl', ['event-1'], 'uk')) == ['event-1']
@@ -0,0 +1,67 @@
+import json
+import pytest
+from datetime import datetime, timezone, timedelta
+
+from app.utils.redis_helper import save_json
+from app.utils.view_helper import publish_view
+from app.utils.arb_helper import get_latest_data, get_view_page, get_view_rows, view_keys
+
+NOW = datetime(2026, 1, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def item(uid, minutes, ev=1.0):
+  start = (NOW + timedelta(minutes=minutes)).isoformat()
+  return {'unique_id': uid, 'event': f"{uid} Home vs {uid} Away", 'commence_time': start, 'expected_value': ev,
+          'sport_group': 'Soccer', 'market': 'h2h', 'bookmaker': 'Sky Bet', 'odds': 2.0}
+
+
+def members(store, key):
+  return sorted(uid.decode() for uid in store.zrange(f"{key}:expiry", 0, -1))
+
+
+def test_items_expire_at_kickoff_or_after_expire_hours(store):
+  save_json('arb:valuebets', [item('soon', 10), item('later', 300)], now=NOW)
+  assert store.zscore('arb:valuebets:expiry', 'soon') == (NOW + timedelta(minutes=10)).timestamp()
+  assert store.zscore('arb:valuebets:expiry', 'later') == (NOW + timedelta(hours=1)).timestamp()
+
+  save_json('arb:valuebets', [item('later', 300, ev=2.5)], now=NOW + timedelta(minutes=5)) # upsert moves the expiry
+  assert json.loads(store.hget('arb:valuebets', 'later'))['expected_value'] == 2.5
+  assert store.zscore('arb:valuebets:expiry', 'later') == (NOW + timedelta(minutes=65)).timestamp()
+  assert members(store, 'arb:valuebets') == ['later', 'soon']
+
+
+def test_expired_items_leave_the_hash_and_the_index(store):
+  save_json('arb:valuebets', [item('soon', 10), item('later', 300)], now=NOW)
+  assert [i['unique_id'] for i in get_latest_data('valuebets', now=NOW + timedelta(minutes=15))] == ['later'] # hidden before the next write
+
+  save_json('arb:valuebets', [], now=NOW + timedelta(minutes=15))
+  assert sorted(uid.decode() for uid in store.hkeys('arb:valuebets')) == ['later']
+  assert members(store, 'arb:valuebets') == ['later']
+
+  save_json('arb:valuebets', [], now=NOW + timedelta(hours=2))
+  assert not store.hkeys('arb:valuebets') and not store.zrange('arb:valuebets:expiry', 0, -1)
+
+
+def test_legacy_blob_is_replaced(store):
+  store.set('arb:valuebets', json.dumps([item('old', 10)]))
+  save_json('arb:valuebets', [item('new', 10)], now=NOW)
+  assert store.type('arb:valuebets') == b'hash'
+  assert [uid.decode() for uid in store.hkeys('arb:valuebets')] == ['new']
+  assert members(store, 'arb:valuebets') == ['new']
+
+
+def test_expired_rows_leave_the_published_view(store):
+  save_json('arb:valuebets', [item('soon', 10), item('later', 300)], now=NOW)
+  publish_view('valuebets', now=NOW)
+  keys = view_keys('valuebets')
+  assert store.hlen(keys['rows']) == 2
+
+  later = NOW + timedelta(minutes=15)
+  assert [row['valuebet_id'] for row in get_view_rows('valuebets', now=later)] == ['later']
+  assert [row['valuebet_id'] for row in get_view_page('valuebets', now=later)[0]] == ['later']
+  assert store.hlen(keys['rows']) == 2 # readers skip expired rows, they never write to the view
+
+  publish_view('valuebets', now=later) # the next publish leaves the expired item out
+  assert [uid.decode() for uid in store.hkeys(keys['rows'])] == ['later:0']
+  for index in ('profit', 'time', 'expiry'):
+    assert [uid.decode() for uid in store.zrange(keys[index], 0, -1)] == ['later:0']
@@ -0,0 +1,46 @@
+import json
+import pytest
+from conftest import make_events
+from app.services.odds_table import build_event_table
+from app.services.surebet_finder import SurebetFinder
+
+
+def run_both(events, markets):
+  reference, vectorized = SurebetFinder(vectorized=False), SurebetFinder()
+  reference.markets = vectorized.markets = markets
+  return reference.calculate_arbitrage(events, 'Soccer'), vectorized.calculate_arbitrage(events, 'Soccer')
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("markets", [['h2h'], ['spreads'], ['totals'], ['h2h', 'spreads', 'totals']])
+def test_vectorized_engine_matches_python_implementation(seed, markets):
+  events = build_event_table(make_events(60, seed))
+  expected, actual = run_both(events, markets)
+  assert expected
+  assert json.dumps(actual) == json.dumps(expected)
+
+
+def test_h2h_arb_keeps_first_bookmaker_on_ties():
+  event = make_events(1, 0)[0]
+  event['bookmakers'] = [
+    {'title': 'A', 'markets': [{'key': 'h2h', 'outcomes': [{'name': 'Home Team 0', 'price': 2.2}, {'name': 'Away Team 0', 'price': 1.5}]}]},
+    {'title': 'B', 'markets': [{'key': 'h2h', 'outcomes': [{'name': 'Home Team 0', 'price': 2.2}, {'name': 'Away Team 0', 'price': 2.1}]}]},
+  ]
+  expected, actual = run_both([event], ['h2h'])
+  assert actual == expected
+  assert actual[0]['bookmakers'] == {'Home Team 0': 'A', 'Away Team 0': 'B'}
+
+
+def test_spread_sides_keep_their_own_zero_sign():
+  event = make_events(1, 0)[0]
+  event['bookmakers'] = [
+    {'title': 'A', 'markets': [{'key': 'spreads', 'outcomes': [{'name': 'Home Team 0', 'price': 2.3, 'point': 0.0}]}]},
+    {'title': 'B', 'markets': [{'key': 'spreads', 'outcomes': [{'name': 'Away Team 0', 'price': 2.1, 'point': -0.0}]}]},
+  ]
+  expected, actual = run_both([event], ['spreads'])
+  assert json.dumps(actual) == json.dumps(expected)
+  assert actual[0]['points'] == (0.0, -0.0)
+
+
+def test_no_arbs_on_empty_slate():
+  assert run_both([], ['h2h', 'spreads', 'totals']) == ([], [])
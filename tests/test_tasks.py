@@ -0,0 +1,411 @@
+import json
+import pytest
+from unittest import mock
+from conftest import make_events
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app import tasks
+from app.services import pipeline, cycle, cadence, quota, hot_events, odds_archive, replay, cycle_metrics, team_names
+from app.utils import redis_helper, arb_helper, view_helper
+
+SPORTS = [
+  {'key': 'soccer_epl', 'group': 'Soccer', 'title': 'EPL'},
+  {'key': 'basketball_nba', 'group': 'Basketball', 'title': 'NBA'},
+  {'key': 'icehockey_nhl', 'group': 'Ice Hockey', 'title': 'NHL'}
+]
+ODDS = {sport['key']: make_events(40, seed) for seed, sport in enumerate(SPORTS)}
+
+
+class FakeOddsService:
+  fetch_results = True
+  region = 'uk'
+  markets = 'h2h,spreads,totals'
+  api_limit_reached = False
+  missing_events = ()
+  remaining_requests = None
+  used_requests = None
+  region_costs = {}
+
+  def get_sports(self):
+    return SPORTS
+
+  def get_all_odds(self, sports, regions):
+    return {sport: ODDS[sport] for sport in sports if sport in ODDS}
+
+  def get_event_odds(self, sport, event_ids, regions):
+    return {event['id']: event for event in ODDS.get(sport, []) if event['id'] in event_ids}
+
+  def save_snapshot(self, all_odds, sports=None):
+    return None
+
+
+@pytest.fixture
+def worker(monkeypatch):
+  server = fakeredis.FakeServer()
+  monkeypatch.setattr(redis_helper, "redis", fakeredis.FakeRedis(server=server))
+  monkeypatch.setattr(view_helper, "redis", redis_helper.redis)
+  monkeypatch.setattr(cycle, "redis", redis_helper.redis)
+  monkeypatch.setattr(cadence, "redis", redis_helper.redis)
+  monkeypatch.setattr(quota, "redis", redis_helper.redis)
+  monkeypatch.setattr(hot_events, "redis", redis_helper.redis)
+  monkeypatch.setattr(replay, "redis", redis_helper.redis)
+  monkeypatch.setattr(cycle_metrics, "redis", redis_helper.redis)
+  monkeypatch.setattr(team_names, "redis", redis_helper.redis)
+  monkeypatch.setattr(arb_helper, "redis", fakeredis.FakeRedis(server=server, decode_responses=True))
+  monkeypatch.setattr(tasks, "init_odds_api", FakeOddsService)
+  monkeypatch.setattr(tasks, "CLUSTER_WORKERS", 4)
+  monkeypatch.setattr(tasks, "save_sport_to_db", mock.Mock())
+  monkeypatch.setattr(pipeline, "update_sport_db_count", mock.Mock())
+  monkeypatch.setattr("app.services.surebet_finder.get_config_by_name", lambda name: None)
+  monkeypatch.setattr(tasks.celery.conf, "task_always_eager", True)
+  monkeypatch.setattr(tasks.celery.conf, "task_eager_propagates", True)
+  return redis_helper.redis
+
+
+def stored(redis, kind):
+  return sorted(redis.hkeys(f"arb:{kind}"))
+
+
+def test_chord_publishes_same_results_as_single_task(worker):
+  with mock.patch.object(tasks, "FINDER_MODE", "chord"):
+    tasks.find_arbitrage.apply()
+  chord_results = {kind: stored(worker, kind) for kind in pipeline.FINDERS}
+  chord_counts = {call.kwargs['key']: call.kwargs for call in pipeline.update_sport_db_count.call_args_list}
+
+  worker.flushall()
+  pipeline.update_sport_db_count.reset_mock()
+  with mock.patch.object(tasks, "FINDER_MODE", "local"), mock.patch.object(pipeline, "EXECUTION", "inline"):
+    tasks.find_arbitrage.apply()
+  local_counts = {call.kwargs['key']: call.kwargs for call in pipeline.update_sport_db_count.call_args_list}
+
+  assert chord_results['surebets']
+  assert chord_results == {kind: stored(worker, kind) for kind in pipeline.FINDERS}
+  assert chord_counts == local_counts
+  assert set(redis_helper.get_odds_index()) == set(ODDS)
+
+
+def test_rate_limit_stops_the_whole_cycle_fetch(worker):
+  def rate_limited(self, sports, regions):
+    self.api_limit_reached = True # 429 after the first sport, the service cancels the rest
+    return {sports[0]: ODDS[sports[0]]}
+
+  with mock.patch.object(tasks, "FINDER_MODE", "chord"), \
+      mock.patch.object(FakeOddsService, "get_all_odds", autospec=True, side_effect=rate_limited) as fetch:
+    assert tasks.find_arbitrage.apply().get() == "Dispatched 1"
+  assert fetch.call_count == 1 and fetch.call_args.args[1] == list(ODDS) # one fetch per cycle, none per header task
+  assert set(redis_helper.get_odds_index()) == {SPORTS[0]['key']}
+  assert stored(worker, 'surebets') and not worker.exists(cycle.LOCK_KEY)
+
+
+def test_sport_without_odds_is_skipped(worker):
+  result = tasks.analyze_sport.apply(args=({'key': 'darts_pdc', 'group': 'Darts'}, 'h2h')).get()
+  assert result == [{'key': 'darts_pdc', 'group': 'Darts'}, None]
+
+
+def test_publish_prunes_sports_missing_from_cycle(worker):
+  redis_helper.save_odds_data({'old_sport': [], 'soccer_epl': ODDS['soccer_epl']})
+  sport = SPORTS[0]
+  results = [tasks.analyze_sport.apply(args=(sport, 'h2h')).get()]
+  tasks.publish_results.apply(args=(json.loads(json.dumps(results)), 'h2h'))
+  assert set(redis_helper.get_odds_index()) == {'soccer_epl'}
+  assert arb_helper.get_summary('surebets')['total'] == len(stored(worker, 'surebets'))
+
+
+@pytest.mark.parametrize("mode", ["chord", "local"])
+def test_cycle_stages_are_recorded(worker, mode):
+  with mock.patch.object(tasks, "FINDER_MODE", mode), mock.patch.object(pipeline, "EXECUTION", "inline"):
+    tasks.find_arbitrage.apply()
+    assert tasks.find_arbitrage.apply().get() == "Nothing due"
+
+  cycles = cycle_metrics.history()
+  assert len(cycles) == 1 # the cycle that fetched nothing is not kept
+  stages = cycles[0]['stages']
+  for stage in ('sports_fetch', 'odds_fetch', 'redis_save', 'normalize', 'surebets', 'middles', 'valuebets', 'db_counts', 'publish'):
+    assert stages[stage]['calls'] >= 1
+    assert stages[stage]['wall'] >= 0
+  assert stages['odds_fetch']['items'] == sum(len(odds) for odds in ODDS.values())
+  assert stages['surebets']['items'] == len(stored(worker, 'surebets'))
+  assert set(cycles[0]['sports']) == set(ODDS)
+  assert not worker.exists(cycle_metrics.CURRENT_KEY)
+
+  summary = cycle_metrics.summary()
+  assert summary['cycles'] == 1
+  assert [stage['name'] for stage in summary['stages']][0] == 'sports_fetch'
+  assert {sport['key'] for sport in summary['slowest_sports']} == set(ODDS)
+
+
+def test_slow_stages_are_flagged(worker):
+  cycles = [{'started': 0, 'seconds': 9, 'stages': {'surebets': {'wall': 5.0, 'cpu': 5.0, 'items': 1, 'calls': 1}}, 'sports': {}}]
+  cycles += [{'started': 0, 'seconds': 2, 'stages': {'surebets': {'wall': 1.0, 'cpu': 1.0, 'items': 1, 'calls': 1}}, 'sports': {}}] * 3
+  stage = cycle_metrics.summary(cycles)['stages'][0]
+  assert stage['average'] == 1.0 and stage['slow']
+  assert not cycle_metrics.summary(cycles[1:])['stages'][0]['slow']
+
+
+def test_overlapping_runs_are_coalesced_into_one_follow_up(worker):
+  token, _ = cycle.start_cycle()
+  assert tasks.find_arbitrage.apply().get() == "Overlapping"
+  assert tasks.find_arbitrage.apply().get() == "Overlapping"
+  assert not worker.exists("arb:surebets")
+
+  with mock.patch.object(tasks, "FINDER_MODE", "local"), mock.patch.object(pipeline, "EXECUTION", "inline"):
+    tasks.end_cycle(token) # runs the follow-up eagerly
+  assert worker.exists("arb:surebets")
+  assert not worker.exists(cycle.PENDING_KEY)
+  assert not worker.exists(cycle.LOCK_KEY)
+
+
+def test_failed_chord_releases_the_cycle_lock(worker, monkeypatch):
+  dispatched = []
+  monkeypatch.setattr(tasks, "chord", lambda header: dispatched.append) # dispatch nothing, keep the callback
+  with mock.patch.object(tasks, "FINDER_MODE", "chord"):
+    assert tasks.find_arbitrage.apply().get().startswith("Dispatched")
+  token = worker.get(cycle.LOCK_KEY).decode()
+  errback = dispatched[0].options['link_error'][0]
+  assert errback['task'] == 'app.tasks.abort_cycle' and errback['kwargs'] == {'token': token}
+
+  cycle_metrics.record('surebets', 1.0, 1.0, items=5) # a header task got this far
+  tasks.abort_cycle(mock.Mock(id='analyze-1'), RuntimeError("worker lost"), None, token=token)
+  assert not worker.exists(cycle.LOCK_KEY)
+  assert cycle_metrics.history()[0]['stages']['surebets']['items'] == 5
+
+  next_token, _ = cycle.start_cycle()
+  tasks.abort_cycle(mock.Mock(id='publish'), RuntimeError("late"), None, token=token) # errback after the callback ended it
+  assert worker.get(cycle.LOCK_KEY).decode() == next_token
+
+
+def test_cycle_metrics_belong_to_the_lock_holder(worker):
+  token, _ = cycle.start_cycle()
+  cycle_metrics.begin(token)
+  cycle_metrics.record('odds_fetch', 1.0, 1.0, items=5)
+  cycle_metrics.begin('expired-token') # a cycle that lost its lease resets nothing
+  assert cycle_metrics.finish('expired-token') is None
+  assert worker.hget(cycle_metrics.CURRENT_KEY, 'odds_fetch:items') == b'5'
+  assert cycle_metrics.finish(token)['stages']['odds_fetch']['items'] == 5
+
+
+def test_overlapping_run_is_skipped(worker, monkeypatch):
+  monkeypatch.setattr(cycle, "OVERLAP_MODE", "skip")
+  token, _ = cycle.start_cycle()
+  assert cycle.start_cycle() is None
+  assert cycle.finish_cycle(token) is None
+
+
+def test_behind_schedule_drops_lowest_priority_sports(worker):
+  cycle.record_sport_run('soccer_epl', 30, found=50)
+  cycle.record_sport_run('basketball_nba', 30, found=5)
+  cycle.record_sport_run('icehockey_nhl', 30, found=0)
+  planned = cycle.plan_sports(SPORTS, deadline=cycle.time.time() + 65)
+  assert [sport['key'] for sport in planned] == ['soccer_epl', 'basketball_nba']
+  assert cycle.plan_sports(SPORTS, deadline=None)[0]['key'] == 'soccer_epl'
+
+
+def test_chord_plans_the_deadline_with_the_cluster_concurrency(worker, monkeypatch):
+  plan = mock.Mock(side_effect=lambda sports, deadline, workers: sports)
+  monkeypatch.setattr(cycle, "plan_sports", plan)
+  monkeypatch.setattr(pipeline, "WORKERS", 2)
+  with mock.patch.object(tasks, "FINDER_MODE", "chord"):
+    tasks.find_arbitrage.apply()
+  with mock.patch.object(tasks, "FINDER_MODE", "local"), mock.patch.object(pipeline, "EXECUTION", "inline"):
+    worker.delete(cadence.SCHEDULE_KEY)
+    tasks.find_arbitrage.apply()
+  assert [call.kwargs['workers'] for call in plan.call_args_list] == [4, 2]
+
+  monkeypatch.setattr(tasks, "CLUSTER_WORKERS", 0)
+  monkeypatch.setattr(tasks, "_cluster_workers", 1)
+  inspect = mock.Mock()
+  monkeypatch.setattr(tasks.celery.control, "inspect", mock.Mock(return_value=inspect))
+  inspect.stats.return_value = {'w1': {'pool': {'max-concurrency': 8}}, 'w2': {'pool': {'max-concurrency': 4}}}
+  assert tasks.cluster_workers() == 12
+  inspect.stats.return_value = None # no worker answered in time
+  assert tasks.cluster_workers() == 12
+
+
+def test_sports_queued_past_the_deadline_are_skipped(worker):
+  result = tasks.analyze_sport.apply(args=(SPORTS[0], 'h2h', cycle.time.time() - 1)).get()
+  assert result == [SPORTS[0], None]
+
+
+def test_only_due_sports_are_fetched(worker):
+  with mock.patch.object(tasks, "FINDER_MODE", "chord"):
+    tasks.find_arbitrage.apply()
+    assert tasks.find_arbitrage.apply().get() == "Nothing due"
+  published = stored(worker, 'surebets')
+
+  worker.zadd(cadence.SCHEDULE_KEY, {'soccer_epl': 0})
+  with mock.patch.object(tasks, "FINDER_MODE", "local"), mock.patch.object(pipeline, "EXECUTION", "inline"):
+    assert tasks.find_arbitrage.apply().get() == "Done"
+  assert stored(worker, 'surebets') == published
+  assert set(redis_helper.get_odds_index()) == set(ODDS) # sports that were not due keep their cached odds
+
+
+def test_refresh_interval_follows_kickoff_and_volatility(worker):
+  odds = make_events(10, 0)
+  now = redis_helper._parse_time(odds[0]['commence_time']).timestamp()
+  soon = cadence.record_fetch('soccer_epl', odds, now=now - 1800)
+  later = cadence.record_fetch('basketball_nba', odds, now=now - 43200)
+  assert soon < later
+
+  unchanged = cadence.record_fetch('soccer_epl', odds, now=now - 1700)
+  moved = cadence.record_fetch('basketball_nba', make_events(10, 1), now=now - 43200 + 100)
+  assert moved < later and unchanged >= soon
+
+
+def test_request_budget_defers_low_priority_sports(worker):
+  now = redis_helper._parse_time('2026-10-17T12:00:00Z').timestamp()
+  assert quota.admit(SPORTS, cost=3, now=now) == SPORTS # quota not reported yet
+  assert quota.call_cost('h2h,spreads,totals', 'uk,eu') == 6
+
+  quota.record_usage('100', '900', now=now) # 50 usable after the 5% reserve, spread until Nov 1st
+  assert quota.admit(SPORTS, cost=3, now=now) == SPORTS[:1]
+  assert quota.admit(SPORTS, cost=3, now=now + 60) == []
+  assert quota.get_budget(planned_rate=10, now=now)['status'] == 'throttled'
+
+  quota.record_usage('40', '960', now=now)
+  assert quota.admit(SPORTS, cost=3, now=now + 86400) == []
+  assert quota.get_budget(now=now)['status'] == 'exhausted'
+
+
+def test_finder_pool_is_started_once_across_threads(monkeypatch):
+  import threading, time
+  started = []
+
+  class SlowPool:
+    def __init__(self, **kwargs):
+      time.sleep(0.05) # wide enough for every thread to see no pool yet without the lock
+      started.append(self)
+
+  monkeypatch.setattr(pipeline, "_pool", None)
+  monkeypatch.setattr(pipeline, "ProcessPoolExecutor", SlowPool)
+  pools = []
+  threads = [threading.Thread(target=lambda: pools.append(pipeline._get_pool())) for _ in range(4)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert len(started) == 1 and all(pool is started[0] for pool in pools)
+
+
+def test_daemonic_fallback_warns_once_per_process(monkeypatch, caplog):
+  monkeypatch.setattr(pipeline, "_warned_daemonic", False)
+  monkeypatch.setattr(pipeline.multiprocessing, "current_process", lambda: mock.Mock(daemon=True))
+  monkeypatch.setattr(pipeline, "_safe_analyze", mock.Mock(return_value=None))
+  monkeypatch.setattr(pipeline, "publish_results", mock.Mock())
+  for _ in range(3):
+    pipeline.run_finders(SPORTS, 'h2h')
+  assert pipeline._safe_analyze.call_count == 3 * len(SPORTS)
+  assert len([r for r in caplog.records if "Daemonic" in r.getMessage()]) == 1
+
+
+def test_broken_finder_pool_is_shut_down_and_replaced(monkeypatch):
+  from concurrent.futures.process import BrokenProcessPool
+  broken = mock.Mock(submit=mock.Mock(side_effect=BrokenProcessPool("worker died")))
+  monkeypatch.setattr(pipeline, "_pool", broken)
+  monkeypatch.setattr(pipeline, "_safe_analyze", lambda sport, markets, tables=None, deadline=None: {'sport': sport['key']})
+  results = pipeline._run_in_pool(SPORTS[:2], 'h2h')
+  assert results == [(sport, {'sport': sport['key']}) for sport in SPORTS[:2]] # analyzed inline
+  broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+  assert pipeline._pool is None
+
+  monkeypatch.setattr(pipeline, "ProcessPoolExecutor", mock.Mock(return_value="fresh pool"))
+  assert pipeline._get_pool() == "fresh pool"
+
+
+def test_region_books_are_merged_per_event():
+  from app.services.odds_service import OddsService, merge_region_odds
+  uk, eu = make_events(3, 0), make_events(3, 1)
+  for event in eu:
+    for bookmaker in event['bookmakers']:
+      bookmaker['last_update'] = '2026-10-17T12:00:00Z'
+  merged = merge_region_odds([uk, eu])
+  assert [event['id'] for event in merged] == [event['id'] for event in uk]
+  for event, uk_event, eu_event in zip(merged, uk, eu):
+    keys = [bookmaker['key'] for bookmaker in event['bookmakers']]
+    assert len(keys) == len(set(keys)) == len({b['key'] for b in uk_event['bookmakers'] + eu_event['bookmakers']})
+    assert all(b['last_update'] for b in event['bookmakers'] if b['key'] in {b['key'] for b in eu_event['bookmakers']})
+
+  service = OddsService(region='uk,eu')
+  assert service.region_groups(service.region) == ['uk,eu']
+  service.region_mode = 'split'
+  assert service.region_groups(service.region) == ['uk', 'eu']
+  service.record_quota({'x-requests-last': '6', 'x-requests-remaining': '10'}, 'uk,eu')
+  assert service.region_costs == {'uk': 3, 'eu': 3}
+
+
+def test_hot_events_are_refreshed_between_slate_fetches(worker):
+  with mock.patch.object(tasks, "FINDER_MODE", "chord"):
+    tasks.find_arbitrage.apply()
+  published = stored(worker, 'surebets')
+  hot = [member.decode() for member in worker.zrange(hot_events.HOT_KEY, 0, -1)]
+  with_surebets = {json.loads(item)['event_id'] for item in worker.hvals('arb:surebets')}
+  assert with_surebets and with_surebets <= {member.split('|')[1] for member in hot}
+
+  worker.zadd(hot_events.HOT_KEY, {member: 0 for member in hot})
+  with mock.patch.object(tasks, "FINDER_MODE", "chord"), \
+      mock.patch.object(FakeOddsService, "get_event_odds", autospec=True, side_effect=FakeOddsService.get_event_odds) as fetch:
+    result = tasks.find_arbitrage.apply().get()
+  due = sorted(hot)[:hot_events.HOT_MAX_EVENTS] # equal scores come back in member order
+  assert result == f"Dispatched {len({member.split('|')[0] for member in due})}"
+  assert {f"{call.args[1]}|{event_id}" for call in fetch.call_args_list for event_id in call.args[2]} == set(due)
+  assert stored(worker, 'surebets') == published
+  assert worker.zscore(hot_events.HOT_KEY, due[0]) > cycle.time.time()
+
+
+def test_failed_hot_event_fetches_keep_the_events_hot(worker):
+  members = {f"soccer_epl|{event['id']}": 0 for event in ODDS['soccer_epl'][:3]}
+  worker.zadd(hot_events.HOT_KEY, members)
+  event_ids = [member.split('|')[1] for member in members]
+  odds_api = FakeOddsService()
+  odds_api.api_limit_reached = True # get_event_odds answers {} once the quota is spent
+  with mock.patch.object(FakeOddsService, "get_event_odds", return_value={}):
+    assert tasks.fetch_hot_events(odds_api, 'soccer_epl', event_ids) is None
+  assert sorted(member.decode() for member in worker.zrange(hot_events.HOT_KEY, 0, -1)) == sorted(members)
+  assert all(score > cycle.time.time() for _, score in worker.zrange(hot_events.HOT_KEY, 0, -1, withscores=True))
+
+  odds_api = FakeOddsService()
+  odds_api.missing_events = {event_ids[0]} # 404 EVENT_NOT_FOUND
+  with mock.patch.object(FakeOddsService, "get_event_odds", return_value={}):
+    tasks.fetch_hot_events(odds_api, 'soccer_epl', event_ids)
+  assert sorted(member.decode() for member in worker.zrange(hot_events.HOT_KEY, 0, -1)) == sorted(list(members)[1:])
+
+
+def test_best_implied_probability_of_an_event():
+  event = make_events(1, 0)[0]
+  event['bookmakers'] = [
+    {'title': 'A', 'markets': [{'key': 'h2h', 'outcomes': [{'name': 'X', 'price': 2.1}, {'name': 'Y', 'price': 1.8}]}]},
+    {'title': 'B', 'markets': [{'key': 'h2h', 'outcomes': [{'name': 'X', 'price': 1.9}, {'name': 'Y', 'price': 2.05}]}]}
+  ]
+  from app.services.odds_table import normalize_event
+  assert abs(hot_events.best_implied(normalize_event(event)) - (1 / 2.1 + 1 / 2.05)) < 1e-9
+
+
+def test_replay_is_repeatable(worker, tmp_path, monkeypatch):
+  at = redis_helper._parse_time('2026-10-18T12:00:00Z').timestamp()
+  for step in range(3):
+    odds = {sport['key']: make_events(20, seed * 10 + step) for seed, sport in enumerate(SPORTS)}
+    odds_archive.write_snapshot(odds, at=at + step * 60, directory=tmp_path, sports={s['key']: s for s in SPORTS})
+
+  live = {'arb:surebets': b'{}', 'view:surebets:rows': b'{}', 'odds:index': b'{}'}
+  for key in live:
+    worker.set(key, live[key])
+
+  sleeps = []
+  monkeypatch.setattr(replay.time, "sleep", sleeps.append)
+  first = replay.replay(speed=2, markets='h2h,spreads,totals', directory=tmp_path)
+  published = {kind: worker.hgetall(f"replay:arb:{kind}") for kind in pipeline.FINDERS}
+  assert sleeps == [30, 30]
+  assert first['snapshots'] == 3 and first['events'] == 180
+  assert first['found']['surebets'] and published['surebets']
+
+  assert all(key.decode().startswith(replay.KEY_PREFIX) for key in worker.keys("*") if key.decode() not in live)
+  assert {key: worker.get(key) for key in live} == live # the live keys are never touched
+  assert not pipeline.update_sport_db_count.called # live-only side effects stay out of a replay
+  assert not worker.exists(hot_events.HOT_KEY, "cycle:sport_stats", cycle_metrics.CURRENT_KEY, team_names.ALIASES_KEY)
+
+  replay.reset()
+  assert sorted(key.decode() for key in worker.keys("*")) == sorted(live)
+  second = replay.replay(directory=tmp_path)
+  assert second['found'] == first['found']
+  assert {kind: worker.hgetall(f"replay:arb:{kind}") for kind in pipeline.FINDERS} == published
+  assert [c['found'] for c in replay.replay(start=at + 60, end=at + 60, directory=tmp_path)['cycles']] == [first['cycles'][1]['found']]
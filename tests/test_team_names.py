@@ -0,0 +1,96 @@
+import pytest
+from unittest import mock
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services import team_names
+from app.services.team_names import TeamNameIndex, normalize
+
+TEAMS = ["Manchester United", "Liverpool"]
+
+
+@pytest.fixture
+def store():
+  return fakeredis.FakeRedis()
+
+
+def test_normalize_drops_accents_case_punctuation_and_suffixes():
+  assert normalize("Atlético Madrid C.F.") == "atletico madrid"
+  assert normalize("The FC") == "the fc" # nothing but noise words, kept as is
+
+
+def test_exact_and_normalized_names_resolve_without_learning(store):
+  index = TeamNameIndex(client=store)
+  assert index.resolve("Manchester United", TEAMS) == "Manchester United"
+  assert index.resolve("manchester united fc", TEAMS) == "Manchester United"
+  assert not store.exists(team_names.ALIASES_KEY)
+
+
+def test_aliases_are_learned_once_and_shared(store):
+  index = TeamNameIndex(client=store)
+  assert index.resolve("Man United", TEAMS) == "Manchester United"
+  assert store.hget(team_names.ALIASES_KEY, "man united") == b"Manchester United"
+
+  other = TeamNameIndex(client=store) # another worker or a later cycle
+  with mock.patch.object(team_names, "SequenceMatcher", side_effect=AssertionError):
+    assert other.resolve("Man United", TEAMS) == "Manchester United"
+
+
+def test_alias_of_another_event_falls_through_to_the_event_teams(store):
+  index = TeamNameIndex(client=store)
+  index.learn("inter", "Inter Miami")
+  assert index.resolve("Inter", ["Inter Milan", "Roma"]) == "Inter Milan"
+  assert index.resolve("Inter", ["Inter Miami", "Orlando City"]) == "Inter Miami"
+  assert store.hget(team_names.ALIASES_KEY, "inter") == b"Inter Miami" # the first alias is kept
+
+
+def test_token_step_resolves_reordered_and_partial_names_without_difflib(store):
+  index = TeamNameIndex(client=store)
+  with mock.patch.object(team_names, "SequenceMatcher", side_effect=AssertionError):
+    assert index.resolve("Madrid Atletico", ["Real Madrid", "Atletico Madrid"]) == "Atletico Madrid"
+    assert index.resolve("Tottenham", ["Tottenham Hotspur", "Arsenal"]) == "Tottenham Hotspur"
+  assert store.hget(team_names.ALIASES_KEY, "madrid atletico") == b"Atletico Madrid"
+
+
+def test_token_step_needs_a_lead_over_the_runner_up(store):
+  index = TeamNameIndex(client=store)
+  assert index._token_match("new york", {"new york jets": "New York Jets", "new york giants": "New York Giants"}) is None
+  assert index._token_match("ny jets", {"new york jets": "New York Jets", "new york giants": "New York Giants"}) is None
+
+
+def test_names_difflib_rejects_are_not_matched_by_prefix(store):
+  index = TeamNameIndex(client=store)
+  assert index.resolve("Man Utd", ["Manchester City", "Chelsea"]) is None
+  assert index.resolve("Man Utd", TEAMS) is None # 0.58, under the cutoff
+  assert not store.exists(team_names.ALIASES_KEY)
+
+
+def test_close_runner_up_leaves_the_name_unresolved(store):
+  index = TeamNameIndex(client=store)
+  assert index.resolve("New York", ["New York Jets", "New York Giants"]) is None
+  assert index.resolve("NY Jets", ["New York Jets", "New York Giants"]) == "New York Jets"
+
+
+def test_learned_aliases_are_never_overwritten(store):
+  index = TeamNameIndex(client=store)
+  assert index.learn("man united", "Manchester United") == "Manchester United"
+  assert index.learn("man united", "Manchester City") == "Manchester United"
+
+  other = TeamNameIndex(client=store) # learned the same name before loading the alias
+  other.loaded_at = float("inf")
+  assert other.learn("man united", "Manchester City") == "Manchester United"
+  assert other.aliases["man united"] == "Manchester United"
+  assert store.hget(team_names.ALIASES_KEY, "man united") == b"Manchester United"
+
+
+def test_unknown_names_resolve_to_none_and_are_not_retried(store):
+  index = TeamNameIndex(client=store)
+  assert index.resolve("Draw", TEAMS) is None
+  with mock.patch.object(team_names, "SequenceMatcher", side_effect=AssertionError):
+    assert index.resolve("Draw", TEAMS) is None
+
+
+def test_index_works_without_redis():
+  index = TeamNameIndex(client=mock.Mock(hgetall=mock.Mock(side_effect=ConnectionError), hsetnx=mock.Mock(side_effect=ConnectionError)))
+  assert index.resolve("Man United", TEAMS) == "Manchester United"
+  assert index.resolve("Man United", TEAMS) == "Manchester United"
@@ -0,0 +1,159 @@
+import os
+
+os.environ.setdefault("RUN_MODE", "local")
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from app.services.odds_table import build_event_table
+from app.services.surebet_finder import SurebetFinder
+from app.services.middles_finder import MiddlesFinder
+from app.services.values_finder import ValueBetsFinder
+from tools.synthetic_slate import make_slate
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'bench_baseline.json')
+NOW = datetime(2026, 10, 17, 12, tzinfo=timezone.utc) # fixed clock, the slates are the same on every run
+
+STAGES = {
+  'normalize': lambda slate, group, markets: build_event_table(slate),
+  'surebets': lambda events, group, markets: _finder(SurebetFinder(incremental=False), markets).calculate_arbitrage(events, group),
+  'middles': lambda events, group, markets: _finder(MiddlesFinder(incremental=False), markets).calculate_arbitrage(events, group),
+  'valuebets': lambda events, group, markets: _finder(ValueBetsFinder(incremental=False), markets)._calculate_valuebets(events, group)
+}
+
+# Finder benchmarks.
+# Times each finder on synthetic slates (tools/synthetic_slate.py) of growing size, the way pipeline.analyze_sport
+# runs them: the slate is normalized once and every finder gets the EventOdds. For every stage and size it records
+# the best wall time of --repeat runs, events/sec, the tracemalloc peak and the blocks still allocated when the
+# stage returns (mostly its results). Runs are written to a JSON baseline; --check compares against it and
+# exits 1 when a stage got slower (or hungrier) than --tolerance allows.
+#
+#   python -m tools.bench_finders --sizes 50,200,1000 --save-baseline
+#   python -m tools.bench_finders --check
+def run(sizes=(50, 200, 1000), bookmakers=10, markets='h2h,spreads,totals', arb_rate=0.03, repeat=3,
+        sport_key='basketball_nba', group='Basketball', seed=0):
+  """Benchmark every stage on one slate per size, returns {'meta': ..., 'results': {'<stage>@<size>': stats}}."""
+  results = {}
+  for size in sizes:
+    slate = make_slate(sport_key, size, markets=markets, now=NOW, seed=seed, arb_rate=arb_rate, bookmakers=bookmakers)
+    events = build_event_table(slate)
+    for stage, run_stage in STAGES.items():
+      source = slate if stage == 'normalize' else events
+      results[f"{stage}@{size}"] = measure(lambda: run_stage(source, group, markets), size, repeat)
+  return {
+    'meta': {
+      'python': platform.python_version(), 'machine': platform.machine(), 'bookmakers': bookmakers,
+      'markets': markets, 'arb_rate': arb_rate, 'repeat': repeat, 'sport': sport_key, 'seed': seed,
+      'at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    },
+    'results': results
+  }
+
+def measure(func, events, repeat=3):
+  """Best time of `repeat` calls, then one traced call for memory."""
+  timings = []
+  for _ in range(max(repeat, 1)):
+    gc.collect()
+    started = time.perf_counter()
+    output = func()
+    timings.append(time.perf_counter() - started)
+  del output
+
+  gc.collect()
+  tracemalloc.start()
+  try:
+    output = func()
+    _, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+  finally:
+    tracemalloc.stop()
+
+  best = min(timings)
+  return {
+    'events': events,
+    'found': len(output),
+    'seconds': round(best, 6),
+    'events_per_sec': round(events / best, 1) if best else None,
+    'peak_kib': round(peak / 1024, 1),
+    'blocks': blocks
+  }
+
+def compare(current, baseline, tolerance=0.2):
+  """Regressions of `current` against `baseline`: stages whose throughput dropped or peak memory grew by more than `tolerance`."""
+  regressions = []
+  for name, stats in current['results'].items():
+    base = baseline.get('results', {}).get(name)
+    if not base:
+      continue
+    if base.get('events_per_sec') and stats['events_per_sec'] < base['events_per_sec'] * (1 - tolerance):
+      regressions.append((name, 'events_per_sec', base['events_per_sec'], stats['events_per_sec']))
+    if base.get('peak_kib') and stats['peak_kib'] > base['peak_kib'] * (1 + tolerance):
+      regressions.append((name, 'peak_kib', base['peak_kib'], stats['peak_kib']))
+  return regressions
+
+def load_baseline(path=None):
+  path = path or BASELINE
+  if not os.path.exists(path):
+    return None
+  with open(path, 'r', encoding='utf-8') as baseline:
+    return json.load(baseline)
+
+def save_baseline(report, path=None):
+  with open(path or BASELINE, 'w', encoding='utf-8') as baseline:
+    json.dump(report, baseline, indent=2)
+    baseline.write('\n')
+
+def _finder(finder, markets):
+  finder.use_markets(markets)
+  return finder
+
+def _sizes(value):
+  try:
+    return [int(size) for size in value.split(',') if size]
+  except ValueError:
+    raise argparse.ArgumentTypeError(f"not a list of sizes: {value}")
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog='python -m tools.bench_finders', description='Benchmark the finders on synthetic slates.')
+  parser.add_argument('--sizes', type=_sizes, default=[50, 200, 1000], help='events per slate, comma separated')
+  parser.add_argument('--bookmakers', type=int, default=10, help='bookmakers quoting every event')
+  parser.add_argument('--markets', default='h2h,spreads,totals')
+  parser.add_argument('--arb-rate', type=float, default=0.03, help='share of quotes boosted above fair value')
+  parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage, the best one counts')
+  parser.add_argument('--baseline', default=BASELINE, help='baseline JSON file')
+  parser.add_argument('--save-baseline', action='store_true', help='write this run as the new baseline')
+  parser.add_argument('--check', action='store_true', help='exit 1 when a stage regressed against the baseline')
+  parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown / memory growth, 0.2 = 20%%')
+  args = parser.parse_args(argv)
+
+  report = run(args.sizes, args.bookmakers, args.markets, args.arb_rate, args.repeat)
+  baseline = load_baseline(args.baseline)
+  print(f"{'stage':<22}{'events/s':>12}{'ms':>10}{'peak KiB':>11}{'blocks':>9}{'found':>7}{'vs base':>9}")
+  for name, stats in report['results'].items():
+    base = (baseline or {}).get('results', {}).get(name)
+    change = f"{stats['events_per_sec'] / base['events_per_sec'] - 1:+.0%}" if base and base.get('events_per_sec') else '-'
+    print(f"{name:<22}{stats['events_per_sec']:>12.0f}{stats['seconds'] * 1000:>10.1f}{stats['peak_kib']:>11.1f}"
+          f"{stats['blocks']:>9}{stats['found']:>7}{change:>9}")
+
+  if args.save_baseline:
+    save_baseline(report, args.baseline)
+    print(f"[+] Baseline written to {args.baseline}")
+  if args.check:
+    if baseline is None:
+      print(f"[!] No baseline at {args.baseline}, run with --save-baseline first")
+      sys.exit(1)
+    regressions = compare(report, baseline, args.tolerance)
+    for name, metric, before, after in regressions:
+      print(f"[!] {name}: {metric} {before} -> {after}")
+    if regressions:
+      sys.exit(1)
+    print(f"[+] No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+  return report
+
+if __name__ == '__main__':
+  main()
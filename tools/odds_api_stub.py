@@ -0,0 +1,165 @@
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter, deque
+from aiohttp import web
+from tools.synthetic_slate import BOOKMAKERS, make_sports, make_slate, make_event, event_id
+
+MARKETS = {'h2h', 'spreads', 'totals'}
+
+# Local Odds API stand-in.
+# Serves /v4/sports, /v4/sports/{sport}/odds and /v4/sports/{sport}/events/{event_id}/odds with synthetic slates
+# (tools/synthetic_slate.py), the x-requests-* quota headers and the api's error behaviour:
+# 401 for a wrong key or spent quota, 429 past the per-second rate limit (or at random, --error-rate),
+# 422 for unknown markets/regions, 404 for unknown sports. Point the finder at it with
+#
+#   python -m tools.odds_api_stub --port 8765 --sports 40 --events 80 --quota 20000 --latency 0.15 --jitter 0.1
+#   ODDS_API_BASE_URL=http://localhost:8765/v4 ...
+#
+# GET /stub/stats shows request counts by status, POST /stub/reset refills the quota.
+class OddsApiStub:
+  def __init__(self, sports=20, events=50, quota=0, api_key=None, latency=0.0, jitter=0.0, rate_limit=0,
+               error_rate=0.0, seed=0, tick_seconds=60, volatility=0.3, arb_rate=0.03):
+    self.sports = {sport['key']: sport for sport in make_sports(sports)}
+    self.events = events
+    self.quota = quota # 0 = unlimited
+    self.api_key = api_key
+    self.latency = latency
+    self.jitter = jitter
+    self.rate_limit = rate_limit
+    self.error_rate = error_rate
+    self.seed = seed
+    self.tick_seconds = tick_seconds
+    self.volatility = volatility
+    self.arb_rate = arb_rate
+    self.used = 0
+    self.statuses = Counter()
+    self.recent = deque()
+    self.rnd = random.Random(seed)
+    self._event_ids = {} # sport -> {event_id: index}
+
+  def app(self):
+    app = web.Application()
+    app.router.add_get('/v4/sports', self.get_sports)
+    app.router.add_get('/v4/sports/{sport}/odds', self.get_odds)
+    app.router.add_get('/v4/sports/{sport}/events/{event_id}/odds', self.get_event_odds)
+    app.router.add_get('/stub/stats', self.get_stats)
+    app.router.add_post('/stub/reset', self.reset)
+    return app
+
+  async def get_sports(self, request):
+    return await self._respond(request, 0, lambda: list(self.sports.values()))
+
+  async def get_odds(self, request):
+    sport, regions, markets = request.match_info['sport'], request.query.get('regions', ''), request.query.get('markets', 'h2h')
+    invalid = self._validate(sport, regions, markets)
+    if invalid:
+      return invalid
+
+    def body():
+      events = make_slate(
+        sport, self.events, regions, markets, seed=self.seed, tick_seconds=self.tick_seconds,
+        volatility=self.volatility, arb_rate=self.arb_rate, include_links=request.query.get('includeLinks') == 'true'
+      )
+      start, end = request.query.get('commenceTimeFrom'), request.query.get('commenceTimeTo')
+      return [event for event in events if (not start or event['commence_time'] >= start) and (not end or event['commence_time'] <= end)]
+    return await self._respond(request, self._cost(regions, markets), body)
+
+  async def get_event_odds(self, request):
+    sport, regions, markets = request.match_info['sport'], request.query.get('regions', ''), request.query.get('markets', 'h2h')
+    invalid = self._validate(sport, regions, markets)
+    if invalid:
+      return invalid
+    idx = self._event_index(sport, request.match_info['event_id'])
+    if idx is None:
+      return self._error(404, 'EVENT_NOT_FOUND', 'Event not found. The event may have expired or the event id is invalid.')
+
+    tick = int(time.time() // self.tick_seconds)
+    return await self._respond(request, self._cost(regions, markets), lambda: make_event(
+      sport, idx, regions, markets, tick, self.seed, self.tick_seconds, self.volatility, self.arb_rate,
+      include_links=request.query.get('includeLinks') == 'true'
+    ))
+
+  async def get_stats(self, request):
+    return web.json_response({'used': self.used, 'quota': self.quota, 'statuses': dict(self.statuses)})
+
+  async def reset(self, request):
+    self.used = 0
+    self.statuses.clear()
+    return web.json_response({'used': 0})
+
+  async def _respond(self, request, cost, body):
+    delay = max(self.latency + self.rnd.uniform(-self.jitter, self.jitter), 0)
+    if delay:
+      await asyncio.sleep(delay)
+
+    if self.api_key and request.query.get('api_key') != self.api_key:
+      return self._error(401, 'INVALID_KEY', 'API key is not valid.')
+    now = time.monotonic()
+    while self.recent and now - self.recent[0] > 1:
+      self.recent.popleft()
+    self.recent.append(now)
+    if (self.rate_limit and len(self.recent) > self.rate_limit) or self.rnd.random() < self.error_rate:
+      return self._error(429, 'EXCEEDED_FREQ_LIMIT', 'Requests are being sent too frequently.')
+    if self.quota and self.used + cost > self.quota:
+      return self._error(401, 'OUT_OF_USAGE_CREDITS', 'Usage quota has been reached.')
+
+    self.used += cost
+    response = web.json_response(body(), headers={
+      'x-requests-remaining': str(max(self.quota - self.used, 0) if self.quota else 1_000_000_000),
+      'x-requests-used': str(self.used),
+      'x-requests-last': str(cost)
+    })
+    self.statuses[200] += 1
+    return response
+
+  def _validate(self, sport, regions, markets):
+    if sport not in self.sports:
+      return self._error(404, 'UNKNOWN_SPORT', f"Unknown sport: {sport}")
+    if not regions or any(region not in BOOKMAKERS for region in regions.split(',')):
+      return self._error(422, 'INVALID_REGION', f"Invalid regions parameter: {regions}")
+    if any(market not in MARKETS for market in markets.split(',')):
+      return self._error(422, 'INVALID_MARKET', f"Invalid markets parameter: {markets}")
+    return None
+
+  def _event_index(self, sport, event):
+    if sport not in self._event_ids:
+      self._event_ids[sport] = {event_id(self.seed, sport, idx): idx for idx in range(self.events)}
+    return self._event_ids[sport].get(event)
+
+  def _cost(self, regions, markets):
+    return len(regions.split(',')) * len(markets.split(','))
+
+  def _error(self, status, code, message):
+    self.statuses[status] += 1
+    return web.json_response({'message': message, 'error_code': code}, status=status)
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog='python -m tools.odds_api_stub', description='Local stand-in for the Odds API v4.')
+  parser.add_argument('--host', default='127.0.0.1')
+  parser.add_argument('--port', type=int, default=8765)
+  parser.add_argument('--sports', type=int, default=20, help='number of in-season sports')
+  parser.add_argument('--events', type=int, default=50, help='events per sport')
+  parser.add_argument('--quota', type=int, default=0, help='request quota, 0 for unlimited')
+  parser.add_argument('--api-key', default=None, help='reject other keys with 401')
+  parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+  parser.add_argument('--jitter', type=float, default=0.0, help='+/- seconds of random latency')
+  parser.add_argument('--rate-limit', type=int, default=0, help='requests per second before 429, 0 for none')
+  parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with a 429')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--tick', type=int, default=60, help='seconds between price moves')
+  parser.add_argument('--volatility', type=float, default=0.3, help='share of bookmakers repricing an event per tick')
+  parser.add_argument('--arb-rate', type=float, default=0.03, help='share of quotes boosted above fair value')
+  args = parser.parse_args(argv)
+
+  stub = OddsApiStub(
+    sports=args.sports, events=args.events, quota=args.quota, api_key=args.api_key, latency=args.latency,
+    jitter=args.jitter, rate_limit=args.rate_limit, error_rate=args.error_rate, seed=args.seed,
+    tick_seconds=args.tick, volatility=args.volatility, arb_rate=args.arb_rate
+  )
+  print(f"[+] Odds API stub on http://{args.host}:{args.port}/v4 ({args.sports} sports x {args.events} events)")
+  web.run_app(stub.app(), host=args.host, port=args.port, print=None)
+
+if __name__ == '__main__':
+  main()
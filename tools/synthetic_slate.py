@@ -0,0 +1,138 @@
+import random
+import hashlib
+from datetime import datetime, timezone
+
+# Synthetic Odds API slates.
+# Events, bookmakers and prices are derived from (seed, sport, event, tick) so a slate is reproducible, any size,
+# and evolves over time: every tick a share of the bookmakers (volatility) reprices an event and bumps its
+# last_update. Prices are fair odds minus a bookmaker margin plus noise; a few quotes get boosted above fair
+# value (arb_rate), and some books hang a different spread/total line, so the finders have surebets, middles
+# and value bets to find.
+BOOKMAKERS = {
+  'uk': [('williamhill', 'William Hill'), ('skybet', 'Sky Bet'), ('paddypower', 'Paddy Power'), ('ladbrokes_uk', 'Ladbrokes'), ('betfair_ex_uk', 'Betfair')],
+  'eu': [('pinnacle', 'Pinnacle'), ('unibet_eu', 'Unibet'), ('betsson', 'Betsson'), ('onexbet', '1xBet'), ('williamhill', 'William Hill')],
+  'us': [('draftkings', 'DraftKings'), ('fanduel', 'FanDuel'), ('betmgm', 'BetMGM'), ('bovada', 'Bovada')],
+  'au': [('sportsbet', 'SportsBet'), ('tab', 'TAB'), ('neds', 'Neds'), ('ladbrokes_au', 'Ladbrokes AU')]
+}
+SPORTS = [
+  ('soccer', 'Soccer', ['epl', 'spain_la_liga', 'germany_bundesliga', 'italy_serie_a', 'france_ligue_one', 'uefa_champs_league']),
+  ('basketball', 'Basketball', ['nba', 'euroleague', 'ncaab']),
+  ('icehockey', 'Ice Hockey', ['nhl', 'sweden_hockey_league']),
+  ('americanfootball', 'American Football', ['nfl', 'ncaaf']),
+  ('tennis', 'Tennis', ['atp_paris_masters', 'wta_finals']),
+  ('baseball', 'Baseball', ['mlb']),
+  ('rugbyleague', 'Rugby League', ['nrl']),
+  ('aussierules', 'Aussie Rules', ['afl'])
+]
+# main total / spread line and whether the sport has a draw
+LINES = {'soccer': (2.5, 0.5, True), 'basketball': (210.5, 4.5, False), 'icehockey': (5.5, 1.5, False),
+         'americanfootball': (44.5, 3.5, False), 'tennis': (22.5, 2.5, False), 'baseball': (8.5, 1.5, False),
+         'rugbyleague': (40.5, 6.5, False), 'aussierules': (160.5, 12.5, False)}
+
+def make_sports(count=None):
+  """Sport dicts as /v4/sports returns them, `count` of them (all by default, names repeat past the list)."""
+  sports = [
+    {'key': f"{prefix}_{league}", 'group': group, 'title': league.replace('_', ' ').upper(),
+     'description': f"{group} {league}", 'active': True, 'has_outrights': False}
+    for prefix, group, leagues in SPORTS for league in leagues
+  ]
+  count = count or len(sports)
+  extra = [{**sports[i % len(sports)], 'key': f"{sports[i % len(sports)]['key']}_{i // len(sports)}"} for i in range(len(sports), count)]
+  return (sports + extra)[:count]
+
+def make_slate(sport_key, events=50, regions='uk', markets='h2h,spreads,totals', now=None, seed=0,
+               tick_seconds=60, volatility=0.3, arb_rate=0.03, include_links=True, bookmakers=None):
+  """
+  Events of one sport in the Odds API response shape, as they look at time `now` (a UTC datetime).
+  `bookmakers` is an int for that many generic books instead of the regions' books.
+  """
+  now = now or datetime.now(timezone.utc)
+  tick = int(now.timestamp() // tick_seconds)
+  return [
+    make_event(sport_key, idx, regions, markets, tick, seed, tick_seconds, volatility, arb_rate, include_links, bookmakers)
+    for idx in range(events)
+  ]
+
+def make_bookmakers(count):
+  return [(f"book_{idx}", f"Book {idx}") for idx in range(count)]
+
+def make_event(sport_key, idx, regions, markets, tick, seed=0, tick_seconds=60, volatility=0.3, arb_rate=0.03,
+               include_links=True, bookmakers=None):
+  event_rnd = _rnd(seed, sport_key, idx)
+  prefix = sport_key.split('_')[0]
+  total_line, spread_line, has_draw = LINES.get(prefix, (2.5, 0.5, False))
+  home, away = f"{sport_key.split('_', 1)[-1].title()} Home {idx}", f"{sport_key.split('_', 1)[-1].title()} Away {idx}"
+  # kickoffs spread over the next two days, on a horizon that rolls forward every hour so events never start
+  hour_start = (tick * tick_seconds) // 3600 * 3600
+  commence = datetime.fromtimestamp(hour_start + 3600 * (1 + event_rnd.randrange(47)), timezone.utc)
+  p_home = event_rnd.uniform(0.25, 0.65)
+  p_draw = event_rnd.uniform(0.2, 0.3) if has_draw else 0
+  p_over = event_rnd.uniform(0.42, 0.58)
+  p_cover = event_rnd.uniform(0.42, 0.58)
+  spread_line = event_rnd.choice([0.5, spread_line]) # close games hang a pick'em line
+
+  if bookmakers:
+    books = make_bookmakers(bookmakers)
+  else:
+    books = list({book: None for region in regions.split(',') for book in BOOKMAKERS.get(region, [])}) # deduped, in order
+  event_books = []
+  for key, title in books:
+    updated = _last_update(seed, sport_key, idx, key, tick, volatility)
+    rnd = _rnd(seed, sport_key, idx, key, updated)
+    margin = rnd.uniform(0.02, 0.07)
+    book_markets = []
+    for market in [m for m in markets.split(',') if m]:
+      if market == 'h2h':
+        probs = [(home, p_home * (1 - p_draw)), (away, (1 - p_home) * (1 - p_draw))] + ([('Draw', p_draw)] if has_draw else [])
+        outcomes = [{'name': name, 'price': _price(rnd, p, margin, arb_rate)} for name, p in probs]
+      elif market == 'spreads':
+        point = spread_line + (0.5 if rnd.random() < 0.2 else 0) # some books hang another line
+        outcomes = [
+          {'name': home, 'price': _price(rnd, p_cover, margin, arb_rate), 'point': -point},
+          {'name': away, 'price': _price(rnd, 1 - p_cover, margin, arb_rate), 'point': point}
+        ]
+      elif market == 'totals':
+        point = total_line + (1 if rnd.random() < 0.2 else 0)
+        outcomes = [
+          {'name': 'Over', 'price': _price(rnd, p_over, margin, arb_rate), 'point': point},
+          {'name': 'Under', 'price': _price(rnd, 1 - p_over, margin, arb_rate), 'point': point}
+        ]
+      else:
+        continue
+      book_markets.append({'key': market, 'last_update': _iso(updated * tick_seconds), 'outcomes': outcomes})
+    bookmaker = {'key': key, 'title': title, 'last_update': _iso(updated * tick_seconds), 'markets': book_markets}
+    if include_links:
+      bookmaker['link'] = f"https://{key}.example/{sport_key}/{idx}"
+    event_books.append(bookmaker)
+
+  return {
+    'id': event_id(seed, sport_key, idx),
+    'sport_key': sport_key,
+    'sport_title': sport_key.split('_', 1)[-1].replace('_', ' ').upper(),
+    'commence_time': _iso(commence.timestamp()),
+    'home_team': home,
+    'away_team': away,
+    'bookmakers': event_books
+  }
+
+def event_id(seed, sport_key, idx):
+  return hashlib.md5(f"{seed}:{sport_key}:{idx}".encode()).hexdigest()
+
+def _last_update(seed, sport_key, idx, bookmaker, tick, volatility, horizon=60):
+  """Latest tick (up to `horizon` back) at which this bookmaker repriced the event."""
+  for back in range(horizon):
+    if _rnd(seed, sport_key, idx, bookmaker, 'move', tick - back).random() < volatility:
+      return tick - back
+  return tick - horizon
+
+def _price(rnd, probability, margin, arb_rate):
+  price = 1 / (max(probability, 0.02) * (1 + margin)) * rnd.uniform(0.97, 1.03)
+  if rnd.random() < arb_rate:
+    price *= rnd.uniform(1.06, 1.15) # boosted quote, above fair value
+  return round(max(price, 1.01), 2)
+
+def _rnd(*parts):
+  return random.Random(hashlib.md5(":".join(map(str, parts)).encode()).hexdigest())
+
+def _iso(timestamp):
+  return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')